@@ -0,0 +1,413 @@
+"""
+This module contains the truck assignment stage, which decides which packages each truck carries before any route is driven.
+
+Two assigners are available, both return a dict of truck ID -> list of Package objects and change nothing:
+- `assign_sequential` is the loader plan_deliveries has always used: trucks in departure order take the most
+  constrained and most urgent loading units that fit.
+- `assign_clusters` is a capacitated k-medoids over the distance matrix, one cluster per truck. Every iteration
+  assigns units to the nearest feasible medoid (most constrained and highest regret first, within capacity), then
+  moves each medoid to the stop closest to the rest of its cluster. The loads with the lowest estimated miles are kept.
+
+A unit is a must-ride-with group or a single package (see PackageConstraints.loading_units), so groups always
+share a truck. Truck restrictions, hub arrival times and capacities are hard constraints for both assigners.
+The cluster assigner only gives packages with a deadline to trucks that leave at a fixed time early enough to
+reach them directly from the hub; trucks waiting for a driver have no departure time yet and only take EOD packages.
+
+`evaluate_loads` scores loads by ordering every truck the way deliver_packages does (nearest neighbour, then
+local search), so assigners can be compared on estimated miles and late packages without driving the trucks.
+"""
+from datetime import datetime
+from math import inf
+from operator import itemgetter
+from app.models.package import parse_deadline, time_to_minutes
+from app.models.timeline import to_minutes
+from app.core.local_search import arrival_minutes, improve_route, route_miles
+from app.core.routing_context import get_default_context
+
+EOD_MINUTES = time_to_minutes(parse_deadline("EOD"))
+MAX_ITERATIONS = 20
+REPAIR_ROUNDS = 3
+# Candidate moves of local search per estimated route. A move budget rather than a time limit,
+# so the chosen loads never depend on how busy the machine is
+ESTIMATE_ITERATIONS = 20_000
+
+
+def split_trucks(trucks):
+    """
+    Splits trucks into those with a fixed departure time (sorted by it) and those waiting for a driver (departTime datetime.max).
+
+    Returns a tuple of (scheduled trucks, waiting trucks).
+    """
+    scheduled = sorted((truck for truck in trucks if truck.departTime != datetime.max), key=lambda truck: truck.departTime)
+    waiting = [truck for truck in trucks if truck.departTime == datetime.max]
+    return scheduled, waiting
+
+
+def select_units(truck, units, assigned_packages, constraints, depart_time=None):
+    """
+    Chooses the loading units a truck takes, without loading anything.
+
+    Units restricted to this truck come first, then units by their earliest deadline, then by their loading order.
+    Units restricted to another truck, not ready at the hub by depart_time, or too big for the space left are skipped.
+
+    truck: Truck object being loaded
+    units: List of Package lists from PackageConstraints.loading_units, in loading order
+    assigned_packages: Set of package IDs that have already been assigned to a truck
+    constraints: PackageConstraints parsed from the manifest
+    depart_time: Time the truck leaves the hub, None if the truck waits for whatever it loads
+
+    Returns the positions in units of the chosen units, in the order they should be loaded.
+    """
+    candidates = []
+    for position, unit in enumerate(units):
+        first_id = unit[0].packageID
+        if first_id in assigned_packages:
+            continue
+        allowed_truck = constraints.allowed_truck(first_id)
+        if allowed_truck is not None and allowed_truck != truck.truckID:
+            continue
+        ready = constraints.ready_time(first_id)
+        if depart_time is not None and ready is not None and ready > depart_time.time():
+            continue
+        candidates.append((allowed_truck is None, min(package.deadlineMinutes for package in unit), position))
+    candidates.sort()
+
+    space = truck.capacity - len(truck.packageInventory)
+    chosen = []
+    for _, _, position in candidates:
+        if len(units[position]) <= space:
+            chosen.append(position)
+            space -= len(units[position])
+        if space == 0:
+            break
+    return chosen
+
+
+def assign_sequential(trucks, units, constraints, context=None):
+    """
+    Assigns units the way the loader always has: scheduled trucks in departure order, then the waiting trucks,
+    each taking what select_units chooses.
+
+    Returns a dict of truck ID -> list of Package objects in loading order.
+    """
+    scheduled, waiting = split_trucks(trucks)
+    loads = {truck.truckID: [] for truck in trucks}
+    assigned_packages = set()
+    for truck in scheduled + waiting:
+        depart_time = truck.departTime if truck.departTime != datetime.max else None
+        for position in select_units(truck, units, assigned_packages, constraints, depart_time):
+            loads[truck.truckID].extend(units[position])
+            assigned_packages.update(package.packageID for package in units[position])
+    return loads
+
+
+def _truck_classes(trucks):
+    # Trucks with the same departure, speed and capacity accept the same units, so feasibility is checked once per class
+    classes = {}
+    for index, truck in enumerate(trucks):
+        classes.setdefault((truck.departTime, truck.speed, truck.capacity), []).append(index)
+    return classes
+
+
+def _feasible_trucks(unit, locations, trucks, truck_classes, constraints, hub_row, relax_deadlines=False):
+    # Indexes of the trucks that may carry a unit
+    first_id = unit[0].packageID
+    allowed_truck = constraints.allowed_truck(first_id)
+    ready = constraints.ready_time(first_id)
+    deadline = min(package.deadlineMinutes for package in unit)
+
+    feasible = []
+    for (depart_time, speed, capacity), indexes in truck_classes.items():
+        if len(unit) > capacity:
+            continue
+        if depart_time == datetime.max:
+            if deadline < EOD_MINUTES and not relax_deadlines:
+                continue
+        else:
+            if ready is not None and ready > depart_time.time():
+                continue
+            if not relax_deadlines and deadline < EOD_MINUTES:
+                depart = time_to_minutes(depart_time)
+                minutes_per_mile = 60 / speed
+                if any(depart + hub_row[location] * minutes_per_mile > package.deadlineMinutes
+                       for package, location in zip(unit, locations)):
+                    continue
+        feasible.extend(indexes)
+
+    if allowed_truck is not None:
+        feasible = [index for index in feasible if trucks[index].truckID == allowed_truck]
+    return sorted(feasible)
+
+
+def _initial_medoids(trucks, units, locations, options, constraints, distance_matrix, hub_index):
+    # Trucks with restricted packages start at one of them, the rest by farthest-point sampling from the hub
+    medoids = [None] * len(trucks)
+    truck_indexes = {truck.truckID: index for index, truck in enumerate(trucks)}
+    for unit, unit_locations in zip(units, locations):
+        allowed_truck = constraints.allowed_truck(unit[0].packageID)
+        index = truck_indexes.get(allowed_truck)
+        if index is not None and medoids[index] is None:
+            medoids[index] = unit_locations[0]
+
+    candidates = sorted({location for unit_locations, feasible in zip(locations, options) if feasible for location in unit_locations})
+    if not candidates:
+        return [hub_index if medoid is None else medoid for medoid in medoids]
+
+    # Distance from every candidate to the nearest chosen medoid (the hub counts as chosen)
+    nearest = {location: distance_matrix.distance(hub_index, location) for location in candidates}
+    for medoid in medoids:
+        if medoid is not None:
+            row = distance_matrix.row(medoid)
+            for location in candidates:
+                nearest[location] = min(nearest[location], row[location])
+
+    for index in range(len(medoids)):
+        if medoids[index] is None:
+            medoid = max(candidates, key=nearest.__getitem__)
+            medoids[index] = medoid
+            row = distance_matrix.row(medoid)
+            for location in candidates:
+                nearest[location] = min(nearest[location], row[location])
+    return medoids
+
+
+def _assign_to_medoids(trucks, units, locations, options, medoids, distance_matrix):
+    # One capacitated assignment pass, returns the truck index per unit (None if nothing had room)
+    # The matrix is symmetric, so a unit's cost to every medoid is read from its own rows in one call
+    get_medoids = itemgetter(*medoids) if len(medoids) > 1 else lambda row: (row[medoids[0]],)
+    row = distance_matrix.row
+    ranked = []
+    for position, (unit_locations, feasible) in enumerate(zip(locations, options)):
+        if len(unit_locations) == 1:
+            costs = get_medoids(row(unit_locations[0]))
+        else:
+            costs = [sum(column) for column in zip(*(get_medoids(row(location)) for location in unit_locations))]
+        order = sorted(feasible, key=costs.__getitem__)
+        regret = costs[order[1]] - costs[order[0]] if len(order) > 1 else inf
+        ranked.append((len(feasible), -len(unit_locations), -regret, position, order))
+    ranked.sort(key=lambda entry: entry[:4])
+
+    space = [truck.capacity for truck in trucks]
+    choice = [None] * len(units)
+    for _, _, _, position, order in ranked:
+        size = len(units[position])
+        for index in order:
+            if space[index] >= size:
+                choice[position] = index
+                space[index] -= size
+                break
+    return choice
+
+
+def _update_medoids(medoids, choice, locations, distance_matrix):
+    # Moves every medoid to the stop with the smallest total distance to the stops of its cluster
+    clusters = {}
+    for position, index in enumerate(choice):
+        if index is not None:
+            counts = clusters.setdefault(index, {})
+            for location in locations[position]:
+                counts[location] = counts.get(location, 0) + 1
+
+    updated = list(medoids)
+    for index, counts in clusters.items():
+        best_cost = inf
+        for candidate in counts:
+            row = distance_matrix.row(candidate)
+            cost = sum(row[location] * count for location, count in counts.items())
+            if cost < best_cost:
+                best_cost = cost
+                updated[index] = candidate
+    return updated
+
+
+def _loads_from_choice(trucks, units, choice):
+    # Truck ID -> packages, from the truck index chosen for every unit
+    loads = {truck.truckID: [] for truck in trucks}
+    for position, index in enumerate(choice):
+        if index is not None:
+            loads[trucks[index].truckID].extend(units[position])
+    return loads
+
+
+def _repair_late_units(trucks, units, options, choice, context, max_rounds=REPAIR_ROUNDS):
+    # Moves (or swaps) units that are late on their truck to another feasible truck when that lowers (late, miles)
+    members = {index: [] for index in range(len(trucks))}
+    for position, index in enumerate(choice):
+        if index is not None:
+            members[index].append(position)
+
+    def estimate(index, positions):
+        packages = [package for position in positions for package in units[position]]
+        return route_estimate(packages, estimated_departure(trucks[index], packages, trucks), trucks[index].speed, context)
+
+    estimates = {index: estimate(index, positions) for index, positions in members.items()}
+    used = {index: sum(len(units[position]) for position in positions) for index, positions in members.items()}
+
+    for _ in range(max_rounds):
+        improved = False
+        for index in range(len(trucks)):
+            late_ids = estimates[index][1]
+            for position in [position for position in members[index] if any(package.packageID in late_ids for package in units[position])]:
+                if position not in members[index]:
+                    continue
+                best = None
+                for other in options[position]:
+                    if other == index:
+                        continue
+                    current = (len(estimates[index][1]) + len(estimates[other][1]), estimates[index][0] + estimates[other][0])
+                    # Relocate the unit, or swap it with a unit of the other truck that may ride on this one
+                    swaps = [None] + [swap for swap in members[other] if index in options[swap]]
+                    for swap in swaps:
+                        size_change = len(units[position]) - (len(units[swap]) if swap is not None else 0)
+                        if used[other] + size_change > trucks[other].capacity or used[index] - size_change > trucks[index].capacity:
+                            continue
+                        stay = [p for p in members[index] if p != position] + ([swap] if swap is not None else [])
+                        move = [p for p in members[other] if p != swap] + [position]
+                        stay_estimate, move_estimate = estimate(index, stay), estimate(other, move)
+                        cost = (len(stay_estimate[1]) + len(move_estimate[1]), stay_estimate[0] + move_estimate[0])
+                        if cost < current and (best is None or cost < best[0]):
+                            best = (cost, other, swap, stay, move, stay_estimate, move_estimate, size_change)
+                if best is not None:
+                    _, other, swap, stay, move, stay_estimate, move_estimate, size_change = best
+                    members[index], members[other] = stay, move
+                    estimates[index], estimates[other] = stay_estimate, move_estimate
+                    used[index] -= size_change
+                    used[other] += size_change
+                    choice[position] = other
+                    if swap is not None:
+                        choice[swap] = index
+                    improved = True
+        if not improved:
+            break
+    return choice
+
+
+def assign_clusters(trucks, units, constraints, context=None, max_iterations=MAX_ITERATIONS):
+    """
+    Assigns units to trucks with a capacitated k-medoids over the distance matrix, one cluster per truck.
+    The clustering with the fewest late packages and then the fewest miles (nearest-neighbour estimate) is kept,
+    and units still late on their truck are then moved or swapped to another truck where that helps.
+
+    trucks: List of Truck objects (empty, before loading)
+    units: List of Package lists from PackageConstraints.loading_units, in loading order
+    constraints: PackageConstraints parsed from the manifest
+    context: RoutingContext with the address and distance data (defaults to the shared context)
+    max_iterations: Upper bound on assignment and medoid update rounds
+
+    Returns a dict of truck ID -> list of Package objects in loading order. Units no truck can take are left out.
+    """
+    context = context or get_default_context()
+    distance_matrix = context.distance_matrix
+    hub_index = context.hub_index
+    hub_row = distance_matrix.row(hub_index)
+
+    locations = [[context.resolve_location(package) for package in unit] for unit in units]
+    truck_classes = _truck_classes(trucks)
+    options = []
+    for unit, unit_locations in zip(units, locations):
+        feasible = _feasible_trucks(unit, unit_locations, trucks, truck_classes, constraints, hub_row)
+        # A unit no truck can reach in time still needs a truck, so its deadline is relaxed
+        options.append(feasible or _feasible_trucks(unit, unit_locations, trucks, truck_classes, constraints, hub_row,
+                                                    relax_deadlines=True))
+
+    medoids = _initial_medoids(trucks, units, locations, options, constraints, distance_matrix, hub_index)
+    best_choice, best_cost = None, (inf, inf)
+    for _ in range(max_iterations):
+        choice = _assign_to_medoids(trucks, units, locations, options, medoids, distance_matrix)
+        miles, late = evaluate_loads(trucks, _loads_from_choice(trucks, units, choice), context, improve=False)
+        if (late, miles) < best_cost:
+            best_choice, best_cost = choice, (late, miles)
+
+        updated = _update_medoids(medoids, choice, locations, distance_matrix)
+        if updated == medoids:
+            break
+        medoids = updated
+
+    best_choice = _repair_late_units(trucks, units, options, best_choice, context)
+    return _loads_from_choice(trucks, units, best_choice)
+
+
+def nearest_neighbour_order(locations, start_index, distance_matrix):
+    """
+    Returns the locations in nearest-neighbour order starting from start_index (which is left out).
+    """
+    remaining = sorted(set(locations) - {start_index})
+    order = []
+    current = start_index
+    while remaining:
+        row = distance_matrix.row(current)
+        current = min(remaining, key=row.__getitem__)
+        remaining.remove(current)
+        order.append(current)
+    return order
+
+
+def estimated_departure(truck, packages, trucks):
+    """
+    Returns the departure time (minutes since midnight) used to estimate a truck's route.
+    A truck waiting for a driver is assumed to leave with the last scheduled truck, or once its packages are ready.
+    """
+    if truck.departTime != datetime.max:
+        return to_minutes(truck.departTime)
+    scheduled = [to_minutes(other.departTime) for other in trucks if other.departTime != datetime.max]
+    ready = [time_to_minutes(package.hubArrivalTime) for package in packages if package.hubArrivalTime]
+    ready += [time_to_minutes(package.updateTime) for package in packages if package.updateTime]
+    return max(scheduled + ready, default=0.0)
+
+
+def route_estimate(packages, depart_minute, speed, context=None, improve=True):
+    """
+    Estimates driving packages from the hub and back, the way deliver_packages orders them:
+    nearest neighbour, then local search (see local_search) if improve is True.
+
+    depart_minute: Departure time in minutes since midnight
+    speed: Truck speed in miles per hour
+
+    Returns a tuple of (miles, set of IDs of packages delivered after their deadline).
+    """
+    context = context or get_default_context()
+    distance_matrix = context.distance_matrix
+    hub_index = context.hub_index
+
+    stops = {}
+    deadlines = {}
+    for package in packages:
+        location = context.resolve_location(package)
+        stops.setdefault(location, []).append(package)
+        if package.deadlineMinutes < EOD_MINUTES:
+            deadlines[location] = min(package.deadlineMinutes, deadlines.get(location, package.deadlineMinutes))
+    if not stops:
+        return 0.0, set()
+
+    order = nearest_neighbour_order(list(stops), hub_index, distance_matrix)
+    if improve:
+        order, _ = improve_route(order, hub_index, hub_index, distance_matrix, depart_minute, speed, deadlines,
+                                 max_iterations=ESTIMATE_ITERATIONS)
+
+    route = [hub_index, *order, hub_index]
+    arrivals = arrival_minutes(route, distance_matrix, depart_minute, speed)
+    late_ids = {package.packageID for stop, arrival in zip(route[1:-1], arrivals[1:-1]) for package in stops[stop]
+                if int(arrival) > package.deadlineMinutes}
+    return route_miles(route, distance_matrix), late_ids
+
+
+def evaluate_loads(trucks, loads, context=None, improve=True):
+    """
+    Returns a tuple of (estimated total miles, number of late packages) for truck loads.
+
+    loads: Dict of truck ID -> list of Package objects
+    improve: If True, every route is improved with local search before it is measured
+    """
+    context = context or get_default_context()
+    total_miles = 0.0
+    late = 0
+    for truck in trucks:
+        packages = loads.get(truck.truckID)
+        if packages:
+            miles, late_ids = route_estimate(packages, estimated_departure(truck, packages, trucks), truck.speed, context, improve)
+            total_miles += miles
+            late += len(late_ids)
+    return total_miles, late
+
+
+ASSIGNERS = {"sequential": assign_sequential, "cluster": assign_clusters}
@@ -0,0 +1,205 @@
+"""
+This module contains the PackageConstraints class which is parsed from the Special Notes column of the manifest.
+
+Four kinds of notes are understood:
+    "Must be delivered with 15, 19"          must-ride-with group, the whole group is loaded on one truck
+    "Can only be on truck 2"                 truck-only restriction
+    "Delayed on flight---will not arrive to depot until 9:05 am"   not at the hub until that time
+    "Wrong address listed"                   held until its address correction (see AddressCorrection)
+
+The manifest does not say what the right address is, so corrections come from a separate source: a dict of
+package ID -> AddressCorrection, or a CSV file read with load_corrections. DEFAULT_CORRECTIONS holds the
+correction for the bundled manifest.
+
+Every rule is kept in a dict keyed by package (or group, or truck), so the loader checks a package in O(1).
+"""
+import csv
+import re
+from collections import namedtuple
+from datetime import datetime, time
+from app.models.package import parse_deadline
+
+# Special note patterns
+GROUP_NOTE = re.compile(r"must be delivered with\s+(.+)", re.IGNORECASE)
+TRUCK_NOTE = re.compile(r"can only be on truck\s+(\d+)", re.IGNORECASE)
+DELAYED_NOTE = re.compile(r"delayed.*until\s+(\d{1,2}):(\d{2})\s*([ap])\.?m", re.IGNORECASE)
+WRONG_ADDRESS_NOTE = re.compile(r"wrong address", re.IGNORECASE)
+
+# time: when the correct address becomes known, zip_code: None keeps the package's zip code
+AddressCorrection = namedtuple("AddressCorrection", ["time", "address", "zip_code"], defaults=[None])
+
+# Correction for the bundled manifest, package 9's address is corrected at 10:20 AM
+DEFAULT_CORRECTIONS = {9: AddressCorrection(time(10, 20), "410 S State St", "84111")}
+
+
+def load_corrections(file):
+    """
+    Loads address corrections from a CSV file with the columns Package ID, Time, Address and an optional Zip.
+    Times use the manifest format, for example '10:20 AM'.
+
+    Returns a dict of package ID -> AddressCorrection.
+    """
+    corrections = {}
+    with open(file, newline='', encoding='utf-8') as csvfile:
+        reader = csv.reader(csvfile)
+        next(reader, None)  # Skip header
+        for row in reader:
+            if not row or not row[0].strip():
+                continue
+            zip_code = row[3].strip() if len(row) > 3 and row[3].strip() else None
+            corrections[int(row[0])] = AddressCorrection(datetime.strptime(row[1].strip(), '%I:%M %p').time(),
+                                                         row[2].strip(), zip_code)
+    return corrections
+
+
+class PackageConstraints:
+    def __init__(self):
+        self.group_of = {}  # package ID -> group ID (the smallest package ID in the group)
+        self.groups = {}  # group ID -> sorted tuple of package IDs
+        self.truck_only = {}  # package ID -> the only truck ID allowed to carry it (shared by its whole group)
+        self.truck_packages = {}  # truck ID -> set of package IDs restricted to it
+        self.hub_arrival = {}  # package ID -> time the package arrives at the hub
+        self.corrections = {}  # package ID -> AddressCorrection
+        self.ready_times = {}  # package ID -> earliest time its group can leave the hub
+        self.held = set()  # package IDs with a wrong address and no known correction
+        self._parent = {}  # union-find parents used while groups are being built
+
+    @classmethod
+    def from_packages(cls, packages, corrections=None):
+        """
+        Parses the special notes of every package.
+
+        packages: Iterable of Package objects
+        corrections: Dict of package ID -> AddressCorrection for packages with a wrong address
+
+        Returns the PackageConstraints.
+        Raises ValueError if packages that must ride together are restricted to different trucks.
+        """
+        constraints = cls()
+        corrections = corrections or {}
+        for package in packages:
+            constraints.add_notes(package.packageID, package.special_notes, corrections.get(package.packageID))
+        constraints.finalize()
+        return constraints
+
+    def add_notes(self, package_id, notes, correction=None):
+        """
+        Adds the rules from one package's special notes.
+        """
+        if correction is not None:
+            self.corrections[package_id] = correction
+        if not notes:
+            return
+
+        group = GROUP_NOTE.search(notes)
+        if group:
+            for other_id in re.findall(r"\d+", group.group(1)):
+                self._union(package_id, int(other_id))
+
+        truck = TRUCK_NOTE.search(notes)
+        if truck:
+            self.truck_only[package_id] = int(truck.group(1))
+
+        delayed = DELAYED_NOTE.search(notes)
+        if delayed:
+            hour, minute, half = delayed.groups()
+            self.hub_arrival[package_id] = parse_deadline(f"{hour}:{minute} {half.upper()}M")
+
+        if WRONG_ADDRESS_NOTE.search(notes) and package_id not in self.corrections:
+            self.held.add(package_id)
+
+    def finalize(self):
+        """
+        Builds the group, truck and ready-time indexes once every note has been added.
+        """
+        members = {}
+        for package_id in self._parent:
+            members.setdefault(self._find(package_id), []).append(package_id)
+        self.groups = {min(ids): tuple(sorted(ids)) for ids in members.values()}
+        self.group_of = {package_id: group_id for group_id, ids in self.groups.items() for package_id in ids}
+
+        # A group shares its members' truck restriction and leaves the hub when its last member is ready
+        for group_id, ids in self.groups.items():
+            trucks = {self.truck_only[package_id] for package_id in ids if package_id in self.truck_only}
+            if len(trucks) > 1:
+                raise ValueError(f"Packages {', '.join(map(str, ids))} must ride together but are restricted to trucks {sorted(trucks)}")
+            if trucks:
+                truck_id = trucks.pop()
+                for package_id in ids:
+                    self.truck_only[package_id] = truck_id
+            if any(package_id in self.held for package_id in ids):
+                self.held.update(ids)
+
+        self.truck_packages = {}
+        for package_id, truck_id in self.truck_only.items():
+            self.truck_packages.setdefault(truck_id, set()).add(package_id)
+
+        ready = {}
+        for package_id, arrival in self.hub_arrival.items():
+            ready[package_id] = arrival
+        for package_id, correction in self.corrections.items():
+            ready[package_id] = max(ready.get(package_id, correction.time), correction.time)
+        for ids in self.groups.values():
+            times = [ready[package_id] for package_id in ids if package_id in ready]
+            if times:
+                for package_id in ids:
+                    ready[package_id] = max(times)
+        self.ready_times = ready
+
+    def members(self, package_id):
+        """
+        Returns the IDs of every package that must ride with package_id, including itself.
+        """
+        group_id = self.group_of.get(package_id)
+        return self.groups[group_id] if group_id is not None else (package_id,)
+
+    def allowed_truck(self, package_id):
+        """
+        Returns the only truck ID allowed to carry the package, or None if any truck may.
+        """
+        return self.truck_only.get(package_id)
+
+    def ready_time(self, package_id):
+        """
+        Returns the time the package (and its group) can leave the hub, or None if it is ready from the start.
+        """
+        return self.ready_times.get(package_id)
+
+    def loading_units(self, packages):
+        """
+        Splits packages into the units the loader places together.
+        A must-ride-with group becomes one unit at the position of its first member, other packages are units of their own.
+        Held packages are left out.
+
+        packages: List of Package objects in loading order
+
+        Returns a list of Package lists.
+        """
+        units = []
+        group_units = {}
+        for package in packages:
+            if package.packageID in self.held:
+                continue
+            group_id = self.group_of.get(package.packageID)
+            if group_id is None:
+                units.append([package])
+                continue
+            unit = group_units.get(group_id)
+            if unit is None:
+                unit = group_units[group_id] = []
+                units.append(unit)
+            unit.append(package)
+        return units
+
+    def _find(self, package_id):
+        parent = self._parent.setdefault(package_id, package_id)
+        while parent != package_id:
+            # Path halving keeps later lookups short
+            self._parent[package_id] = self._parent[parent]
+            package_id, parent = parent, self._parent[parent]
+        return package_id
+
+    def _union(self, first_id, second_id):
+        first_root, second_root = self._find(first_id), self._find(second_id)
+        if first_root != second_root:
+            self._parent[max(first_root, second_root)] = min(first_root, second_root)
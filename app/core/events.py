@@ -0,0 +1,201 @@
+"""
+This module contains the EventLog class, an append-only, time-sorted log of everything that happens to
+packages and trucks during a planned day.
+
+`deliver_packages` and `plan_deliveries` record events as they simulate the routes (hub arrivals,
+address corrections, loading, departures, stop arrivals, deliveries and returns). A LivePlan (see
+replanning) rewrites the events of a trip it re-plans and records cancellations. Reports then ask
+for the status of a package at any time with a binary search over that package's events, instead of
+re-simulating and mutating `package.status`, so queries are independent of each other and cheap.
+
+Event times are whole minutes since midnight, the same precision the reports print.
+"""
+from bisect import bisect_right, insort
+from collections import namedtuple
+from heapq import merge
+from datetime import datetime
+from app.models.package import time_to_minutes
+
+# Event kinds
+HUB_ARRIVAL = "hub-arrival"
+ADDRESS_CORRECTED = "address-corrected"
+LOADED = "loaded"
+DEPARTED = "departed"
+ARRIVED = "arrived"
+DELIVERED = "delivered"
+RETURNED = "returned"
+CANCELLED = "cancelled"
+
+# minute: whole minutes since midnight, location: address string (or None), miles: truck miles so far (or None)
+Event = namedtuple("Event", ["minute", "kind", "package_id", "truck_id", "location", "miles"])
+
+
+class EventLog:
+    def __init__(self):
+        self._package_events = {}  # package ID -> Event list sorted by minute
+        self._truck_events = {}  # truck ID -> Event list sorted by minute
+        self.package_truck = {}  # package ID -> truck ID it was loaded on
+        self.deadlines = {}  # package ID -> deadline in minutes since midnight
+
+    def record(self, when, kind, package_id=None, truck_id=None, location=None, miles=None):
+        """
+        Records an event. Events recorded out of time order are inserted at their place in time,
+        after any events already recorded for the same minute, so every log stays sorted.
+
+        when: datetime/time of the event, or minutes since midnight (a fractional minute is cut to the whole minute)
+        kind: One of the event kind constants in this module
+        """
+        minute = int(when) if isinstance(when, (int, float)) else time_to_minutes(when)
+        event = Event(minute, kind, package_id, truck_id, location, miles)
+
+        if package_id is not None:
+            insort(self._package_events.setdefault(package_id, []), event, key=_event_minute)
+            if kind == LOADED:
+                self.package_truck[package_id] = truck_id
+        elif truck_id is not None:
+            insort(self._truck_events.setdefault(truck_id, []), event, key=_event_minute)
+        return event
+
+    def register_package(self, package):
+        """
+        Remembers a package's deadline so lateness can be answered from the log alone.
+        """
+        self.deadlines[package.packageID] = package.deadlineMinutes
+
+    def package_events(self, package_id, minute=None):
+        """
+        Returns the package's events, or only those up to and including minute.
+        """
+        events = self._package_events.get(package_id, [])
+        if minute is None:
+            return list(events)
+        return events[:bisect_right(events, minute, key=_event_minute)]
+
+    def truck_events(self, truck_id, minute=None):
+        """
+        Returns the truck's events, or only those up to and including minute.
+        """
+        events = self._truck_events.get(truck_id, [])
+        if minute is None:
+            return list(events)
+        return events[:bisect_right(events, minute, key=_event_minute)]
+
+    def all_package_events(self):
+        """
+        Returns an iterator over every package event of the day in time order.
+        """
+        return merge(*self._package_events.values(), key=_event_minute)
+
+    def packages_for_truck(self, truck_id):
+        """
+        Returns the sorted IDs of every package loaded on a truck.
+        """
+        return sorted(package_id for package_id, truck in self.package_truck.items() if truck == truck_id)
+
+    def package_ids(self):
+        """
+        Returns the sorted IDs of every package with at least one event.
+        """
+        return sorted(self._package_events)
+
+    def status_at(self, package_id, minute):
+        """
+        Returns a tuple of (status, late) for a package at minute (minutes since midnight).
+
+        Status is one of "Delivered", "Cancelled", "Erroneous" (the address is wrong until its correction),
+        "En Route", "Not At Hub Yet" or "At Hub". A package is late if it was delivered after its
+        deadline, or is still undelivered at or after its deadline.
+        Nothing is mutated, so queries can be made in any order.
+        """
+        events = self._package_events.get(package_id, [])
+        seen = events[:bisect_right(events, minute, key=_event_minute)]
+        deadline = self.deadlines.get(package_id)
+
+        delivered = departed = cancelled = False
+        for event in seen:
+            if event.kind == DELIVERED:
+                delivered = event
+            elif event.kind == DEPARTED:
+                departed = True
+            elif event.kind == CANCELLED:
+                cancelled = True
+
+        if delivered:
+            return "Delivered", deadline is not None and delivered.minute > deadline
+        if cancelled:
+            return "Cancelled", False
+
+        # Anything still ahead in the log tells us what the package is waiting for
+        pending = {event.kind for event in events[len(seen):]}
+        late = deadline is not None and deadline <= minute
+        if ADDRESS_CORRECTED in pending:
+            return "Erroneous", False
+        if departed:
+            return "En Route", late
+        if HUB_ARRIVAL in pending:
+            return "Not At Hub Yet", late
+        return "At Hub", late
+
+    def discard_package_events(self, package_id, kinds):
+        """
+        Removes the package's events of the given kinds, used when a recorded plan is changed.
+        Removing LOADED events also forgets the truck the package was loaded on.
+
+        kinds: Collection of event kind constants
+
+        Returns the number of events removed.
+        """
+        events = self._package_events.get(package_id, [])
+        kept = [event for event in events if event.kind not in kinds]
+        self._package_events[package_id] = kept
+        if LOADED in kinds:
+            self.package_truck.pop(package_id, None)
+        return len(events) - len(kept)
+
+    def replace_truck_events(self, truck_id, start, stop, new_events):
+        """
+        Replaces the truck's events at positions start to stop (in truck_events order) with new_events.
+        new_events must be in time order and fit between the events kept on either side, so the log stays sorted.
+        """
+        self._truck_events.setdefault(truck_id, [])[start:stop] = new_events
+
+    def first_event(self, package_id, kind):
+        """
+        Returns the package's first event of a kind, or None.
+        """
+        for event in self._package_events.get(package_id, []):
+            if event.kind == kind:
+                return event
+        return None
+
+    @classmethod
+    def from_plan(cls, trucks, package_table):
+        """
+        Rebuilds an event log from the results already stored on planned trucks and packages.
+        Used when a report is asked for without the log recorded by plan_deliveries.
+        """
+        log = cls()
+        trucks_by_id = {truck.truckID: truck for truck in trucks}
+        for package in package_table.values():
+            log.register_package(package)
+            if package.hubArrivalTime:
+                log.record(package.hubArrivalTime, HUB_ARRIVAL, package.packageID)
+            if package.updateTime and package.oldAddress:
+                log.record(package.updateTime, ADDRESS_CORRECTED, package.packageID, location=package.address)
+            truck = trucks_by_id.get(package.assignedTruck)
+            if truck is not None and truck.departTime != datetime.max:
+                log.record(truck.departTime, LOADED, package.packageID, truck.truckID)
+                log.record(truck.departTime, DEPARTED, package.packageID, truck.truckID)
+            if package.deliveryTime:
+                log.record(package.deliveryTime, DELIVERED, package.packageID, package.assignedTruck, package.address)
+
+        for truck in trucks:
+            if truck.departTime != datetime.max:
+                log.record(truck.departTime, DEPARTED, truck_id=truck.truckID, miles=0.0)
+            if truck.returnTime:
+                log.record(truck.returnTime, RETURNED, truck_id=truck.truckID, miles=truck.milesTotal)
+        return log
+
+
+def _event_minute(event):
+    return event.minute
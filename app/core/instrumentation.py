@@ -0,0 +1,164 @@
+"""
+This module contains the opt-in instrumentation of the planner: operation counters, wall-clock stage timers
+and an optional cProfile dump.
+
+Nothing is measured unless a session is active:
+
+    with instrumentation.session(profile_path="plan.pstats") as stats:
+        plan_deliveries(trucks, package_table, context)
+    print(stats.summary())
+
+The planner's phases are wrapped in `stage(name)` and the report functions are decorated with `timed(name)`.
+Code that already counts its loop iterations (the route constructors, local search, delivery) adds its totals with
+`count(name, amount)` once per call, never inside the per-stop or per-move loops. Hash tables add up their lookups
+and probed slots themselves while a session is active (see hash_table.count_probes).
+
+With no session active, stage() returns a shared no-op context manager and count() returns at once, so each hook
+costs one global check. Counters only cover work done in this process, not in optimize_routes worker processes.
+
+Run the program with a summary table and a pstats file with:
+    python -m app.main --profile
+"""
+import cProfile
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from app.models import hash_table
+
+# Counter names used by the planner
+DISTANCE_LOOKUPS = "distance_lookups"  # Distance matrix reads by the loading sort, route constructors, local search and delivery
+GREEDY_STEPS = "greedy_steps"  # Stops chosen by the nearest-neighbour sort
+INSERTION_CANDIDATES = "insertion_candidates"  # Route positions checked by the insertion constructor
+LOCAL_SEARCH_MOVES = "local_search_moves"  # Candidate 2-opt / Or-opt moves evaluated
+LOCAL_SEARCH_APPLIED = "local_search_applied"  # Moves that shortened a route
+STOPS_DRIVEN = "stops_driven"  # Stops driven by deliver_packages
+HASH_LOOKUPS = "hash_lookups"  # Package table lookups, inserts and removals
+HASH_PROBES = "hash_probes"  # Package table slots probed by those operations
+
+# Session being recorded, None when instrumentation is off
+_active = None
+
+# Returned by stage() when no session is active, nullcontext can be entered any number of times
+_NO_STAGE = nullcontext()
+
+
+class Instrumentation:
+    def __init__(self, profile_path=None):
+        """
+        profile_path: File the cProfile statistics are written to when the session ends, None to skip profiling
+        """
+        self.profile_path = profile_path
+        self.counters = {}  # counter name -> total
+        self.stages = {}  # stage name -> [calls, seconds]
+        self.seconds = 0.0  # Wall-clock length of the session
+        self.profiler = cProfile.Profile() if profile_path else None
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Times the block as one call of a stage. Nested stages are timed separately, each including its inner stages.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            totals = self.stages.setdefault(name, [0, 0.0])
+            totals[0] += 1
+            totals[1] += elapsed
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def summary(self):
+        """
+        Returns the per-stage timings and the counters as a text table.
+        """
+        lines = [f"{'Stage':<24}{'Calls':>8}{'Seconds':>12}{'Share':>8}"]
+        for name, (calls, seconds) in self.stages.items():
+            share = seconds / self.seconds * 100 if self.seconds else 0.0
+            lines.append(f"{name:<24}{calls:>8}{seconds:>12.4f}{share:>7.1f}%")
+        lines.append(f"{'session':<24}{'':>8}{self.seconds:>12.4f}")
+
+        if self.counters:
+            lines.append("")
+            lines.append(f"{'Counter':<24}{'Total':>14}")
+            for name, total in self.counters.items():
+                lines.append(f"{name:<24}{total:>14,}")
+        if self.profile_path:
+            lines.append(f"\ncProfile statistics written to {self.profile_path} (python -m pstats {self.profile_path})")
+        return "\n".join(lines)
+
+
+def active():
+    """
+    Returns the Instrumentation being recorded, or None when instrumentation is off.
+    """
+    return _active
+
+
+@contextmanager
+def session(profile_path=None):
+    """
+    Records counters and stage timings (and cProfile statistics if profile_path is given) for the block.
+
+    profile_path: File the pstats data is written to when the block ends
+
+    Yields the Instrumentation, which still holds the results after the block.
+    Raises RuntimeError if a session is already active.
+    """
+    global _active
+    if _active is not None:
+        raise RuntimeError("An instrumentation session is already active")
+
+    stats = Instrumentation(profile_path)
+    probe_counts = [0, 0]  # Lookups and probed slots of every hash table
+    hash_table.count_probes(probe_counts)
+    _active = stats
+    start = time.perf_counter()
+    if stats.profiler:
+        stats.profiler.enable()
+    try:
+        yield stats
+    finally:
+        if stats.profiler:
+            stats.profiler.disable()
+        stats.seconds = time.perf_counter() - start
+        _active = None
+        hash_table.count_probes(None)
+        stats.count(HASH_LOOKUPS, probe_counts[0])
+        stats.count(HASH_PROBES, probe_counts[1])
+        if stats.profiler:
+            stats.profiler.dump_stats(profile_path)
+
+
+def stage(name):
+    """
+    Returns a context manager that times its block as the named stage, or a no-op one when instrumentation is off.
+    """
+    if _active is None:
+        return _NO_STAGE
+    return _active.stage(name)
+
+
+def count(name, amount=1):
+    """
+    Adds amount to a counter, does nothing when instrumentation is off.
+    """
+    if _active is not None:
+        _active.count(name, amount)
+
+
+def timed(name):
+    """
+    Decorator that times every call of a function as the named stage while instrumentation is on.
+    """
+    def decorate(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if _active is None:
+                return function(*args, **kwargs)
+            with _active.stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,172 @@
+"""
+This module contains the local search stage that improves a truck route after the greedy sort.
+
+The `improve_route` function applies 2-opt (reverse a run of stops) and Or-opt (move a run of 1-3 stops
+elsewhere) moves. Every move is scored in O(1) from the distance matrix by only looking at the edges it
+breaks and creates. A move is only applied when it shortens the route and keeps every deadline stop that
+was on time still on time. The search stops at a local optimum or when its iteration budget runs out, so the
+same route always gives the same result. Callers that prefer a bounded running time can add a wall-clock budget.
+
+The distance matrix is assumed to be symmetric, which load_distance_data guarantees by mirroring.
+"""
+import time
+from math import inf
+from app.core import instrumentation
+
+# Moves must save more than this many miles, so floating point noise never loops forever
+EPSILON = 1e-9
+
+
+def route_miles(route, distance_matrix):
+    """
+    Returns the total miles of a route given as a list of location IDs.
+    """
+    data = distance_matrix.data
+    size = distance_matrix.size
+    return sum(data[a * size + b] for a, b in zip(route, route[1:]))
+
+
+def arrival_minutes(route, distance_matrix, start_minute, speed):
+    """
+    Returns the arrival time (minutes since midnight) at every location in route.
+
+    route: List of location IDs, the first entry is where the truck starts
+    start_minute: Departure time in minutes since midnight
+    speed: Truck speed in miles per hour
+    """
+    data = distance_matrix.data
+    size = distance_matrix.size
+    minutes_per_mile = 60 / speed
+    arrivals = [start_minute]
+    current = start_minute
+    for a, b in zip(route, route[1:]):
+        current += data[a * size + b] * minutes_per_mile
+        arrivals.append(current)
+    return arrivals
+
+
+def late_stops(route, distance_matrix, start_minute, speed, deadlines):
+    """
+    Returns the set of stops in route that are reached after their deadline.
+
+    deadlines: Dict of location ID -> deadline in minutes since midnight (stops without one are ignored)
+    """
+    arrivals = arrival_minutes(route, distance_matrix, start_minute, speed)
+    return {stop for stop, arrival in zip(route, arrivals)
+            if stop in deadlines and arrival > deadlines[stop]}
+
+
+def improve_route(stops, start_id, end_id, distance_matrix, start_minute=0.0, speed=18, deadlines=None,
+                  max_iterations=200_000, time_limit=None):
+    """
+    Improves the order of stops with 2-opt and Or-opt moves.
+
+    stops: List of location IDs to visit, in their current order
+    start_id: Location ID the truck departs from
+    end_id: Location ID the truck returns to
+    distance_matrix: DistanceMatrix shared by the routing code
+    start_minute: Departure time in minutes since midnight, used for deadline checks
+    speed: Truck speed in miles per hour
+    deadlines: Dict of location ID -> deadline in minutes since midnight, or None to ignore deadlines
+    max_iterations: Maximum number of candidate moves to evaluate
+    time_limit: Maximum wall-clock seconds to spend, or None (the default) to stop on max_iterations only.
+                A time limit makes the result depend on how fast the machine is at the moment.
+
+    Returns a tuple of (improved list of stops, miles saved).
+    """
+    route = [start_id] + list(stops) + [end_id]
+    n = len(route)
+    if n < 4:
+        return list(stops), 0.0
+
+    data = distance_matrix.data
+    size = distance_matrix.size
+    deadlines = deadlines or {}
+    starting_miles = route_miles(route, distance_matrix)
+    allowed_late = late_stops(route, distance_matrix, start_minute, speed, deadlines) if deadlines else set()
+
+    # Route evaluations (route_miles and late_stops) and move scans, for the distance lookup counter
+    route_scans = 3 if deadlines else 2
+    move_scans = 0
+
+    def deadline_ok(candidate):
+        # A move may not make any deadline stop late that is on time in the starting route
+        nonlocal route_scans
+        if not deadlines:
+            return True
+        route_scans += 1
+        return late_stops(candidate, distance_matrix, start_minute, speed, deadlines) <= allowed_late
+
+    iterations = 0
+    applied = 0
+    stop_at = time.perf_counter() + time_limit if time_limit is not None else inf
+    improved = True
+
+    while improved and iterations < max_iterations and time.perf_counter() < stop_at:
+        improved = False
+
+        # 2-opt: reverse route[i..j], replacing edges (i-1, i) and (j, j+1) with (i-1, j) and (i, j+1)
+        for i in range(1, n - 2):
+            a = route[i - 1]
+            b = route[i]
+            a_row = a * size
+            b_row = b * size
+            removed_ab = data[a_row + b]
+            move_scans += 1
+            for j in range(i + 1, n - 1):
+                c = route[j]
+                d = route[j + 1]
+                iterations += 1
+                delta = data[a_row + c] + data[b_row + d] - removed_ab - data[c * size + d]
+                if delta < -EPSILON:
+                    candidate = route[:i] + route[i:j + 1][::-1] + route[j + 1:]
+                    if deadline_ok(candidate):
+                        route = candidate
+                        improved = True
+                        applied += 1
+                        break
+            if improved or iterations >= max_iterations:
+                break
+
+        if improved:
+            continue
+
+        # Or-opt: move route[i..i+length-1] so it sits between route[k] and route[k+1]
+        for length in (1, 2, 3):
+            for i in range(1, n - length):
+                last = i + length - 1
+                first_stop = route[i]
+                last_stop = route[last]
+                before = route[i - 1]
+                after = route[last + 1]
+                removal_gain = (data[before * size + first_stop] + data[last_stop * size + after]
+                                - data[before * size + after])
+                move_scans += 3
+                for k in range(n - 1):
+                    if i - 1 <= k <= last:
+                        continue
+                    iterations += 1
+                    left = route[k]
+                    right = route[k + 1]
+                    insertion_cost = (data[left * size + first_stop] + data[last_stop * size + right]
+                                      - data[left * size + right])
+                    if insertion_cost - removal_gain < -EPSILON:
+                        segment = route[i:last + 1]
+                        rest = route[:i] + route[last + 1:]
+                        position = k + 1 if k < i else k + 1 - length
+                        candidate = rest[:position] + segment + rest[position:]
+                        if deadline_ok(candidate):
+                            route = candidate
+                            improved = True
+                            applied += 1
+                            break
+                if improved or iterations >= max_iterations:
+                    break
+            if improved or iterations >= max_iterations:
+                break
+
+    # Every candidate move reads three distances
+    instrumentation.count(instrumentation.LOCAL_SEARCH_MOVES, iterations)
+    instrumentation.count(instrumentation.LOCAL_SEARCH_APPLIED, applied)
+    instrumentation.count(instrumentation.DISTANCE_LOOKUPS, 3 * iterations + move_scans + route_scans * (n - 1))
+    return route[1:-1], starting_miles - route_miles(route, distance_matrix)
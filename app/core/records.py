@@ -0,0 +1,34 @@
+"""
+This module contains the structured records produced by the report and routing functions.
+
+Reports are built as these records first and rendered afterwards (see report_render), so the same
+report can be printed as text, written as JSON Lines or CSV, or loaded into a columnar table.
+Times are kept as datetime objects and only formatted by the renderers.
+"""
+from collections import namedtuple
+
+# One package at one report time
+# status: "Delivered", "Cancelled", "En Route", "At Hub", "Not At Hub Yet" or "Erroneous", late: True if late at that time
+PackageRow = namedtuple("PackageRow", [
+    "package_id", "truck_id", "status", "late", "address", "old_address", "deadline", "delivery_time", "update_time",
+])
+
+# One truck at one report time
+# state: "Not Departed", "En Route" or "Returned", packages: PackageRow list sorted by package ID
+TruckSummary = namedtuple("TruckSummary", [
+    "truck_id", "state", "return_time", "delivered", "remaining", "erroneous", "miles", "packages",
+])
+
+# The whole fleet at one report time
+FleetReport = namedtuple("FleetReport", ["time", "trucks", "total_miles"])
+
+# One stop on a driven route: arrival time, address, and the package IDs delivered there (late ones listed again)
+StopRecord = namedtuple("StopRecord", ["time", "address", "package_ids", "late_package_ids"])
+
+# One driven route as returned by deliver_packages
+RouteSummary = namedtuple("RouteSummary", [
+    "truck_id", "depart_time", "return_time", "miles", "miles_saved", "packages_delivered", "stops",
+])
+
+# One trip of the multi-trip scheduler: which truck and driver drove it, and the RouteSummary of the trip
+TripRecord = namedtuple("TripRecord", ["trip_id", "truck_id", "driver_id", "route"])
@@ -0,0 +1,261 @@
+"""
+This module contains the LivePlan class, which changes a planned day while it is being driven.
+
+plan_deliveries and plan_trips plan the whole day up front. When something changes during the day (a package is
+delayed, its address is corrected or it is cancelled) a LivePlan applies the change at the current time:
+- the legs the truck has already driven, and the leg it is driving, are kept as they are
+- the remaining stops of that trip are ordered again from where the current leg ends (greedy order plus local search)
+- the truck's timeline, the packages and the event log are rewritten for that trip only
+
+Other trucks and the truck's other trips are not touched. A trip's packages are found with a binary search over
+the truck's delivery times, so a change costs time in proportion to the trip's remaining stops, not to the fleet.
+A truck's later trips keep their times, so a change that would bring the truck back after its next trip leaves is refused.
+"""
+import copy
+import logging
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+from app.core import events
+from app.core.constraints import AddressCorrection
+from app.core.records import RouteSummary, StopRecord
+from app.core.routing import apply_address_correction, drive_leg, optimize_route
+from app.core.routing_context import get_default_context
+from app.models.package import time_to_minutes
+from app.models.timeline import to_minutes
+from app.models.truck import Truck
+
+logger = logging.getLogger(__name__)
+
+# Changes a LivePlan can apply
+# arrival: time the package now reaches the hub
+PackageDelayed = namedtuple("PackageDelayed", ["package_id", "arrival"])
+# address, zip_code: the corrected address (zip_code None keeps the package's zip code)
+AddressChanged = namedtuple("AddressChanged", ["package_id", "address", "zip_code"], defaults=[None])
+PackageCancelled = namedtuple("PackageCancelled", ["package_id"])
+
+# Result of LivePlan.apply
+# truck_id: truck carrying the package (None if it was on no route), route: RouteSummary of the re-planned rest
+# of the trip (None if no route changed), unassigned: package IDs now on no truck that need a later trip
+ReplanResult = namedtuple("ReplanResult", ["truck_id", "route", "unassigned"])
+
+
+class LivePlan:
+    def __init__(self, trucks, package_table, event_log, context=None, improve=True, constructor="greedy"):
+        """
+        trucks: List of planned Truck objects
+        package_table: HashTable containing all packages
+        event_log: EventLog of the planned day, as returned by plan_deliveries or plan_trips
+        context: RoutingContext with the address and distance data (defaults to the shared context)
+        improve: If True, re-planned stops are improved with local search
+        constructor: Route constructor used to re-plan, "greedy" or "insertion" (see ROUTE_CONSTRUCTORS)
+        """
+        self.trucks = {truck.truckID: truck for truck in trucks}
+        self.package_table = package_table
+        self.event_log = event_log
+        self.context = context or get_default_context()
+        self.improve = improve
+        self.constructor = constructor
+
+        # truck ID -> delivery minutes and package IDs in delivery order, searched with bisect
+        self._delivery_minutes = {}
+        self._delivery_ids = {}
+        deliveries = sorted((package.assignedTruck, to_minutes(package.deliveryTime), package.packageID)
+                            for package in package_table.values()
+                            if package.deliveryTime is not None and package.assignedTruck in self.trucks)
+        for truck_id, minute, package_id in deliveries:
+            self._delivery_minutes.setdefault(truck_id, []).append(minute)
+            self._delivery_ids.setdefault(truck_id, []).append(package_id)
+
+    def apply(self, change, now):
+        """
+        Applies a change known at `now` and re-plans the rest of the trip carrying the package.
+
+        change: PackageDelayed, AddressChanged or PackageCancelled
+        now: datetime the change becomes known
+
+        Returns a ReplanResult.
+        Raises KeyError if the package is unknown, and ValueError if the change cannot happen at `now`
+        (the package was already delivered or has left the hub) or would make the truck miss its next trip.
+        """
+        package = self.package_table.search(change.package_id)
+        if package is None:
+            raise KeyError(f"Package {change.package_id} is not in the package table")
+        if package.status == "Cancelled":
+            raise ValueError(f"Package {package.packageID} was cancelled")
+        if isinstance(change, AddressChanged) and self.context.address_index.lookup(change.address) is None:
+            raise ValueError(f"Address '{change.address}' for package {package.packageID} is not in the address index")
+
+        trip = self._find_trip(package)
+        if trip is None:
+            # Not on any planned route, only the package and its events change
+            self._change_package(change, package, now, loaded=False)
+            unassigned = [] if isinstance(change, PackageCancelled) else [package.packageID]
+            return ReplanResult(None, None, unassigned)
+
+        truck, first, last = trip
+        timeline = truck.timeline
+        now_minute = to_minutes(now)
+        departed = now_minute >= timeline.start_minutes[first]
+        if to_minutes(package.deliveryTime) <= now_minute:
+            raise ValueError(f"Package {package.packageID} was already delivered at {package.deliveryTime.strftime('%I:%M %p')}")
+
+        if isinstance(change, PackageDelayed):
+            if departed:
+                raise ValueError(f"Package {package.packageID} already left the hub on truck {truck.truckID}")
+            if to_minutes(change.arrival) <= timeline.start_minutes[first]:
+                # Still at the hub before the truck leaves, so the route stays the same
+                self._change_package(change, package, now, loaded=True)
+                return ReplanResult(truck.truckID, None, [])
+
+        # Legs up to the one being driven are kept, the trip is re-planned from where that leg ends
+        frozen = min(timeline.leg_at(now_minute), last) if departed else first - 1
+        if frozen < first:
+            resume_minute = timeline.start_minutes[first]
+            resume_location, resume_miles = timeline.from_locations[first], timeline.start_miles[first]
+        else:
+            resume_minute = timeline.end_minutes[frozen]
+            resume_location, resume_miles = timeline.to_locations[frozen], timeline.end_miles[frozen]
+        day = datetime.combine(package.deliveryTime.date(), time())
+        resume_time = day + timedelta(minutes=resume_minute)
+
+        # Packages still to be delivered on this trip, the changed package first
+        minutes = self._delivery_minutes[truck.truckID]
+        package_ids = self._delivery_ids[truck.truckID]
+        low = bisect_right(minutes, min(now_minute, resume_minute))
+        high = bisect_right(minutes, timeline.end_minutes[last])
+        affected = [package.packageID] + [package_id for package_id in package_ids[bisect_right(minutes, resume_minute):high]
+                                          if package_id != package.packageID]
+
+        route_packages = [self.package_table.search(package_id) for package_id in affected[1:]]
+        if isinstance(change, AddressChanged):
+            # Planned on a corrected copy, the package itself only changes once the new route is accepted
+            corrected = copy.copy(package)
+            apply_address_correction(corrected, AddressCorrection(now.time(), change.address, change.zip_code), self.context)
+            route_packages.append(corrected)
+
+        scratch, stops, miles_saved = self._drive(truck, route_packages, resume_location, resume_time, resume_miles)
+        if last + 1 < len(timeline) and to_minutes(scratch.current_time) > timeline.start_minutes[last + 1]:
+            raise ValueError(f"Truck {truck.truckID} would be back at {scratch.current_time.strftime('%I:%M %p')}, "
+                             f"after its next trip leaves")
+
+        # The new route is accepted: change the package, then rewrite the trip
+        self._change_package(change, package, now, loaded=departed)
+        old_return = day + timedelta(minutes=timeline.end_minutes[last])
+        last_trip = last + 1 == len(timeline)
+        old_stops = len(set(minutes[bisect_right(minutes, resume_minute):high]))  # One arrival per delivery time
+        self._rewrite_truck_events(truck, old_return, old_stops, stops, scratch)
+        truck.replace_legs(frozen + 1, last + 1, scratch)
+        if last_trip:
+            # The truck's day now ends with the new route
+            truck.current_time = truck.returnTime = scratch.current_time
+            truck.currentLocation = scratch.currentLocation
+
+        stop_records = []
+        delivered = []
+        for stop_time, address, stop_packages, _ in stops:
+            record = StopRecord(stop_time, address, [], [])
+            for stop_package in stop_packages:
+                stop_package = self.package_table.search(stop_package.packageID)
+                self.event_log.discard_package_events(stop_package.packageID, (events.DELIVERED,))
+                stop_package.deliveryTime = stop_time
+                stop_package.status = "Delivered"
+                stop_package.was_late = time_to_minutes(stop_time) > stop_package.deadlineMinutes
+                self.package_table.insert(stop_package.packageID, stop_package)
+                self.event_log.record(stop_time, events.DELIVERED, stop_package.packageID, truck.truckID, address)
+                record.package_ids.append(stop_package.packageID)
+                if stop_package.was_late:
+                    record.late_package_ids.append(stop_package.packageID)
+                delivered.append((to_minutes(stop_time), stop_package.packageID))
+            stop_records.append(record)
+
+        # Keep the delivery index in step: drop the re-planned packages and add their new times
+        kept = [(minute, package_id) for minute, package_id in zip(minutes[low:high], package_ids[low:high])
+                if package_id not in affected]
+        window = sorted(kept + delivered)
+        minutes[low:high] = [minute for minute, _ in window]
+        package_ids[low:high] = [package_id for _, package_id in window]
+
+        unassigned = [package.packageID] if isinstance(change, PackageDelayed) else []
+        route = RouteSummary(truck.truckID, resume_time, scratch.current_time, scratch.milesTotal - resume_miles,
+                             miles_saved, len(delivered), stop_records)
+        logger.info("Re-planned Truck %s from %s at %s: %s stops left, back at the hub at %s.", truck.truckID,
+                    resume_location, resume_time.strftime('%I:%M %p'), len(stops), scratch.current_time.strftime('%I:%M %p'))
+        return ReplanResult(truck.truckID, route, unassigned)
+
+    def _find_trip(self, package):
+        # (truck, first leg, return leg) of the trip that delivers the package in the plan, or None
+        truck = self.trucks.get(package.assignedTruck)
+        if truck is None or package.deliveryTime is None or not len(truck.timeline):
+            return None
+        first, last = truck.timeline.trip_at(truck.timeline.leg_at(package.deliveryTime))
+        return truck, first, last
+
+    def _drive(self, truck, packages, start_location, start_time, start_miles):
+        # Orders and drives the packages on a scratch copy of the truck, nothing in the plan is changed
+        scratch = Truck(truck.truckID, truck.speed, start_location, start_time, truck.capacity)
+        scratch.milesTotal = start_miles
+        scratch.packageInventory = list(packages)
+        miles_saved = optimize_route(scratch, self.context, self.improve, self.constructor)
+
+        current_index = self.context.address_index.lookup(start_location)
+        stops = []  # (arrival time, address, packages delivered, miles at arrival)
+        for package in scratch.packageInventory:
+            if stops and package.locationID == current_index:
+                stops[-1][2].append(package)
+                continue
+            drive_leg(scratch, current_index, package.locationID, package.get_address(), self.context)
+            current_index = package.locationID
+            stops.append((scratch.current_time, package.get_address(), [package], scratch.milesTotal))
+        drive_leg(scratch, current_index, self.context.hub_index, self.context.hub_address, self.context)
+        scratch.return_to_hub(self.context.hub_address)
+        return scratch, stops, miles_saved
+
+    def _change_package(self, change, package, now, loaded):
+        # Applies the change to the package and its events, loaded: the package stays on its truck
+        log = self.event_log
+        if isinstance(change, AddressChanged):
+            apply_address_correction(package, AddressCorrection(now.time(), change.address, change.zip_code),
+                                     self.context, log)
+            return
+
+        unloaded = (events.DELIVERED,) if loaded else (events.LOADED, events.DEPARTED, events.DELIVERED)
+        if isinstance(change, PackageDelayed):
+            arrival = change.arrival if isinstance(change.arrival, datetime) else datetime.combine(now.date(), change.arrival)
+            package.hubArrivalTime = arrival
+            log.discard_package_events(package.packageID, (events.HUB_ARRIVAL,))
+            log.record(arrival, events.HUB_ARRIVAL, package.packageID)
+            if loaded:
+                return  # Still in time for its truck
+            log.discard_package_events(package.packageID, unloaded)
+            package.status = "Not At Hub Yet"
+        else:
+            log.discard_package_events(package.packageID, unloaded)
+            package.status = "Cancelled"
+            log.record(now, events.CANCELLED, package.packageID, package.assignedTruck)
+        package.deliveryTime = None
+        package.was_late = False
+        if not loaded:
+            package.assignedTruck = None
+        self.package_table.insert(package.packageID, package)
+
+    def _rewrite_truck_events(self, truck, old_return, old_stops, stops, scratch):
+        # Replaces the trip's arrivals after the kept legs and its return, and moves the miles of later events
+        truck_events = self.event_log.truck_events(truck.truckID)
+        minute = time_to_minutes(old_return)
+        returned = next((position for position, event in enumerate(truck_events)
+                         if event.kind == events.RETURNED and event.minute >= minute), None)
+        if returned is None:
+            return
+        start = returned
+        while start > 0 and returned - start < old_stops and truck_events[start - 1].kind == events.ARRIVED:
+            start -= 1
+
+        shift = scratch.milesTotal - truck_events[returned].miles
+        new_events = [events.Event(time_to_minutes(stop_time), events.ARRIVED, None, truck.truckID, address, miles)
+                      for stop_time, address, _, miles in stops]
+        new_events.append(events.Event(time_to_minutes(scratch.returnTime), events.RETURNED, None, truck.truckID,
+                                       scratch.currentLocation, scratch.milesTotal))
+        new_events += [event._replace(miles=event.miles + shift) if event.miles is not None else event
+                       for event in truck_events[returned + 1:]]
+        self.event_log.replace_truck_events(truck.truckID, start, len(truck_events), new_events)
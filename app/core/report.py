@@ -2,265 +2,320 @@
 This module contains functions to generate reports for the delivery routing program.
 
 The `miles_traveled` function calculates the total miles traveled by a truck at a specific time.
+The `build_report` and `build_packageStatus` functions build the fleet report or a single package's status as records.
 The `generate_report` function generates a report showing the status of trucks and packages at a specific time.
 The `generate_packageStatus` function generates a report showing the status of a single package at a specific time.
+Rendering the records as text, JSON Lines, CSV or Parquet is done by report_render.
+The `iter_report_snapshots` function produces the fleet report for many times in a single pass over the event log.
+The `build_truckCounts` function counts every truck's packages at a time from the columns of a PackageBatch.
 """
+import sys
+from collections import namedtuple
 from datetime import datetime
-
-def miles_traveled(set_time, truck, delivered_count):
+from app.models.package import time_to_minutes
+from app.models.package_batch import NONE
+from app.models.timeline import EN_ROUTE, NOT_DEPARTED, RETURNED
+from app.core import events, instrumentation
+from app.core.events import EventLog
+from app.core.records import FleetReport, PackageRow, TruckSummary
+from app.core.report_render import render_package_status_text, render_report_text
+
+# Counts and miles for one truck at one report time
+TruckSnapshot = namedtuple("TruckSnapshot", ["delivered", "remaining", "erroneous", "miles"])
+
+# Fleet report at one time: minute, truck ID -> TruckSnapshot, total miles,
+# and package ID -> (status, late) for every package whose status or late flag changed since the previous snapshot
+ReportSnapshot = namedtuple("ReportSnapshot", ["minute", "trucks", "total_miles", "changes"])
+
+def miles_traveled(set_time, truck):
     """
     Calculates the total miles traveled by a truck at a specific time.
+    The truck's timeline is searched for the leg it is driving at `set_time`, and miles are interpolated within it.
 
     set_time: datetime object indicating the time at which the miles are calculated
     truck: Truck object for which miles are calculated
-    delivered_count: Number of packages delivered by the truck up to `set_time`
 
     Returns the total miles traveled by the truck at `set_time`.
     """
-    # If the truck hasn't left yet, return 0 miles
-    if truck.departTime.time() > set_time.time():
-        return 0
+    return truck.position_at(set_time).miles
+
+
+def _parse_report_time(set_time):
+    # Report times come from the menu as 'HH:MM AM/PM' strings
+    if isinstance(set_time, str):
+        return datetime.strptime(set_time, '%I:%M %p')
+    return set_time
+
+
+def _package_row(package, truck_id, status, late):
+    # PackageRow for a package and the status the event log gives it, with the address it had at that time
+    address = package.oldAddress if status == "Erroneous" and package.oldAddress else package.get_address()
+    return PackageRow(package.packageID, truck_id, status, late, address, package.oldAddress,
+                      package.deadline, package.deliveryTime if status == "Delivered" else None, package.updateTime)
+
+
+@instrumentation.timed("build_report")
+def build_report(set_time, trucks, package_table, event_log=None):
+    """
+    Builds the fleet report at a specific time as structured records.
+    Package statuses come from the event log, so building a report never changes any package.
 
-    # If the truck has returned before set_time, return full miles traveled
-    if truck.returnTime and truck.returnTime.time() <= set_time.time():
-        return truck.milesTotal
+    set_time: 'HH:MM AM/PM' string or datetime at which the report is taken
+    trucks: List of Truck objects
+    package_table: HashTable containing all packages
+    event_log: EventLog returned by plan_deliveries (rebuilt from the trucks and packages if omitted)
 
-    # Find the number of packages delivered up to `set_time`
-    delivered_count = delivered_count
+    Returns a FleetReport.
+    """
+    set_time = _parse_report_time(set_time)
+    set_minutes = time_to_minutes(set_time)
+    if event_log is None:
+        event_log = EventLog.from_plan(trucks, package_table)
 
-    # If no packages were delivered yet, return 0 miles
-    if delivered_count == 0:
-        return 0
+    truck_summaries = []
+    for truck in trucks:
+        # Check if the truck has completed deliveries or still in transit or returned to the hub
+        if truck.departTime.time() > set_time.time():
+            state = NOT_DEPARTED
+        elif truck.returnTime.time() <= set_time.time():
+            state = RETURNED
+        else:
+            state = EN_ROUTE
 
-    # Use the delivery count as an index to get the miles traveled from the list
-    return truck.milesTotal_list[min(delivered_count - 1, len(truck.milesTotal_list) - 1)]
+        # Look up each of the truck's packages once, with its status and late flag at set_time
+        rows = [_package_row(package_table.search(package_id), truck.truckID, *event_log.status_at(package_id, set_minutes))
+                for package_id in event_log.packages_for_truck(truck.truckID)]
 
+        delivered_count = sum(1 for row in rows if row.status == "Delivered")
+        remaining_count = sum(1 for row in rows if row.status in ("En Route", "At Hub"))
+        erroneous_count = sum(1 for row in rows if row.status == "Erroneous")
 
+        truck_summaries.append(TruckSummary(truck.truckID, state, truck.returnTime, delivered_count, remaining_count,
+                                            erroneous_count, miles_traveled(set_time, truck), rows))
 
+    return FleetReport(set_time, truck_summaries, sum(summary.miles for summary in truck_summaries))
 
 
-def generate_report(set_time, trucks, package_table):
+def generate_report(set_time, trucks, package_table, event_log=None, stream=None):
     """
     Generates a report showing the status of trucks and packages at a specific time.
+    The report is built as records and written as text in a single write.
 
-    set_time: datetime object indicating the time at which the report is generated
+    set_time: 'HH:MM AM/PM' string or datetime at which the report is generated
     trucks: List of Truck objects
     package_table: HashTable containing all packages
+    event_log: EventLog returned by plan_deliveries (rebuilt from the trucks and packages if omitted)
+    stream: Stream the text is written to (standard output if omitted)
 
-    Returns the generated report.
+    Returns the generated FleetReport.
     """
+    report = build_report(set_time, trucks, package_table, event_log)
+    (stream or sys.stdout).write(render_report_text(report))
+    return report
 
-    set_time = datetime.strptime(set_time, '%I:%M %p')
-    
-    print(f"\nGenerated Report at {set_time.strftime('%I:%M %p')}")
 
-    totalMiles_allTrucks = 0
+@instrumentation.timed("build_package_status")
+def build_packageStatus(set_time, trucks, package_table, package_id, event_log=None):
+    """
+    Builds the status of a single package at a specific time as a PackageRow.
+    The status comes from the event log, so the package is not changed.
 
-    for truck in trucks:
-        print(f"\nTruck {truck.truckID} status at {set_time.strftime('%I:%M %p')}:")
+    set_time: 'HH:MM AM/PM' string or datetime at which the status is taken
+    package_id: ID of the package
 
-        # Check if the truck has completed deliveries or still in transit or returned to the hub
-        if truck.departTime.time() > set_time.time():
-            print(f"    - Truck {truck.truckID} has not left the hub yet.")
-        elif truck.returnTime.time() <= set_time.time():
-            print(f"    - Truck {truck.truckID} returned to the hub at {truck.returnTime.strftime('%I:%M %p')}.")
-        else:
-            print(f"    - Truck {truck.truckID} is currently en route.")
-
-        print(f"\nPackage Inventory Status for Truck {truck.truckID}:")
-
-        # Update package statuses based on the current time and truck depart/return times
-        for package_id in range(1, 41):
-            package = package_table.search(package_id)
-
-            if package.deadline == 'EOD':
-                packageDeadline = datetime.strptime('11:59 PM', '%I:%M %p')
-            else:
-                packageDeadline = datetime.strptime(package.deliveryTime, '%I:%M %p')
-
-
-            if package.assignedTruck == truck.truckID: 
-                if package.deliveryTime and datetime.strptime(package.deliveryTime, '%I:%M %p') <= set_time: # If the package has been delivered
-                    package.status = "Delivered"
-                    if package.deliveryTime and datetime.strptime(package.deliveryTime, '%I:%M %p') > packageDeadline: # If the package is delivered late
-                        package.lateStatus = True
-                elif package.updateTime and package.oldAddress: # If the package has an update time and old address
-                    if package.updateTime.time() > set_time.time():
-                        package.status = "Erroneous"
-                    elif package.updateTime.time() <= set_time.time() and truck.departTime <= set_time < truck.returnTime.time(): # If the update time is less than or equal to the set time and the truck is en route
-                        package.status = "En Route"
-                    elif package.updateTime.time() <= set_time.time() and truck.departTime > set_time: # If the update time is less than or equal to the set time and the truck is at the hub
-                        package.status = "At Hub"
-                elif not package.updateTime:
-                    if truck.departTime.time() <= set_time.time() < truck.returnTime.time(): # If the truck is en route
-                        package.status = "En Route"
-                        if packageDeadline <= set_time: # If the package is late
-                            package.lateStatus = True
-                    elif truck.departTime.time() > set_time.time(): # If the truck is at the hub
-                        if package.hubArrivalTime and package.hubArrivalTime > set_time: # If the package has not arrived at the hub yet
-                            package.status = "Not At Hub Yet"
-                        else: # If the package has arrived at the hub
-                            package.status = "At Hub"
-                        if packageDeadline <= set_time: # If the package is late
-                            package.lateStatus = True
-       
-
-        # Print package statuses for the truck
-
-        # Print the delivered packages
-        print(f"\n  - [X] Packages Delivered:")
-        for package_id in range(1, 41):
-            package = package_table.search(package_id)
-            if package.assignedTruck == truck.truckID and package.status == "Delivered":
-                packageAddr = package.get_address()
-                if package.lateStatus == True: # If the package is late
-                    packageDeadlineStatus = "Late"
-                else: # If the package is on time
-                    packageDeadlineStatus = "On Time"
-                print(f"    - Package {package.packageID:<3}: {packageAddr:<25} | Delivered at {package.deliveryTime:<5} | Deadline: {package.deadline:<8} ({package.packageID:<2} = {packageDeadlineStatus})")
-
-        # Print the remaining packages
-        print(f"\n  - (~) Packages Remaining:")
-        for package_id in range(1, 41):
-            package = package_table.search(package_id)
-            if package.assignedTruck == truck.truckID and package.status == "En Route": # If the package is en route
-                if package.lateStatus == True: # If the package is late
-                    packageDeadlineStatus = "Late"
-                else: # If the package is on time
-                    packageDeadlineStatus = "On Schedule"
-                print(f"    - Package {package.packageID:<3}: {package.address:<25} | {package.status:<8} | Deadline: {package.deadline} ({package.packageID:<2} = {packageDeadlineStatus})")
-
-            elif package.assignedTruck == truck.truckID and package.status == "At Hub": # If the package is at the hub
-                print(f"    - Package {package.packageID:<3}: {package.address:<25} | {package.status:<8} | Deadline: {package.deadline} ({package.packageID:<2} = {packageDeadlineStatus})")
-
-            elif package.assignedTruck == truck.truckID and package.status == "Not At Hub Yet": # If the package has not arrived at the hub yet
-                print(f"    - Package {package.packageID:<3}: {package.address:<25} | {package.status:<8} | Deadline: {package.deadline} ({package.packageID:<2} = {packageDeadlineStatus})")
-            
-
-        # Print the erroneous packages
-        print(f"\n  - (!) Erroneous Packages:")
-        for package_id in range(1, 41):
-            package = package_table.search(package_id)
-            if package.assignedTruck == truck.truckID and package.status == "Erroneous": 
-                if package.updateTime.time() > set_time.time(): # If the update time is greater than the set time
-                    print(f"    - Package {package.packageID}: {package.oldAddress} | Deadline: {package.deadline} -- (Will be updated at {package.updateTime.strftime('%I:%M %p')} | At hub but currently delayed)")
-                else:
-                    print(f"    - Package {package.packageID}: {package.address} | Deadline: {package.deadline} -- (Updated at {package.updateTime.strftime('%I:%M %p')})")
-
-        # Calculate and print the total delivered, remaining, erroneous packages, and miles traveled
-        delivered_count = sum(1 for package_id in range(1, 41) if package_table.search(package_id).assignedTruck == truck.truckID and package_table.search(package_id).status == "Delivered")
-        remaining_count = sum(1 for package_id in range(1, 41) if package_table.search(package_id).assignedTruck == truck.truckID and package_table.search(package_id).status in ["En Route", "At Hub"])
-        erroneous_count = sum(1 for package_id in range(1, 41) if package_table.search(package_id).assignedTruck == truck.truckID and package_table.search(package_id).status == "Erroneous")
-        miles_at_time = miles_traveled(set_time, truck, delivered_count)
-        totalMiles_allTrucks += miles_traveled(set_time, truck, delivered_count)
-
-
-        print(f"\n  - Total Packages Delivered: {delivered_count}")
-        print(f"  - Total Packages Remaining: {remaining_count}")
-        print(f"  - Total Erroneous Packages: {erroneous_count}")
-        print(f"  - Total Miles Traveled at {set_time.strftime('%I:%M %p')}: {miles_at_time:.2f} miles")
-
-    print(f"\n==Total Miles for all Trucks: {totalMiles_allTrucks:.2f} miles as of {set_time.strftime('%I:%M %p')}==")
-
-
-
-def generate_packageStatus(set_time, trucks, package_table, package_id): 
+    Returns the PackageRow, or None if the package is not in the table.
+    """
+    set_time = _parse_report_time(set_time)
+    package = package_table.search(package_id)
+    if package is None:
+        return None
+
+    if event_log is None:
+        event_log = EventLog.from_plan(trucks, package_table)
+
+    status, late = event_log.status_at(package_id, time_to_minutes(set_time))
+    return _package_row(package, event_log.package_truck.get(package_id), status, late)
+
+
+def generate_packageStatus(set_time, trucks, package_table, package_id, event_log=None, stream=None):
     """
     Generates a report showing the status of a single package at a specific time.
+    The status comes from the event log, so the package is not changed.
 
-    set_time: datetime object indicating the time at which the report is generated
+    set_time: 'HH:MM AM/PM' string or datetime at which the report is generated
     trucks: List of Truck objects
     package_table: HashTable containing all packages
     package_id: ID of the package to generate the report
+    event_log: EventLog returned by plan_deliveries (rebuilt from the trucks and packages if omitted)
+    stream: Stream the text is written to (standard output if omitted)
 
-    Returns the status of the package.
+    Returns the PackageRow, or None if the package is not in the table.
     """
+    set_time = _parse_report_time(set_time)
+    row = build_packageStatus(set_time, trucks, package_table, package_id, event_log)
+    (stream or sys.stdout).write(render_package_status_text(row, set_time, package_id))
+    return row
+
+
+
+class _PackageState:
+    # Sweep state of one package, the fields mirror what EventLog.status_at derives from the log
+    __slots__ = ("truck_id", "deadline", "delivered_minute", "departed", "cancelled", "pending_correction", "pending_hub",
+                 "past_deadline")
+
+    def __init__(self, truck_id, deadline):
+        self.truck_id = truck_id
+        self.deadline = deadline
+        self.delivered_minute = None
+        self.departed = False
+        self.cancelled = False
+        self.pending_correction = False
+        self.pending_hub = False
+        self.past_deadline = False
+
+    def status(self):
+        # Same rules as EventLog.status_at
+        if self.delivered_minute is not None:
+            return "Delivered", self.deadline is not None and self.delivered_minute > self.deadline
+        if self.cancelled:
+            return "Cancelled", False
+        if self.pending_correction:
+            return "Erroneous", False
+        if self.departed:
+            return "En Route", self.past_deadline
+        if self.pending_hub:
+            return "Not At Hub Yet", self.past_deadline
+        return "At Hub", self.past_deadline
+
+
+def iter_report_snapshots(report_times, trucks, event_log):
+    """
+    Generates the fleet report for every time in report_times with one sweep over the day's events.
 
-    set_time = datetime.strptime(set_time, '%I:%M %p') 
-    
-
-    print(f"\n==Package Status Report== at {set_time.strftime('%I:%M %p')}")
-
-    # Find the package in the package hash table
-    if package_table.search(package_id) is None:
-        print(f"Package {package_id} not found.")
-        return None
-    else:
-        package = package_table.search(package_id)
-
-    # Find the truck assigned to the package
-    for t in trucks:
-        if package.assignedTruck == t.truckID:
-            truck = t
-            break
-        else:
-            truck = None
-
-    if package.deadline == 'EOD':
-        packageDeadline = datetime.strptime('11:59 PM', '%I:%M %p')
-    else:
-        packageDeadline = datetime.strptime(package.deliveryTime, '%I:%M %p')
-
-
-    # Update package status based on the current time and truck depart/return times
-    if package.deliveryTime and datetime.strptime(package.deliveryTime, '%I:%M %p') <= set_time:
-        package.status = "Delivered"
-        if package.deliveryTime and datetime.strptime(package.deliveryTime, '%I:%M %p') > packageDeadline: # If the package is delivered late
-            package.lateStatus = True
-    elif package.updateTime and package.oldAddress:
-        if package.updateTime.time() > set_time.time():
-            package.status = "Erroneous"
-        elif package.updateTime.time() <= set_time.time() and truck.departTime <= set_time < truck.returnTime.time():
-            package.status = "En Route"
-        elif package.updateTime.time() <= set_time.time() and truck.departTime > set_time:
-            package.status = "At Hub"
-    elif not package.updateTime:
-        if truck.departTime.time() <= set_time.time() < truck.returnTime.time(): # If the truck is en route
-            package.status = "En Route"
-            if packageDeadline <= set_time: # If the package is late
-                package.lateStatus = True
-        elif truck.departTime.time() > set_time.time(): # If the truck is at the hub
-            if package.hubArrivalTime and package.hubArrivalTime > set_time: # If the package has not arrived at the hub yet
-                package.status = "Not At Hub Yet"
-            else: # If the package has arrived at the hub
-                package.status = "At Hub"
-            if packageDeadline <= set_time: # If the package is late
-                package.lateStatus = True
-
-
-    
-
-    # Print the package status
-    if package.status == "Erroneous": # If the package has an error
-        print(f"Package {package_id} Status: {package.status} ([ALERT]: Will be updated at {package.updateTime.strftime('%I:%M %p')}, At hub but delayed until update)\n")
-    elif package.status == "Delivered": # If the package has been delivered
-        if package.lateStatus == True:
-            packageDeadlineStatus = "Late"
-        else:
-            packageDeadlineStatus = "On Time"
-        print(f"Package {package_id} -> Status: {package.status} to {package.address} | Delivered at {package.deliveryTime} | Deadline: {package.deadline} ({packageDeadlineStatus})\n")
-    elif package.status == "En Route": # If the package is en route
-        if package.lateStatus == True:
-            packageDeadlineStatus = "Late"
-        else:
-            packageDeadlineStatus = "On Schedule"
-        print(f"Package {package_id} -> Status: {package.status} | Destination: {package.address} | Deadline: {package.deadline} ({packageDeadlineStatus})\n")
-    elif package.status == "At Hub": # If the package is at the hub
-        if package.lateStatus == True:
-            packageDeadlineStatus = "Late"
-        else:
-            packageDeadlineStatus = "On Schedule"
-        print(f"Package {package_id} -> Status: {package.status} | Destination: {package.address} | Deadline: {package.deadline} ({packageDeadlineStatus})\n")
-    elif package.status == "Not At Hub Yet": # If the package has not arrived at the hub yet
-        if package.lateStatus == True:
-            packageDeadlineStatus = "Late"
-        else:
-            packageDeadlineStatus = "On Schedule"
-        print(f"Package {package_id} -> Status: {package.status} | Destination: {package.address} | Deadline: {package.deadline} ({packageDeadlineStatus})\n")
-    else: # If the package status is not found
-        print("Package status not found.")
-        
+    Package events (plus each package's deadline) are applied in time order. Only packages touched by an
+    event are re-evaluated, and per-truck counts are updated incrementally, so the cost is close to
+    O(events + times x trucks) instead of re-scanning every package for every time.
 
+    report_times: Sorted iterable of times (datetime/time objects or minutes since midnight)
+    trucks: List of Truck objects, used for miles traveled
+    event_log: EventLog returned by plan_deliveries
 
+    Yields a ReportSnapshot per report time.
+    """
+    # Initial state: anything waiting on a future hub arrival or address correction is flagged up front
+    states = {}
+    for package_id in event_log.package_ids():
+        state = _PackageState(event_log.package_truck.get(package_id), event_log.deadlines.get(package_id))
+        for event in event_log.package_events(package_id):
+            if event.kind == events.ADDRESS_CORRECTED:
+                state.pending_correction = True
+            elif event.kind == events.HUB_ARRIVAL:
+                state.pending_hub = True
+        states[package_id] = state
+
+    # Deadlines are merged into the sweep as (minute, package ID) pairs
+    deadlines = sorted((state.deadline, package_id) for package_id, state in states.items() if state.deadline is not None)
+    deadline_position = 0
+
+    counts = {truck.truckID: {"Delivered": 0, "Remaining": 0, "Erroneous": 0} for truck in trucks}
+    current = {}
+    for package_id, state in states.items():
+        current[package_id] = state.status()
+        _count(counts, state.truck_id, current[package_id][0], 1)
+
+    pending_events = event_log.all_package_events()
+    next_event = next(pending_events, None)
+    changes = dict(current)
+
+    for report_time in report_times:
+        minute = report_time if isinstance(report_time, (int, float)) else time_to_minutes(report_time)
+        touched = set()
+
+        # Apply every event up to and including this report time
+        while next_event is not None and next_event.minute <= minute:
+            state = states[next_event.package_id]
+            if next_event.kind == events.DELIVERED:
+                state.delivered_minute = next_event.minute
+            elif next_event.kind == events.DEPARTED:
+                state.departed = True
+            elif next_event.kind == events.CANCELLED:
+                state.cancelled = True
+            elif next_event.kind == events.ADDRESS_CORRECTED:
+                state.pending_correction = False
+            elif next_event.kind == events.HUB_ARRIVAL:
+                state.pending_hub = False
+            touched.add(next_event.package_id)
+            next_event = next(pending_events, None)
+
+        while deadline_position < len(deadlines) and deadlines[deadline_position][0] <= minute:
+            package_id = deadlines[deadline_position][1]
+            states[package_id].past_deadline = True
+            touched.add(package_id)
+            deadline_position += 1
+
+        # Re-evaluate only the packages an event touched
+        for package_id in touched:
+            state = states[package_id]
+            status = state.status()
+            if status != current[package_id]:
+                _count(counts, state.truck_id, current[package_id][0], -1)
+                _count(counts, state.truck_id, status[0], 1)
+                current[package_id] = status
+                changes[package_id] = status
+
+        truck_snapshots = {}
+        for truck in trucks:
+            truck_counts = counts[truck.truckID]
+            truck_snapshots[truck.truckID] = TruckSnapshot(truck_counts["Delivered"], truck_counts["Remaining"],
+                                                           truck_counts["Erroneous"], truck.position_at(minute).miles)
+
+        yield ReportSnapshot(minute, truck_snapshots, sum(snapshot.miles for snapshot in truck_snapshots.values()), changes)
+        changes = {}
+
+
+def build_truckCounts(set_time, trucks, batch):
+    """
+    Counts every truck's delivered, remaining and erroneous packages at a specific time from a PackageBatch,
+    without building package rows. The counts are the ones build_report gives for the same planned packages:
+    a package is delivered once its delivery minute has passed, erroneous until its address correction,
+    and remaining while it is en route or waiting at the hub.
 
+    set_time: 'HH:MM AM/PM' string or datetime at which the counts are taken
+    trucks: List of Truck objects, used for departure times and miles traveled
+    batch: PackageBatch built from (or updated with) the planned packages
 
+    Returns a dict of truck ID -> TruckSnapshot.
+    """
+    set_time = _parse_report_time(set_time)
+    set_minutes = time_to_minutes(set_time)
+    # Packages are only on a truck once it departs, the same as the LOADED events of the event log
+    departures = {truck.truckID: time_to_minutes(truck.departTime) for truck in trucks if truck.departTime != datetime.max}
+    counts = {truck_id: [0, 0, 0] for truck_id in departures}
+
+    for truck_id, delivered, corrected, arrival in zip(batch.truck_id, batch.delivery_minute,
+                                                      batch.update_minute, batch.hub_arrival_minute):
+        truck_counts = counts.get(truck_id)
+        if truck_counts is None:
+            continue
+        if delivered != NONE and delivered <= set_minutes:
+            truck_counts[0] += 1
+        elif corrected != NONE and corrected > set_minutes:
+            truck_counts[2] += 1
+        elif departures[truck_id] <= set_minutes or arrival == NONE or arrival <= set_minutes:
+            truck_counts[1] += 1  # En route, or at the hub (a delayed package that has not arrived is neither)
+
+    return {truck.truckID: TruckSnapshot(*counts[truck.truckID], miles_traveled(set_time, truck))
+            for truck in trucks if truck.truckID in counts}
+
+
+def _count(counts, truck_id, status, step):
+    # Adds step to the truck's counter for status, grouped the same way generate_report totals them
+    truck_counts = counts.get(truck_id)
+    if truck_counts is None:
+        return
+    if status == "Delivered":
+        truck_counts["Delivered"] += step
+    elif status in ("En Route", "At Hub"):
+        truck_counts["Remaining"] += step
+    elif status == "Erroneous":
+        truck_counts["Erroneous"] += step
@@ -0,0 +1,341 @@
+"""
+This module renders the structured report records (see records) as text, JSON Lines, CSV or Parquet.
+
+Every renderer builds its whole output in memory and writes it with a single call, so a report with
+many thousands of package rows is one buffered write instead of one print per line.
+
+The `render_report_text` and `render_package_status_text` functions produce the same text the menu has always printed.
+The `package_rows`, `truck_rows` and `route_rows` functions flatten records into plain dictionaries for the other formats.
+The `write_records` function writes a list of records to a path or an open stream in any of the formats.
+"""
+import csv
+import io
+import json
+import sys
+from contextlib import contextmanager
+from app.core import instrumentation
+from app.core.records import FleetReport, PackageRow, RouteSummary, TripRecord
+from app.models.package import time_to_minutes
+
+FORMATS = ("text", "jsonl", "csv", "parquet")
+TABLES = ("packages", "trucks", "routes")
+
+# Buffer size used when writing to a file path
+WRITE_BUFFER_SIZE = 1 << 20
+
+
+def _clock(value):
+    # 12-hour clock used by the text reports
+    return value.strftime('%I:%M %p')
+
+
+def _iso_time(value):
+    # 24-hour clock used by the machine-readable formats, None stays None
+    return value.strftime('%H:%M') if value is not None else None
+
+
+@instrumentation.timed("render_report")
+def render_report_text(report):
+    """
+    Renders a FleetReport as the text report printed by the menu.
+
+    Returns the report as one string, ending with a newline.
+    """
+    report_time = _clock(report.time)
+    lines = [f"\nGenerated Report at {report_time}"]
+
+    for truck in report.trucks:
+        truck_id = truck.truck_id
+        lines.append(f"\nTruck {truck_id} status at {report_time}:")
+
+        # Whether the truck is still at the hub, en route or already returned
+        if truck.state == "Not Departed":
+            lines.append(f"    - Truck {truck_id} has not left the hub yet.")
+        elif truck.state == "Returned":
+            lines.append(f"    - Truck {truck_id} returned to the hub at {_clock(truck.return_time)}.")
+        else:
+            lines.append(f"    - Truck {truck_id} is currently en route.")
+
+        lines.append(f"\nPackage Inventory Status for Truck {truck_id}:")
+
+        # Delivered packages
+        lines.append(f"\n  - [X] Packages Delivered:")
+        for row in truck.packages:
+            if row.status == "Delivered":
+                deadline_status = "Late" if row.late else "On Time"
+                lines.append(f"    - Package {row.package_id:<3}: {row.address:<25} | Delivered at {_clock(row.delivery_time):<5} | Deadline: {row.deadline:<8} ({row.package_id:<2} = {deadline_status})")
+
+        # Remaining packages (en route, at the hub, or not at the hub yet)
+        lines.append(f"\n  - (~) Packages Remaining:")
+        for row in truck.packages:
+            if row.status in ("En Route", "At Hub", "Not At Hub Yet"):
+                deadline_status = "Late" if row.late else "On Schedule"
+                lines.append(f"    - Package {row.package_id:<3}: {row.address:<25} | {row.status:<8} | Deadline: {row.deadline} ({row.package_id:<2} = {deadline_status})")
+
+        # Erroneous packages
+        lines.append(f"\n  - (!) Erroneous Packages:")
+        for row in truck.packages:
+            if row.status == "Erroneous":
+                if time_to_minutes(row.update_time) > time_to_minutes(report.time): # If the update time is after the report time
+                    lines.append(f"    - Package {row.package_id}: {row.old_address} | Deadline: {row.deadline} -- (Will be updated at {_clock(row.update_time)} | At hub but currently delayed)")
+                else:
+                    lines.append(f"    - Package {row.package_id}: {row.address} | Deadline: {row.deadline} -- (Updated at {_clock(row.update_time)})")
+
+        # Cancelled packages, only listed when a change cancelled one during the day
+        cancelled = [row for row in truck.packages if row.status == "Cancelled"]
+        if cancelled:
+            lines.append(f"\n  - (x) Cancelled Packages:")
+            for row in cancelled:
+                lines.append(f"    - Package {row.package_id}: {row.address} | Deadline: {row.deadline} -- (Cancelled)")
+
+        lines.append(f"\n  - Total Packages Delivered: {truck.delivered}")
+        lines.append(f"  - Total Packages Remaining: {truck.remaining}")
+        lines.append(f"  - Total Erroneous Packages: {truck.erroneous}")
+        lines.append(f"  - Total Miles Traveled at {report_time}: {truck.miles:.2f} miles")
+
+    lines.append(f"\n==Total Miles for all Trucks: {report.total_miles:.2f} miles as of {report_time}==")
+    lines.append("")
+    return "\n".join(lines)
+
+
+@instrumentation.timed("render_package_status")
+def render_package_status_text(row, set_time, package_id=None):
+    """
+    Renders one package's status as the text printed by the menu.
+
+    row: PackageRow, or None if the package was not found
+    set_time: datetime/time the status was taken at
+    package_id: ID shown when the package was not found
+
+    Returns the status report as one string, ending with a newline.
+    """
+    lines = [f"\n==Package Status Report== at {_clock(set_time)}"]
+
+    if row is None:
+        lines.append(f"Package {package_id} not found.")
+    elif row.status == "Erroneous": # If the package has an error
+        lines.append(f"Package {row.package_id} Status: {row.status} ([ALERT]: Will be updated at {_clock(row.update_time)}, At hub but delayed until update)\n")
+    elif row.status == "Delivered": # If the package has been delivered
+        deadline_status = "Late" if row.late else "On Time"
+        lines.append(f"Package {row.package_id} -> Status: {row.status} to {row.address} | Delivered at {_clock(row.delivery_time)} | Deadline: {row.deadline} ({deadline_status})\n")
+    elif row.status in ("En Route", "At Hub", "Not At Hub Yet"): # If the package is en route, at the hub, or not at the hub yet
+        deadline_status = "Late" if row.late else "On Schedule"
+        lines.append(f"Package {row.package_id} -> Status: {row.status} | Destination: {row.address} | Deadline: {row.deadline} ({deadline_status})\n")
+    elif row.status == "Cancelled": # If the package was cancelled during the day
+        lines.append(f"Package {row.package_id} -> Status: {row.status} | Destination: {row.address} | Deadline: {row.deadline}\n")
+    else: # If the package status is not found
+        lines.append("Package status not found.")
+
+    lines.append("")
+    return "\n".join(lines)
+
+
+def _package_row_dict(row, report_time=None):
+    return {
+        "report_time": _iso_time(report_time),
+        "package_id": row.package_id,
+        "truck_id": row.truck_id,
+        "status": row.status,
+        "late": row.late,
+        "address": row.address,
+        "old_address": row.old_address,
+        "deadline": row.deadline,
+        "delivery_time": _iso_time(row.delivery_time),
+        "update_time": _iso_time(row.update_time),
+    }
+
+
+def package_rows(records):
+    """
+    Returns one dictionary per package row in the FleetReport and PackageRow records.
+    """
+    rows = []
+    for record in records:
+        if isinstance(record, FleetReport):
+            for truck in record.trucks:
+                rows.extend(_package_row_dict(row, record.time) for row in truck.packages)
+        elif isinstance(record, PackageRow):
+            rows.append(_package_row_dict(record))
+    return rows
+
+
+def truck_rows(records):
+    """
+    Returns one dictionary per truck summary in the FleetReport records, plus the fleet total as truck_id None.
+    """
+    rows = []
+    for record in records:
+        if not isinstance(record, FleetReport):
+            continue
+        report_time = _iso_time(record.time)
+        for truck in record.trucks:
+            rows.append({
+                "report_time": report_time,
+                "truck_id": truck.truck_id,
+                "state": truck.state,
+                "return_time": _iso_time(truck.return_time),
+                "delivered": truck.delivered,
+                "remaining": truck.remaining,
+                "erroneous": truck.erroneous,
+                "miles": round(truck.miles, 2),
+            })
+        rows.append({
+            "report_time": report_time, "truck_id": None, "state": None, "return_time": None,
+            "delivered": sum(truck.delivered for truck in record.trucks),
+            "remaining": sum(truck.remaining for truck in record.trucks),
+            "erroneous": sum(truck.erroneous for truck in record.trucks),
+            "miles": round(record.total_miles, 2),
+        })
+    return rows
+
+
+def route_rows(records):
+    """
+    Returns one dictionary per stop in the RouteSummary and TripRecord records.
+    """
+    rows = []
+    for record in records:
+        trip_id = driver_id = None
+        if isinstance(record, TripRecord):
+            trip_id, driver_id, record = record.trip_id, record.driver_id, record.route
+        elif not isinstance(record, RouteSummary):
+            continue
+        for stop_number, stop in enumerate(record.stops, start=1):
+            rows.append({
+                "trip_id": trip_id,
+                "driver_id": driver_id,
+                "truck_id": record.truck_id,
+                "stop": stop_number,
+                "time": _iso_time(stop.time),
+                "address": stop.address,
+                "package_ids": " ".join(str(package_id) for package_id in stop.package_ids),
+                "late_package_ids": " ".join(str(package_id) for package_id in stop.late_package_ids),
+            })
+    return rows
+
+
+_TABLE_ROWS = {"packages": package_rows, "trucks": truck_rows, "routes": route_rows}
+
+
+def _jsonl_records(records):
+    # Every record becomes one or more JSON objects tagged with its record type
+    for record in records:
+        if isinstance(record, FleetReport):
+            for truck_row in truck_rows([record]):
+                yield {"record": "truck" if truck_row["truck_id"] is not None else "fleet", **truck_row}
+            for row in package_rows([record]):
+                yield {"record": "package", **row}
+        elif isinstance(record, PackageRow):
+            yield {"record": "package", **_package_row_dict(record)}
+        elif isinstance(record, (RouteSummary, TripRecord)):
+            trip_id = driver_id = None
+            if isinstance(record, TripRecord):
+                trip_id, driver_id, record = record.trip_id, record.driver_id, record.route
+            yield {
+                "record": "route",
+                "trip_id": trip_id,
+                "driver_id": driver_id,
+                "truck_id": record.truck_id,
+                "depart_time": _iso_time(record.depart_time),
+                "return_time": _iso_time(record.return_time),
+                "miles": round(record.miles, 2),
+                "miles_saved": round(record.miles_saved, 2),
+                "packages_delivered": record.packages_delivered,
+                "stops": [{"time": _iso_time(stop.time), "address": stop.address, "package_ids": stop.package_ids,
+                           "late_package_ids": stop.late_package_ids} for stop in record.stops],
+            }
+
+
+def render_jsonl(records):
+    """
+    Renders records as JSON Lines, one object per truck summary, fleet total, package row and route.
+    """
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    return "".join(f"{encode(row)}\n" for row in _jsonl_records(records))
+
+
+def render_csv(records, table="packages"):
+    """
+    Renders one table of the records as CSV with a header row.
+
+    table: "packages", "trucks" or "routes"
+    """
+    if table not in _TABLE_ROWS:
+        raise ValueError(f"Unknown table {table!r}, expected one of {', '.join(TABLES)}")
+    rows = _TABLE_ROWS[table](records)
+    output = io.StringIO()
+    if rows:
+        writer = csv.DictWriter(output, fieldnames=list(rows[0]), lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+    return output.getvalue()
+
+
+def render_text(records):
+    """
+    Renders the FleetReport records as the menu text, one report after another.
+
+    Raises TypeError for any other record, the jsonl and csv formats render every record type.
+    """
+    records = list(records)
+    for record in records:
+        if not isinstance(record, FleetReport):
+            raise TypeError(f"Text output only renders FleetReport records, not {type(record).__name__} (use jsonl or csv)")
+    return "".join(render_report_text(record) for record in records)
+
+
+def to_arrow_table(records, table="packages"):
+    """
+    Returns one table of the records as a pyarrow Table. Requires the optional pyarrow package.
+    """
+    try:
+        import pyarrow
+    except ImportError as error:
+        raise ImportError("Arrow and Parquet output need the optional pyarrow package (pip install pyarrow)") from error
+    if table not in _TABLE_ROWS:
+        raise ValueError(f"Unknown table {table!r}, expected one of {', '.join(TABLES)}")
+    return pyarrow.Table.from_pylist(_TABLE_ROWS[table](records))
+
+
+@contextmanager
+def _open_output(destination, binary=False):
+    # Yields a writable stream for a path (opened with a large buffer) or an already open stream (left open)
+    if destination is None:
+        yield sys.stdout.buffer if binary else sys.stdout
+    elif hasattr(destination, "write"):
+        yield destination
+    else:
+        mode = 'wb' if binary else 'w'
+        encoding = None if binary else 'utf-8'
+        newline = None if binary else ''
+        with open(destination, mode, buffering=WRITE_BUFFER_SIZE, encoding=encoding, newline=newline) as stream:
+            yield stream
+
+
+def write_records(records, destination=None, format="text", table="packages"):
+    """
+    Writes records to a file path or an open stream in a single write.
+
+    records: List of FleetReport, PackageRow, RouteSummary and TripRecord records
+    destination: File path, writable stream, or None for standard output
+    format: "text", "jsonl", "csv" or "parquet"
+    table: Table written by the csv and parquet formats ("packages", "trucks" or "routes")
+    """
+    if format == "parquet":
+        arrow_table = to_arrow_table(records, table)
+        import pyarrow.parquet
+        with _open_output(destination, binary=True) as stream:
+            pyarrow.parquet.write_table(arrow_table, stream)
+        return
+
+    if format == "text":
+        output = render_text(records)
+    elif format == "jsonl":
+        output = render_jsonl(records)
+    elif format == "csv":
+        output = render_csv(records, table)
+    else:
+        raise ValueError(f"Unknown format {format!r}, expected one of {', '.join(FORMATS)}")
+
+    with _open_output(destination) as stream:
+        stream.write(output)
@@ -0,0 +1,182 @@
+"""
+This module contains the RouteEvaluator, a side-effect-free route cost function for what-if planning.
+
+Comparing plans (moving a package to another truck, shifting a departure, dropping a stop) evaluates many routes
+that are identical or start the same way. Driving each one with Truck.drive_to changes the truck and walks the
+whole route again. `RouteEvaluator.evaluate` only reads the distance matrix and returns a RouteCost with the
+miles, the arrival minute at every stop and the late stops of a stop sequence and departure time.
+
+Two memos are kept, both bounded LRU caches:
+- routes: (start, end, stops) -> cumulative miles at every stop and back at the end, and the last RouteCost.
+  Miles only depend on the sequence of location IDs, so a route evaluated at another departure time or speed
+  is still a cache hit: only its arrivals are recomputed, and only its deadline stops are checked.
+- prefixes: the cumulative miles of every PREFIX_STEP stops, chained like a trie from the start location.
+  A new route that shares a prefix with an earlier one (the same stops up to the one that was dropped or
+  swapped) reuses the memoized chunks and only walks the rest.
+
+`RouteEvaluator.cache_info` returns the hit, miss and eviction counts of both, like functools.lru_cache.
+"""
+from collections import OrderedDict, namedtuple
+from itertools import accumulate, count, repeat
+from operator import add, mul
+from app.core import instrumentation
+
+DEFAULT_MAX_ROUTES = 4096
+DEFAULT_MAX_PREFIXES = 65536
+PREFIX_STEP = 16  # Stops per memoized prefix chunk
+
+# Cost of one evaluated route, shared by every caller that evaluates the same route and departure
+# miles: total miles back to the end location, arrivals: tuple of the arrival minute at every stop,
+# return_minute: arrival back at the end location, late_stops: tuple of the stops reached after their deadline
+RouteCost = namedtuple("RouteCost", ["miles", "arrivals", "return_minute", "late_stops"])
+
+# Statistics of a RouteEvaluator's memos
+# hits/misses/evictions: route cache, prefix_hits/prefix_evictions: memoized chunks reused or dropped,
+# stops_walked: stops whose miles were read from the distance matrix
+RouteCacheInfo = namedtuple("RouteCacheInfo", [
+    "hits", "misses", "evictions", "maxsize", "currsize", "prefix_hits", "prefix_evictions", "prefix_size", "stops_walked",
+])
+
+
+def package_stops(packages):
+    """
+    Groups packages in delivery order into stops: consecutive packages for the same location are one stop.
+
+    Returns a tuple of (list of location IDs, dict of location ID -> earliest deadline in minutes since midnight).
+    Stops whose packages are all EOD have no deadline.
+    """
+    stops = []
+    deadlines = {}
+    for package in packages:
+        if not stops or stops[-1] != package.locationID:
+            stops.append(package.locationID)
+        if package.deadline != 'EOD' and package.deadline:
+            deadlines[package.locationID] = min(package.deadlineMinutes, deadlines.get(package.locationID, package.deadlineMinutes))
+    return stops, deadlines
+
+
+class RouteEvaluator:
+    def __init__(self, distance_matrix, deadlines=None, max_routes=DEFAULT_MAX_ROUTES, max_prefixes=DEFAULT_MAX_PREFIXES):
+        """
+        distance_matrix: DistanceMatrix shared by the routing code
+        deadlines: Dict of location ID -> deadline in minutes since midnight (see package_stops), or None to ignore
+                   deadlines. Deadlines belong to the locations, not to a plan, so every route is checked against the
+                   same ones. Call cache_clear after changing the dict.
+        max_routes: Most whole routes kept, the least recently used one is dropped first
+        max_prefixes: Most prefix chunks kept (each holds PREFIX_STEP stops), 0 turns prefix sharing off
+        """
+        self.distance_matrix = distance_matrix
+        self.deadlines = deadlines or {}
+        self.max_routes = max_routes
+        self.max_prefixes = max_prefixes
+        # (start, end, stops) -> [cumulative miles at every stop and the end, (position, deadline) of the deadline stops,
+        #                         (departure, speed) of the last evaluation, its RouteCost]
+        self._routes = OrderedDict()
+        # (parent, chunk of PREFIX_STEP stops) -> (node, cumulative miles at each stop of the chunk).
+        # The parent of a route's first chunk is the 1-tuple (start,), later chunks hang off the previous chunk's node.
+        self._prefixes = OrderedDict()
+        self._nodes = count()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.prefix_hits = 0
+        self.prefix_evictions = 0
+        self.stops_walked = 0
+
+    def evaluate(self, stops, start_id, end_id, depart_minute=0.0, speed=18):
+        """
+        Computes the cost of driving stops in order, without changing any truck.
+        A stop is late when its arrival, in whole minutes, is after its deadline (as deliver_packages flags was_late).
+
+        stops: Sequence of location IDs in delivery order
+        start_id: Location ID the truck departs from
+        end_id: Location ID the truck returns to
+        depart_minute: Departure time in minutes since midnight
+        speed: Truck speed in miles per hour
+
+        Returns a RouteCost.
+        """
+        stops = tuple(stops)
+        key = (start_id, end_id, stops)
+        entry = self._routes.get(key)
+        if entry is None:
+            self.misses += 1
+            deadlines = self.deadlines
+            checks = tuple((position, deadlines[stop]) for position, stop in enumerate(stops) if stop in deadlines)
+            entry = [self._walk(stops, start_id, end_id), checks, None, None]
+            self._routes[key] = entry
+            if len(self._routes) > self.max_routes:
+                self._routes.popitem(last=False)
+                self.evictions += 1
+        else:
+            self.hits += 1
+            self._routes.move_to_end(key)
+            if entry[2] == (depart_minute, speed):
+                return entry[3]
+
+        cumulative, checks = entry[0], entry[1]
+        arrivals = tuple(map(float(depart_minute).__add__, map((60 / speed).__mul__, cumulative)))
+        late_stops = tuple(stops[position] for position, deadline in checks if int(arrivals[position]) > deadline)
+        cost = RouteCost(cumulative[-1], arrivals[:-1], arrivals[-1], late_stops)
+        entry[2] = (depart_minute, speed)
+        entry[3] = cost
+        return cost
+
+    def _walk(self, stops, start_id, end_id):
+        # Cumulative miles at every stop and back at the end, starting from the longest memoized prefix
+        prefixes = self._prefixes
+        stop_count = len(stops)
+        cumulative = []
+        parent = (start_id,)
+        position = 0
+        if self.max_prefixes:
+            while position + PREFIX_STEP <= stop_count:
+                chunk_key = (parent, stops[position:position + PREFIX_STEP])
+                entry = prefixes.get(chunk_key)
+                if entry is None:
+                    break
+                prefixes.move_to_end(chunk_key)
+                parent, chunk_miles = entry
+                cumulative.extend(chunk_miles)
+                position += PREFIX_STEP
+            self.prefix_hits += position // PREFIX_STEP
+        reused = position
+
+        # Read the remaining legs from the distance matrix, previous stop -> next stop
+        data = self.distance_matrix.data
+        size = self.distance_matrix.size
+        route = (stops[position - 1] if position else start_id,) + stops[position:] + (end_id,)
+        legs = map(data.__getitem__, map(add, map(mul, route[:-1], repeat(size)), route[1:]))
+        cumulative.extend(accumulate(legs, initial=cumulative[-1] if cumulative else 0.0))
+        del cumulative[reused]  # The initial value, already the last reused entry (or the start)
+        walked = len(route) - 1
+        self.stops_walked += walked
+        instrumentation.count(instrumentation.DISTANCE_LOOKUPS, walked)
+
+        # Memoize the complete chunks that were walked
+        if self.max_prefixes:
+            for position in range(reused, stop_count - PREFIX_STEP + 1, PREFIX_STEP):
+                node = next(self._nodes)
+                prefixes[(parent, stops[position:position + PREFIX_STEP])] = (node, tuple(cumulative[position:position + PREFIX_STEP]))
+                parent = node
+            # Chunks below an evicted one can no longer be reached, they age out the same way
+            while len(prefixes) > self.max_prefixes:
+                prefixes.popitem(last=False)
+                self.prefix_evictions += 1
+        return tuple(cumulative)
+
+    def cache_info(self):
+        """
+        Returns a RouteCacheInfo with the hit, miss and eviction counts of both memos.
+        """
+        return RouteCacheInfo(self.hits, self.misses, self.evictions, self.max_routes, len(self._routes),
+                              self.prefix_hits, self.prefix_evictions, len(self._prefixes), self.stops_walked)
+
+    def cache_clear(self):
+        """
+        Empties both memos and resets the statistics, for example after the distance matrix changed.
+        """
+        self._routes.clear()
+        self._prefixes.clear()
+        self.hits = self.misses = self.evictions = 0
+        self.prefix_hits = self.prefix_evictions = self.stops_walked = 0
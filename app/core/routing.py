@@ -3,39 +3,58 @@ This module contains the main routing logic for the package delivery system.
 It includes functions to sort packages for loading and delivery, load trucks, and deliver packages.
 
 I used a greedy approach to optimize the delivery order based on distance and deadlines.
+The delivery order can also be built by deadline-driven cheapest insertion (see app.core.insertion),
+routing functions take a constructor name from ROUTE_CONSTRUCTORS.
 """
-from datetime import datetime, timedelta, time
-from app.data_utils.data_handler import load_address_data, load_distance_data, distanceBetween, extract_address
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import multiprocessing
+from app.core.insertion import insert_stops
+from app.core.local_search import improve_route
+from app.core import events, instrumentation
+from app.core.records import RouteSummary, StopRecord
+from app.core.constraints import DEFAULT_CORRECTIONS, PackageConstraints
+from app.core.assignment import ASSIGNERS, assign_sequential, evaluate_loads, select_units, split_trucks
+from app.core.routing_context import RoutingContext, get_default_context
+from app.models import package_batch
+from app.models.package import time_to_minutes
+from app.models.timeline import to_minutes
 import heapq
 
-# Load address and distance data
-ADDRESS_FILE = "./data/address_file.csv"
-DISTANCE_FILE = "./data/distance_file.csv"
-address_dict = load_address_data(ADDRESS_FILE)
-distance_matrix = load_distance_data(DISTANCE_FILE)
+logger = logging.getLogger(__name__)
 
-def sortPackages_forLoading(package_list):
+# Address and distance data are loaded lazily by the RoutingContext the first time a function needs them.
+# Every function takes an optional context and falls back to the shared default one.
+
+
+def sortPackages_forLoading(package_list, context=None):
     """ 
     Sorts packages for loading based on distance from the hub and deadlines.
     This method uses a greedy approach to optimize the loading order.
 
     package_list: List of Package objects to be sorted
+    context: RoutingContext with the address and distance data (defaults to the shared context)
 
     Returns the sorted list of packages for loading.
     """
+    context = context or get_default_context()
+    resolve_location = context.resolve_location
 
     # Sets the hub location
-    hub_index = extract_address("4001 South 700 East", address_dict)
+    hub_row = context.distance_matrix.row(context.hub_index)
 
     #Calculates the distance from the hub to each package
     package_distances = []
     for package in package_list:
-        package_index = extract_address(package.get_address(), address_dict)
+        package_index = resolve_location(package)
         if package_index is not None:
             # Get distance from hub initially
-            distance = distanceBetween(hub_index, package_index, distance_matrix)
+            distance = hub_row[package_index]
             package_distances.append((distance, package))
 
+    instrumentation.count(instrumentation.DISTANCE_LOOKUPS, len(package_distances))
+
     # Sort the packages by distance from the hub
     package_distances.sort(key=lambda x: x[0])
 
@@ -46,66 +65,249 @@ def sortPackages_forLoading(package_list):
     return [package[1] for package in sorted_packages]
 
 
+def sortBatch_forLoading(batch, context=None):
+    """
+    Sorts the packages of a PackageBatch for loading, in the same order as sortPackages_forLoading:
+    by deadline, then by distance from the hub, then in row order. Only the batch's columns are read.
+
+    batch: PackageBatch whose location IDs are resolved (as load_package_data does), rows without one are left out
+    context: RoutingContext with the address and distance data (defaults to the shared context)
+
+    Returns the package IDs in loading order.
+    """
+    context = context or get_default_context()
+    hub_row = context.distance_matrix.row(context.hub_index)
+    location_id = batch.location_id
+    deadline_minutes = batch.deadline_minutes
+
+    rows = [row for row, location in enumerate(location_id) if location != package_batch.NONE]
+    instrumentation.count(instrumentation.DISTANCE_LOOKUPS, len(rows))
+    rows.sort(key=lambda row: (deadline_minutes[row], hub_row[location_id[row]]))
 
+    package_id = batch.package_id
+    return [package_id[row] for row in rows]
 
 
 
-def sortPackages_forDelivery(truck, package_list):
+
+
+
+def sortPackages_forDelivery(truck, package_list, context=None):
     """
     Sorts packages for delivery based on distance and deadlines.
     This method uses a greedy approach to optimize the delivery order.
 
+    Packages are grouped into stops by location ID, so each step picks the nearest unvisited stop
+    and delivers every package for it. On a distance tie the stop holding the earliest deadline wins,
+    then the stop whose package came first in package_list, which matches the per-package scan.
+
     truck: Truck object that will deliver the packages
     package_list: List of Package objects to be sorted
+    context: RoutingContext with the address and distance data (defaults to the shared context)
 
     Returns the sorted list of packages for delivery.
     """
+    context = context or get_default_context()
+    resolve_location = context.resolve_location
+    distance_matrix = context.distance_matrix
 
     sorted_packages = []
-    current_location = truck.currentLocation
-    remaining_packages = package_list[:] 
-
-    while remaining_packages:
-        nearest_package = None
-        nearest_distance = float('inf')
-
-        # Find the nearest package from the current location of the truck
-        for package in remaining_packages:
-            package_index = extract_address(package.get_address(), address_dict)
-            current_index = extract_address(current_location, address_dict)
-
-            if package_index is None or current_index is None:
-                continue  
-
-            distance = distanceBetween(current_index, package_index, distance_matrix)
-
-            # If a package is closer, update the nearest package
-            if distance < nearest_distance:
-                nearest_distance = distance
-                nearest_package = package
-
-            # If two packages are equidistant, deliver the one with the earliest deadline
-            elif distance == nearest_distance:
-                if package.get_deadline() < nearest_package.get_deadline():
-                    nearest_package = package
-
-        # Add the nearest package to the sorted list
-        if nearest_package:
-            same_location_packages = [
-                pkg for pkg in remaining_packages if pkg.get_address() == nearest_package.get_address()
-            ]
-
-            sorted_packages.extend(same_location_packages)
-            current_location = nearest_package.get_address()  # Move truck
-
-            # Remove all packages at the same location (this is for packages with the same destination address)
-            for pkg in same_location_packages:
-                remaining_packages.remove(pkg)
-            
+    current_index = context.address_index.lookup(truck.currentLocation)
+    if current_index is None:
+        return sorted_packages
+
+    # Group co-located packages by location ID, keeping their original order
+    stops = {}
+    tie_keys = {}
+    for position, package in enumerate(package_list):
+        location = resolve_location(package)
+        if location is None:
+            continue
+        stops.setdefault(location, []).append(package)
+
+        # Precompute the tie-break key once: earliest deadline at the stop, then first position
+        key = (package.get_deadline(), position)
+        if location not in tie_keys or key < tie_keys[location]:
+            tie_keys[location] = key
+
+    # Keep unvisited stops ordered by tie-break key, min() returns the first of any equal distances
+    remaining_stops = sorted(stops, key=tie_keys.__getitem__)
+
+    while remaining_stops:
+        # Find the nearest stop from the current location of the truck
+        row = distance_matrix.row(current_index)
+        nearest_stop = min(remaining_stops, key=row.__getitem__)
+
+        # Add every package for that stop and move the truck there
+        sorted_packages.extend(stops[nearest_stop])
+        remaining_stops.remove(nearest_stop)
+        current_index = nearest_stop
+
+    # Every step read the distance to each stop still remaining
+    instrumentation.count(instrumentation.GREEDY_STEPS, len(stops))
+    instrumentation.count(instrumentation.DISTANCE_LOOKUPS, len(stops) * (len(stops) + 1) // 2)
+
     # Return the sorted packages
     return sorted_packages
 
 
+def improve_delivery_order(truck, package_list, context=None, time_limit=None):
+    """
+    Improves a constructed delivery order with 2-opt and Or-opt moves (see app.core.local_search).
+    Packages for the same stop stay together, and no move makes a deadline package late.
+
+    truck: Truck object that will deliver the packages, its current time is the departure time
+    package_list: List of Package objects in constructed delivery order
+    context: RoutingContext with the address and distance data (defaults to the shared context)
+    time_limit: Wall-clock seconds the search may take, None to only bound it by iterations (see improve_route)
+
+    Returns a tuple of (improved list of packages, miles saved).
+    """
+    context = context or get_default_context()
+    stops = {}
+    deadlines = {}
+    for package in package_list:
+        stops.setdefault(package.locationID, []).append(package)
+        if package.deadline != 'EOD' and package.deadline:
+            minutes = package.deadlineMinutes
+            deadlines[package.locationID] = min(minutes, deadlines.get(package.locationID, minutes))
+
+    start_index = context.address_index.lookup(truck.currentLocation)
+    hub_index = context.hub_index
+    start_minute = truck.current_time.hour * 60 + truck.current_time.minute + truck.current_time.second / 60
+
+    improved_stops, miles_saved = improve_route(list(stops), start_index, hub_index, context.distance_matrix,
+                                                start_minute, truck.speed, deadlines, time_limit=time_limit)
+
+    return [package for stop in improved_stops for package in stops[stop]], miles_saved
+
+
+def insertion_delivery_order(truck, package_list, context=None):
+    """
+    Sorts packages for delivery by deadline-driven cheapest insertion (see app.core.insertion).
+    Unlike the greedy sort, stops with a deadline are inserted first, and every later stop goes where they all stay on time.
+    Packages for the same stop stay together, in their order in package_list.
+
+    truck: Truck object that will deliver the packages, its current time is the departure time
+    package_list: List of Package objects to be sorted
+    context: RoutingContext with the address and distance data (defaults to the shared context)
+
+    Returns the sorted list of packages for delivery.
+    """
+    context = context or get_default_context()
+    resolve_location = context.resolve_location
+
+    start_index = context.address_index.lookup(truck.currentLocation)
+    if start_index is None:
+        return []
+
+    # Group co-located packages by location ID, each stop's deadline is its earliest one
+    stops = {}
+    deadlines = {}
+    for package in package_list:
+        location = resolve_location(package)
+        if location is None:
+            continue
+        stops.setdefault(location, []).append(package)
+        if package.deadline != 'EOD' and package.deadline:
+            deadlines[location] = min(package.deadlineMinutes, deadlines.get(location, package.deadlineMinutes))
+
+    ordered_stops = insert_stops(list(stops), start_index, context.hub_index, context.distance_matrix,
+                                 to_minutes(truck.current_time), truck.speed, deadlines)
+    return [package for stop in ordered_stops for package in stops[stop]]
+
+
+# Route constructors by name: each takes (truck, package_list, context) and returns the packages in delivery order
+ROUTE_CONSTRUCTORS = {"greedy": sortPackages_forDelivery, "insertion": insertion_delivery_order}
+
+
+def optimize_route(truck, context=None, improve=True, constructor="greedy"):
+    """
+    Puts the truck's package inventory in delivery order: the constructor's order, then local search if improve is True.
+
+    truck: Truck object whose packageInventory is reordered, its current time is the departure time
+    context: RoutingContext with the address and distance data (defaults to the shared context)
+    improve: If True, the constructed order is improved with local search
+    constructor: Name of the route constructor in ROUTE_CONSTRUCTORS, "greedy" (nearest neighbour) or "insertion"
+
+    Returns the miles saved by the local search.
+    """
+    context = context or get_default_context()
+
+    # Calls the route constructor (sortPackages_forDelivery by default) to sort the packages for delivery
+    truck.packageInventory = ROUTE_CONSTRUCTORS[constructor](truck, truck.packageInventory, context)
+
+    # Improve the greedy order with 2-opt / Or-opt moves
+    miles_saved = 0.0
+    if improve:
+        truck.packageInventory, miles_saved = improve_delivery_order(truck, truck.packageInventory, context)
+    return miles_saved
+
+
+# Routing context of a pool worker process, set by _init_route_worker or inherited when workers are forked
+_worker_context = None
+
+
+def _init_route_worker(address_file, distance_file, cache_dir, hub_address, shortest_paths):
+    """
+    Process pool initializer: maps the compiled distance cache once per worker.
+    """
+    global _worker_context
+    if address_file is not None:
+        _worker_context = RoutingContext(address_file, distance_file, cache_dir, hub_address, shortest_paths).load()
+
+
+def _optimize_route_task(truck, improve, constructor):
+    """
+    Process pool task: optimizes one truck's route in the worker.
+
+    Returns a tuple of (package IDs in delivery order, miles saved).
+    """
+    miles_saved = optimize_route(truck, _worker_context, improve, constructor)
+    return [package.packageID for package in truck.packageInventory], miles_saved
+
+
+def optimize_routes(trucks, context=None, improve=True, workers=None, constructor="greedy"):
+    """
+    Optimizes the routes of several loaded trucks, in parallel on a process pool when workers is not 1.
+    Each truck's route is independent once it is loaded and its departure time is set.
+
+    Workers share the distance matrix read-only: each one maps the same compiled cache file
+    (see matrix_cache), or inherits the parent's matrix when processes are forked.
+    Only package IDs travel back, and the results are merged into the parent's Package objects.
+
+    trucks: List of loaded Truck objects
+    context: RoutingContext with the address and distance data (defaults to the shared context)
+    improve: If True, each constructed order is improved with local search
+    workers: Number of worker processes, None for one per CPU, 1 to run in this process
+    constructor: Name of the route constructor in ROUTE_CONSTRUCTORS
+
+    Returns a dict of truck ID -> miles saved by local search.
+    """
+    global _worker_context
+    context = context or get_default_context()
+    context.load()  # Compile the distance cache once, before any worker maps it
+
+    # Contexts built from in-memory data can only be shared by forking
+    can_share = context.address_file is not None or multiprocessing.get_start_method() == 'fork'
+    if workers == 1 or len(trucks) < 2 or not can_share:
+        return {truck.truckID: optimize_route(truck, context, improve, constructor) for truck in trucks}
+
+    _worker_context = context
+    initargs = (context.address_file, context.distance_file, context.cache_dir, context.hub_address, context.shortest_paths)
+    savings = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_route_worker, initargs=initargs) as pool:
+        futures = [pool.submit(_optimize_route_task, truck, improve, constructor) for truck in trucks]
+
+        # Merge each worker's delivery order back into this process's Package objects
+        for truck, future in zip(trucks, futures):
+            order, miles_saved = future.result()
+            packages_by_id = {package.packageID: package for package in truck.packageInventory}
+            truck.packageInventory = [packages_by_id[package_id] for package_id in order]
+            savings[truck.truckID] = miles_saved
+    return savings
+
+
 def load_truck(truck, packages, package_table, assigned_packages):
     """
     Loads packages onto a truck until it reaches capacity or runs out of packages.
@@ -141,192 +343,297 @@ def total_miles_traveled(truck):
 
     returns the total miles traveled by the truck
     """
-    stops_count = len(truck.truck.packageInventory) 
-
-    return truck.milesTotal_list[stops_count - 1] if stops_count > 0 else 0
+    return truck.timeline.total_miles
 
 
 
-def deliver_packages(truck, package_table):
+def deliver_packages(truck, package_table, improve=True, context=None, miles_saved=None, event_log=None, constructor="greedy"):
     """
     Delivers the packages on the truck's route.
     This method sorts the packages for delivery and updates their statuses.
 
     truck: Truck object to deliver packages
     package_table: HashTable containing all packages
+    improve: If True, the constructed order is improved with local search before driving
+    context: RoutingContext with the address and distance data (defaults to the shared context)
+    miles_saved: Result of an earlier optimize_routes call, if given the inventory is already in delivery order
+    event_log: Optional EventLog that receives the loading, departure, arrival, delivery and return events
+    constructor: Name of the route constructor in ROUTE_CONSTRUCTORS, used unless miles_saved is given
+
+    Returns a RouteSummary with every stop driven.
     """
-    print(f"\nAttention: Truck {truck.truckID} STARTING route at {truck.current_time.strftime('%I:%M %p')} from {truck.currentLocation}.")
+    context = context or get_default_context()
+    depart_time = truck.current_time
+    start_miles = truck.milesTotal
+    stops = []
+
+    # Checked once, so a silent run does no string formatting in the per-stop loop
+    verbose = logger.isEnabledFor(logging.INFO)
+
+    if verbose:
+        logger.info("\nAttention: Truck %s STARTING route at %s from %s.", truck.truckID, truck.current_time.strftime('%I:%M %p'), truck.currentLocation)
 
     packages_delivered = 0
 
-    # Calls the sortPackages_forDelivery method to sort the packages for delivery
-    truck.packageInventory = sortPackages_forDelivery(truck, truck.packageInventory)
+    # Sort (and improve) the packages for delivery unless optimize_routes already did
+    if miles_saved is None:
+        miles_saved = optimize_route(truck, context, improve, constructor)
+    if improve:
+        logger.info("Route improvement saved %.2f miles for Truck %s.", miles_saved, truck.truckID)
+
+    if event_log is not None:
+        event_log.record(truck.current_time, events.DEPARTED, truck_id=truck.truckID, location=truck.currentLocation, miles=truck.milesTotal)
+        for package in truck.packageInventory:
+            event_log.register_package(package)
+            event_log.record(truck.current_time, events.LOADED, package.packageID, truck.truckID)
+            event_log.record(truck.current_time, events.DEPARTED, package.packageID, truck.truckID)
 
     # While there are packages on the truck, deliver them
+    start_index = context.address_index.lookup(truck.currentLocation)
     while truck.packageInventory:
         address = truck.packageInventory[0].get_address()
-        package_index = extract_address(address, address_dict)
-        start_index = extract_address(truck.currentLocation, address_dict)
-        distance = float(distanceBetween(start_index, package_index, distance_matrix))
+        package_index = truck.packageInventory[0].locationID
 
         # Drive to the new address
-        truck.current_time = truck.drive_to(address, distance)
+        truck.current_time = drive_leg(truck, start_index, package_index, address, context)
+        if event_log is not None:
+            event_log.record(truck.current_time, events.ARRIVED, truck_id=truck.truckID, location=address, miles=truck.milesTotal)
 
         # Delivers all packages for a given address
         delivered_packages = []
-        while truck.packageInventory and truck.packageInventory[0].get_address() == address:
+        stop = StopRecord(truck.current_time, address, [], [])
+        while truck.packageInventory and truck.packageInventory[0].locationID == package_index:
             package = truck.packageInventory.pop(0)
 
             # Update package status and delivery time
-            package.deliveryTime = truck.current_time.strftime('%I:%M %p')
+            package.deliveryTime = truck.current_time
             package.status = "Delivered"
             package_table.insert(package.packageID, package)
 
             # Verify if the package was delivered on time
-            package_deadline = package.get_deadline()
-            deadline_datetime = datetime.combine(datetime.today(), package_deadline)
-            delivery_datetime = datetime.strptime(package.deliveryTime, '%I:%M %p')
-            package.was_late = delivery_datetime > deadline_datetime
-            status_tag = "(!) LATE " if package.was_late else "ON TIME"
-
-            delivered_packages.append(f"[{package.packageID}] (Deadline: {package.deadline} - {status_tag})")
-
-        print(f"DELIVERED Packages at {address.ljust(30)} {truck.current_time.strftime('%I:%M %p')} → {' | '.join(delivered_packages)}")
+            package.was_late = time_to_minutes(package.deliveryTime) > package.deadlineMinutes
+            if event_log is not None:
+                event_log.record(package.deliveryTime, events.DELIVERED, package.packageID, truck.truckID, address)
+            delivered_packages.append(package)
+            stop.package_ids.append(package.packageID)
+            if package.was_late:
+                stop.late_package_ids.append(package.packageID)
+
+        if verbose:
+            delivered_tags = [f"[{package.packageID}] (Deadline: {package.deadline} - {'(!) LATE ' if package.was_late else 'ON TIME'})"
+                              for package in delivered_packages]
+            logger.info("DELIVERED Packages at %s %s → %s", address.ljust(30), truck.current_time.strftime('%I:%M %p'), ' | '.join(delivered_tags))
 
         # Update truck location and packages delivered
         truck.currentLocation = address
+        start_index = package_index
         packages_delivered += len(delivered_packages)
+        stops.append(stop)
+    instrumentation.count(instrumentation.STOPS_DRIVEN, len(stops))
+    instrumentation.count(instrumentation.DISTANCE_LOOKUPS, len(stops) + 1)
 
     # Return to hub
-    hub_index = extract_address("4001 South 700 East", address_dict)
-    start_index = extract_address(truck.currentLocation, address_dict)
-    distance = float(distanceBetween(start_index, hub_index, distance_matrix))
-
-    truck.current_time = truck.drive_to(hub_index, distance)
-    truck.return_to_hub()
+    truck.current_time = drive_leg(truck, start_index, context.hub_index, context.hub_address, context)
+    truck.return_to_hub(context.hub_address)
+    if event_log is not None:
+        event_log.record(truck.returnTime, events.RETURNED, truck_id=truck.truckID, location=truck.currentLocation, miles=truck.milesTotal)
 
 
-    print(f"\nTruck {truck.truckID} RETURNED to hub at {truck.returnTime.strftime('%I:%M %p')}.")
-    print(f"{packages_delivered} PACKAGES delivered by Truck {truck.truckID}.")
-    print("============================ END OF ROUTE ============================\n")
+    if verbose:
+        logger.info("\nTruck %s RETURNED to hub at %s.", truck.truckID, truck.returnTime.strftime('%I:%M %p'))
+        logger.info("%s PACKAGES delivered by Truck %s.", packages_delivered, truck.truckID)
+        logger.info("============================ END OF ROUTE ============================\n")
 
+    return RouteSummary(truck.truckID, depart_time, truck.returnTime, truck.milesTotal - start_miles, miles_saved, packages_delivered, stops)
 
 
 
 
 
 
-def plan_deliveries(trucks, package_table):
-    """
-    Plans the delivery routes for the trucks based on the package data.
-    This method loads the trucks with packages and calls the deliver_packages method to deliver them.
-    Handles special cases like delayed packages and grouped packages.
 
-    trucks: List of Truck objects to plan deliveries for
-    package_table: HashTable containing
+def drive_leg(truck, from_index, to_index, address, context=None):
     """
+    Drives a truck from one location to another.
+    A shortest path (see shortest_paths) can lead through other locations in the table. The truck then drives
+    every hop of the path as its own leg, so its timeline and position_at show where it really is.
 
-    # Global Set to Track Assigned Packages
-    assigned_packages = set()
-
-    # List to track Delayed Packages (like Package #9)
-    delayed_packages = []
-
-    # Initialize the package list and sort for loading
-    all_packages = [package_table.search(i) for i in range(1, 41) if package_table.search(i)]
-    all_packages = sortPackages_forLoading(all_packages)
-
-    # Remove packages that are delayed or have errors
-    for package in all_packages[:]:
-        if package.packageID == 9:
-            delayed_packages.append(package)
-            all_packages.remove(package)
-
-    # Initalize grouped packages and delayed packages for Truck 1 and Truck 2
-    group_A_packages = [package_table.search(i) for i in [20, 13, 15, 19, 14, 16]]
-    delayed_packages_truck2 = [package_table.search(i) for i in [6, 25, 28, 32]]
-
-    # Update Arrival Time for Delayed Packages
-    for package in range(1, 41):
-        package = package_table.search(package)
-        if package in delayed_packages_truck2:
-            package.hubArrivalTime = datetime.combine(datetime.today(), time(9, 5))
-
-    # Sort the grouped packages for loading
-    group_A_packages = sortPackages_forLoading(group_A_packages)
-
-    # Assign the first truck object
-    truck_1 = trucks[0]
-
-    # Load Group A packages first
-    load_truck(truck_1, group_A_packages, package_table, assigned_packages)
-
-    assigned_packages.update(pkg.packageID for pkg in group_A_packages)  
+    truck: Truck object at location from_index
+    from_index: Location ID the truck starts from
+    to_index: Location ID of the destination
+    address: Address of the destination
+    context: RoutingContext with the address and distance data (defaults to the shared context)
 
-    # Remove assigned packages before filling Truck 1
-    remaining_packages = [pkg for pkg in all_packages if pkg.packageID not in assigned_packages and pkg.packageID not in {p.packageID for p in delayed_packages_truck2}]
-
-    # Load remaining packages onto Truck 1
-    load_truck(truck_1, remaining_packages, package_table, assigned_packages)
-
-    # Assign the second truck object and set the current time to 9:05 AM (this will be used as truck 2's departure time)
-    truck_2 = trucks[1]
-    truck_2.current_time = datetime.combine(datetime.today(), time(9, 5))  
-
-    # Sort the packages that were delayed for Truck 2 and load them first
-    delayed_packages_truck2 = sortPackages_forLoading(delayed_packages_truck2)
-    load_truck(truck_2, delayed_packages_truck2, package_table, assigned_packages)
-
-    # Remove assigned packages before filling Truck 2 with remaining packages
-    remaining_packages = [pkg for pkg in remaining_packages if pkg.packageID not in assigned_packages]
-    load_truck(truck_2, remaining_packages, package_table, assigned_packages)
-
-    # Assign the third truck object
-    truck_3 = trucks[2]
-
-    # Deliver packages for Truck 1 and Truck 2
-    deliver_packages(truck_1, package_table)
-    deliver_packages(truck_2, package_table)
+    Returns the arrival time.
+    """
+    context = context or get_default_context()
+    distance_matrix = context.distance_matrix
+    if distance_matrix.next_hops is not None:
+        path = distance_matrix.path(from_index, to_index)
+        if path and len(path) > 2:
+            via = [context.address_index.address(location) for location in path[1:-1]]
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(" Via: %s", " → ".join(via))
+            for hop_from, hop_to, hop_address in zip(path, path[1:-1], via):
+                truck.drive_to(hop_address, distance_matrix.distance(hop_from, hop_to))
+            instrumentation.count(instrumentation.DISTANCE_LOOKUPS, len(via))
+            from_index = path[-2]
+    return truck.drive_to(address, distance_matrix.distance(from_index, to_index))
+
+
+def apply_address_correction(package, correction, context=None, event_log=None):
+    """
+    Replaces a package's wrong address with its correction and re-resolves its location.
 
-    # Find the earliest available driver return time by comparing Truck 1 and Truck 2's return times
-    earliest_driver_available = min(truck_1.returnTime, truck_2.returnTime)
+    package: Package object with the wrong address
+    correction: AddressCorrection for the package
+    context: RoutingContext with the address and distance data (defaults to the shared context)
+    event_log: Optional EventLog that receives the correction event
+    """
+    context = context or get_default_context()
+    package.oldAddress = package.address # Store original address
+    package.address = correction.address
+    if correction.zip_code:
+        package.zipCode = correction.zip_code
+    package.updateTime = datetime.combine(datetime.today(), correction.time)
+    package.locationID = None
+    context.address_index.resolve(package)  # Re-resolve the location ID for the corrected address
+    if event_log is not None:
+        event_log.record(package.updateTime, events.ADDRESS_CORRECTED, package.packageID, location=package.address)
+
+
+def load_truck_constrained(truck, units, package_table, assigned_packages, constraints, depart_time=None):
+    """
+    Loads whole loading units (must-ride-with groups or single packages) onto a truck while respecting the constraints.
+    The units are chosen by select_units (see assignment).
 
-    # Convert 12:00 PM into a datetime object with the same date as earliest_driver_available
-    noon_time = datetime.combine(earliest_driver_available.date(), datetime.strptime("12:00 PM", "%I:%M %p").time())
+    truck: Truck object to load packages onto
+    units: List of Package lists from PackageConstraints.loading_units, in loading order
+    package_table: HashTable containing all packages
+    assigned_packages: Set of package IDs that have already been assigned to a truck
+    constraints: PackageConstraints parsed from the manifest
+    depart_time: Time the truck leaves the hub, None if the truck waits for whatever it loads
+    """
+    for position in select_units(truck, units, assigned_packages, constraints, depart_time):
+        load_truck(truck, units[position], package_table, assigned_packages)
 
-    # Ensure Truck 3 departs no earlier than the earliest driver return time or 12:00 PM (Truck 3 will never depart before noon)
-    truck_3.departTime = max(earliest_driver_available, noon_time)
-    truck_3.current_time = truck_3.departTime
 
-    # Package 9 was initially assigned an incorrect address and must be corrected at 10:20 AM.
-    # This update ensures the correct address is used when it's scheduled for delivery.
-    for package in delayed_packages:
-        if package.packageID == 9:
-            package.oldAddress = package.address # Store original address
+def prepare_packages(package_table, context=None, event_log=None, constraints=None, corrections=None):
+    """
+    Gets the packages ready for planning: parses their constraints, sets the hub arrival time of delayed
+    packages and applies the address corrections, recording both in the event log.
 
-            package.address = "410 S State St" 
-            package.updateTime = datetime.strptime("10:20 AM", "%I:%M %p") 
+    package_table: HashTable containing all packages
+    context: RoutingContext with the address and distance data (defaults to the shared context)
+    event_log: Optional EventLog that receives the hub arrival and address correction events
+    constraints: PackageConstraints to plan with (parsed from the packages' special notes if omitted)
+    corrections: Dict of package ID -> AddressCorrection used when parsing (DEFAULT_CORRECTIONS if omitted)
 
+    Returns a tuple of (list of every Package sorted by ID, PackageConstraints).
+    """
+    context = context or get_default_context()
+    all_packages = sorted(package_table.values(), key=lambda package: package.packageID)
+    if constraints is None:
+        constraints = PackageConstraints.from_packages(all_packages, DEFAULT_CORRECTIONS if corrections is None else corrections)
+
+    # Record when delayed packages arrive at the hub and correct wrong addresses
+    for package_id, arrival in constraints.hub_arrival.items():
+        package = package_table.search(package_id)
+        if package is not None:
+            package.hubArrivalTime = datetime.combine(datetime.today(), arrival)
+            if event_log is not None:
+                event_log.record(package.hubArrivalTime, events.HUB_ARRIVAL, package.packageID)
+    for package_id, correction in constraints.corrections.items():
+        package = package_table.search(package_id)
+        if package is not None:
+            apply_address_correction(package, correction, context, event_log)
+    return all_packages, constraints
+
+
+def plan_deliveries(trucks, package_table, context=None, workers=1, event_log=None, constraints=None, corrections=None,
+                    assignment="sequential", constructor="greedy"):
+    """
+    Plans the delivery routes for the trucks based on the package data.
+    This method loads the trucks with packages and calls the deliver_packages method to deliver them.
+    Special cases (grouped packages, truck restrictions, delayed packages and address corrections) come from
+    the constraints parsed from the manifest's special notes.
 
-    # Load Truck 3 with delayed packages first
-    load_truck(truck_3, delayed_packages, package_table, assigned_packages)
+    Trucks with a departure time leave at that time. Trucks created with datetime.max wait for a driver:
+    they leave when the first driver returns, and not before every package they carry is ready at the hub.
 
-    # Load remaining packages onto Truck 3
-    remaining_packages = [pkg for pkg in all_packages if pkg.packageID not in assigned_packages]
-    load_truck(truck_3, remaining_packages, package_table, assigned_packages)
+    trucks: List of Truck objects to plan deliveries for
+    package_table: HashTable containing all packages
+    context: RoutingContext with the address and distance data (defaults to the shared context)
+    workers: Number of processes used to optimize independent truck routes (1 runs everything in this process)
+    event_log: Optional EventLog to record the day into, a new one is created otherwise
+    constraints: PackageConstraints to plan with (parsed from the packages' special notes if omitted)
+    corrections: Dict of package ID -> AddressCorrection used when parsing (DEFAULT_CORRECTIONS if omitted)
+    assignment: Truck assignment stage, "sequential" (the loader in departure order) or "cluster" (see assignment)
+    constructor: Route constructor in ROUTE_CONSTRUCTORS, "greedy" (nearest neighbour) or "insertion" (deadline-driven)
+
+    Returns the EventLog of the planned day.
+    """
+    context = context or get_default_context()
+    if event_log is None:
+        event_log = events.EventLog()
+
+    with instrumentation.stage("prepare_packages"):
+        all_packages, constraints = prepare_packages(package_table, context, event_log, constraints, corrections)
+
+    # Sort the packages for loading, group them into loading units and decide which truck carries each unit
+    with instrumentation.stage("sort_for_loading"):
+        units = constraints.loading_units(sortPackages_forLoading(all_packages, context=context))
+    with instrumentation.stage("assign_trucks"):
+        loads = ASSIGNERS[assignment](trucks, units, constraints, context)
+    if logger.isEnabledFor(logging.INFO) and assignment != "sequential":
+        baseline = assign_sequential(trucks, units, constraints, context)
+        logger.info("Truck assignment (%s): %.2f estimated miles and %s late, sequential loader: %.2f estimated miles and %s late.",
+                    assignment, *evaluate_loads(trucks, loads, context), *evaluate_loads(trucks, baseline, context))
+    assigned_packages = set()
 
-    # Deliver packages for Truck 3
-    deliver_packages(truck_3, package_table)
+    # Trucks with a fixed departure time leave with their loads at that time
+    scheduled_trucks, waiting_trucks = split_trucks(trucks)
+    with instrumentation.stage("load_trucks"):
+        for truck in scheduled_trucks:
+            truck.current_time = truck.departTime
+            load_truck(truck, loads[truck.truckID], package_table, assigned_packages)
+
+    # Their routes are optimized independently (in parallel if workers > 1)
+    with instrumentation.stage("route"):
+        savings = optimize_routes(scheduled_trucks, context, workers=workers, constructor=constructor)
+    with instrumentation.stage("deliver"):
+        for truck in scheduled_trucks:
+            deliver_packages(truck, package_table, context=context, miles_saved=savings[truck.truckID], event_log=event_log)
+
+    # Waiting trucks take the next driver back at the hub, and leave once their packages are ready
+    driver_returns = [truck.returnTime for truck in scheduled_trucks]
+    heapq.heapify(driver_returns)
+    for truck in waiting_trucks:
+        with instrumentation.stage("load_trucks"):
+            load_truck(truck, loads[truck.truckID], package_table, assigned_packages)
+        if not truck.packageInventory:
+            continue
+        ready_times = [datetime.combine(datetime.today(), constraints.ready_time(package.packageID))
+                       for package in truck.packageInventory if constraints.ready_time(package.packageID) is not None]
+        driver_available = heapq.heappop(driver_returns) if driver_returns else truck.departTime
+        truck.departTime = max([driver_available, *ready_times])
+        truck.current_time = truck.departTime
+        with instrumentation.stage("route"):
+            miles_saved = optimize_route(truck, context, constructor=constructor)
+        with instrumentation.stage("deliver"):
+            deliver_packages(truck, package_table, context=context, miles_saved=miles_saved, event_log=event_log)
+        heapq.heappush(driver_returns, truck.returnTime)
+
+    unassigned = [package.packageID for package in all_packages if package.packageID not in assigned_packages]
+    if unassigned:
+        logger.warning("%s packages could not be loaded onto any truck: %s", len(unassigned), unassigned)
 
     sum_miles = 0
     # Total miles traveled for all trucks
     for truck in trucks:
         sum_miles += truck.milesTotal if truck.milesTotal > 0 else 0
-    print(f"TOTAL MILES TRAVELED FOR ALL TRUCKS = {sum_miles:.2f} miles")
-
-    print("\nALL PACKAGES DELIVERED.\n\n\n\n\n\n\n")
-
-
-
+    logger.info("TOTAL MILES TRAVELED FOR ALL TRUCKS = %.2f miles", sum_miles)
 
+    logger.info("\nALL PACKAGES DELIVERED.\n\n\n\n\n\n\n")
 
+    return event_log
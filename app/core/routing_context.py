@@ -0,0 +1,99 @@
+"""
+This module contains the RoutingContext class which holds the address index and distance matrix used by routing.
+
+Nothing is read when this module (or app.core.routing) is imported. The data is loaded from the configured
+paths the first time a routing function needs it, so the planner can be embedded in a service or worker
+pool and pointed at other data files without touching the routing code.
+"""
+from app.data_utils.data_handler import ADDRESS_FILE, DISTANCE_FILE
+from app.data_utils.matrix_cache import CACHE_DIR, load_routing_data
+
+HUB_ADDRESS = "4001 South 700 East"
+
+
+class RoutingContext:
+    def __init__(self, address_file=ADDRESS_FILE, distance_file=DISTANCE_FILE, cache_dir=CACHE_DIR, hub_address=HUB_ADDRESS,
+                 shortest_paths=False):
+        """
+        address_file: Path to the address CSV file
+        distance_file: Path to the distance CSV file
+        cache_dir: Directory for the compiled distance cache (see matrix_cache)
+        hub_address: Address every truck starts from and returns to
+        shortest_paths: If True, routes use shortest path distances through the table (see shortest_paths)
+        """
+        self.address_file = address_file
+        self.distance_file = distance_file
+        self.cache_dir = cache_dir
+        self.hub_address = hub_address
+        self.shortest_paths = shortest_paths
+        self._address_index = None
+        self._distance_matrix = None
+
+    @classmethod
+    def from_data(cls, address_index, distance_matrix, hub_address=HUB_ADDRESS):
+        """
+        Creates a context around an already loaded address index and distance matrix.
+        A matrix from shortest_paths (with next hops) makes a shortest path context.
+        """
+        context = cls(address_file=None, distance_file=None, hub_address=hub_address,
+                      shortest_paths=distance_matrix.next_hops is not None)
+        context._address_index = address_index
+        context._distance_matrix = distance_matrix
+        return context
+
+    @property
+    def loaded(self):
+        return self._distance_matrix is not None
+
+    def load(self):
+        """
+        Loads the address index and distance matrix if they have not been loaded yet.
+
+        Returns the context so calls can be chained.
+        """
+        if not self.loaded:
+            self._address_index, self._distance_matrix = load_routing_data(self.address_file, self.distance_file, self.cache_dir,
+                                                                           self.shortest_paths)
+        return self
+
+    @property
+    def address_index(self):
+        return self.load()._address_index
+
+    @property
+    def distance_matrix(self):
+        return self.load()._distance_matrix
+
+    @property
+    def hub_index(self):
+        return self.address_index.lookup(self.hub_address)
+
+    def resolve_location(self, package):
+        """
+        Returns the package's cached location ID, resolving it from the address index on first use.
+        """
+        if package.locationID is None:
+            return self.address_index.resolve(package)
+        return package.locationID
+
+
+# Context used by routing functions that are not given one explicitly
+_default_context = None
+
+
+def get_default_context():
+    """
+    Returns the shared default RoutingContext, creating it (without loading anything) on first use.
+    """
+    global _default_context
+    if _default_context is None:
+        _default_context = RoutingContext()
+    return _default_context
+
+
+def set_default_context(context):
+    """
+    Replaces the shared default RoutingContext, for example to point at other data files.
+    """
+    global _default_context
+    _default_context = context
@@ -0,0 +1,164 @@
+"""
+This module contains the discrete-event trip scheduler, which lets trucks make several trips a day with a limited pool of drivers.
+
+Two priority queues (heapq) drive the simulation:
+- trucks waiting at the hub, keyed by the time they are available (and the driver already holding them, if any)
+- free drivers, keyed by the time they are back at the hub
+
+The earliest truck is taken from the queue and given the earliest free driver. If that driver is only free later,
+the truck goes back into the queue for that time with the driver reserved, so every dispatch happens in time order.
+A dispatched truck is loaded with whatever is ready at the hub at its departure time (see select_units), its route
+is ordered and driven with deliver_packages, and the truck and driver are both queued again for the return time
+so the truck can reload for another trip. A truck with nothing ready waits for the next hub arrival or address
+correction it could carry, and is retired once nothing is left for it. A truck with room and only EOD packages
+holds its trip for up to HOLD_MINUTES when another package it could carry is about to be ready.
+
+Trucks created with a fixed departure time are first available at that time, each with a driver committed to it
+while drivers last. Trucks created with datetime.max wait for a free driver from the start of the day.
+
+Each dispatch is O(log trucks + log drivers) for the queues plus one scan of the loading units, so a day with
+hundreds of trucks and thousands of packages is dominated by route ordering, not scheduling.
+"""
+import heapq
+import logging
+from datetime import datetime, time, timedelta
+from itertools import count
+from app.core import events
+from app.core.assignment import EOD_MINUTES, select_units, split_trucks
+from app.core.records import TripRecord
+from app.core.routing import deliver_packages, load_truck, prepare_packages, sortPackages_forLoading
+from app.core.routing_context import get_default_context
+
+logger = logging.getLogger(__name__)
+
+# Start of the day when no truck has a fixed departure time
+DAY_START = time(8, 0)
+
+# A truck carrying no deadline packages waits up to this long for a package about to arrive at the hub
+HOLD_MINUTES = 30
+
+
+def _next_ready_time(truck, units, assigned_packages, constraints, after):
+    # Earliest time after `after` at which an unassigned unit this truck may carry becomes ready, or None
+    next_ready = None
+    for unit in units:
+        first_id = unit[0].packageID
+        if first_id in assigned_packages:
+            continue
+        allowed_truck = constraints.allowed_truck(first_id)
+        if allowed_truck is not None and allowed_truck != truck.truckID:
+            continue
+        ready = constraints.ready_time(first_id)
+        if ready is not None and ready > after.time() and (next_ready is None or ready < next_ready):
+            next_ready = ready
+    return datetime.combine(after.date(), next_ready) if next_ready is not None else None
+
+
+def _requeue(idle_trucks, truck_queue, when, sequence):
+    # A driver was handed back, so trucks that found none try again from `when`
+    for truck in idle_trucks:
+        heapq.heappush(truck_queue, (when, next(sequence), truck, None))
+    idle_trucks.clear()
+
+
+def plan_trips(trucks, package_table, drivers, context=None, event_log=None, constraints=None, corrections=None,
+               improve=True, day_start=None, hold_minutes=HOLD_MINUTES, constructor="greedy"):
+    """
+    Plans the day as trips: trucks reload at the hub and go out again until every package is delivered.
+
+    trucks: List of Truck objects (see the module docstring for how their departure times are used)
+    package_table: HashTable containing all packages
+    drivers: Number of drivers, at most this many trucks are on the road at once
+    context: RoutingContext with the address and distance data (defaults to the shared context)
+    event_log: Optional EventLog to record the day into, a new one is created otherwise
+    constraints: PackageConstraints to plan with (parsed from the packages' special notes if omitted)
+    corrections: Dict of package ID -> AddressCorrection used when parsing (DEFAULT_CORRECTIONS if omitted)
+    improve: If True, every trip's constructed order is improved with local search
+    day_start: datetime the drivers without a fixed truck start work (the earliest fixed departure, or 8:00 AM)
+    hold_minutes: How long a truck with room and no deadline packages waits for the next package it could carry
+    constructor: Route constructor of every trip, "greedy" or "insertion" (see ROUTE_CONSTRUCTORS)
+
+    Returns a tuple of (EventLog of the planned day, list of TripRecord in dispatch order).
+    """
+    context = context or get_default_context()
+    if event_log is None:
+        event_log = events.EventLog()
+
+    all_packages, constraints = prepare_packages(package_table, context, event_log, constraints, corrections)
+    units = constraints.loading_units(sortPackages_forLoading(all_packages, context=context))
+    total_packages = sum(len(unit) for unit in units)
+
+    scheduled, waiting = split_trucks(trucks)
+    if day_start is None:
+        day_start = scheduled[0].departTime if scheduled else datetime.combine(datetime.today(), DAY_START)
+
+    # The first drivers are committed to the fixed departures, the rest are free from the start of the day
+    sequence = count()
+    committed = min(drivers, len(scheduled))
+    free_drivers = [(day_start, driver_id) for driver_id in range(committed + 1, drivers + 1)]
+    heapq.heapify(free_drivers)
+
+    # Queue entries: (available time, tie-break, truck, reserved driver ID or None)
+    truck_queue = [(truck.departTime, next(sequence), truck, index + 1 if index < committed else None)
+                   for index, truck in enumerate(scheduled)]
+    truck_queue += [(day_start, next(sequence), truck, None) for truck in waiting]
+    heapq.heapify(truck_queue)
+    idle_trucks = []  # Trucks that found no free driver, queued again after the next dispatch
+
+    assigned_packages = set()
+    dispatched = set()  # IDs of trucks that have made a trip
+    trips = []
+    while truck_queue and len(assigned_packages) < total_packages:
+        available, _, truck, driver_id = heapq.heappop(truck_queue)
+
+        # Give the truck the earliest free driver, waiting for them if they are still out
+        if driver_id is None:
+            if not free_drivers:
+                idle_trucks.append(truck)
+                continue
+            driver_free, driver_id = heapq.heappop(free_drivers)
+            if driver_free > available:
+                heapq.heappush(truck_queue, (driver_free, next(sequence), truck, driver_id))
+                continue
+
+        depart_time = available
+        chosen = select_units(truck, units, assigned_packages, constraints, depart_time)
+        if not chosen:
+            # Nothing is ready for this truck: hand the driver back and wait for the next package it could carry
+            heapq.heappush(free_drivers, (depart_time, driver_id))
+            next_ready = _next_ready_time(truck, units, assigned_packages, constraints, depart_time)
+            if next_ready is not None:
+                heapq.heappush(truck_queue, (next_ready, next(sequence), truck, None))
+            _requeue(idle_trucks, truck_queue, depart_time, sequence)
+            continue
+
+        # Hold a trip without deadline packages for a package about to arrive, if there is room for it
+        if hold_minutes and sum(len(units[position]) for position in chosen) < truck.capacity and \
+                all(package.deadlineMinutes >= EOD_MINUTES for position in chosen for package in units[position]):
+            next_ready = _next_ready_time(truck, units, assigned_packages, constraints, depart_time)
+            if next_ready is not None and next_ready <= depart_time + timedelta(minutes=hold_minutes):
+                heapq.heappush(truck_queue, (next_ready, next(sequence), truck, driver_id))
+                continue
+
+        # Load and drive the trip
+        truck.current_time = depart_time
+        if truck.truckID not in dispatched:
+            truck.departTime = depart_time  # First departure of the day
+            dispatched.add(truck.truckID)
+        for position in chosen:
+            load_truck(truck, units[position], package_table, assigned_packages)
+        route = deliver_packages(truck, package_table, improve=improve, context=context, event_log=event_log,
+                                 constructor=constructor)
+        trips.append(TripRecord(len(trips) + 1, truck.truckID, driver_id, route))
+
+        # Truck and driver are both back at the hub at the return time
+        heapq.heappush(truck_queue, (truck.returnTime, next(sequence), truck, None))
+        heapq.heappush(free_drivers, (truck.returnTime, driver_id))
+        _requeue(idle_trucks, truck_queue, depart_time, sequence)
+
+    unassigned = [package.packageID for package in all_packages if package.packageID not in assigned_packages]
+    if unassigned:
+        logger.warning("%s packages could not be loaded onto any truck: %s", len(unassigned), unassigned)
+    logger.info("TOTAL MILES TRAVELED FOR ALL TRUCKS = %.2f miles over %s trips", sum(trip.route.miles for trip in trips), len(trips))
+
+    return event_log, trips
@@ -1,41 +1,166 @@
 """
 This module handles the loading of data from CSV files and provides utility functions for extracting address data.
+
+Package manifests are streamed: `iter_package_chunks` reads a plain or gzip-compressed CSV from a path or
+file-like object and yields validated Package objects in fixed-size chunks, so memory stays bounded no
+matter how large the manifest is. Malformed rows are reported and skipped instead of aborting the load.
 """
 import csv
-from app.models.package import Package
-from app.models.hash_table import ChainingHashTable  # Import the custom hash table
+import gzip
+import io
+import logging
+import os
+from collections import namedtuple
+from contextlib import contextmanager
+from app.models.package import Package, parse_deadline
+from app.models.hash_table import OpenAddressingHashTable  # Import the custom hash table
+from app.models.distance_matrix import AddressIndex, DistanceMatrix
+
+logger = logging.getLogger(__name__)
 
 ADDRESS_FILE = "./data/address_file.csv"
 DISTANCE_FILE = "./data/distance_file.csv"
 
-def load_package_data(file):
+# Number of packages yielded per chunk by iter_package_chunks
+PACKAGE_CHUNK_SIZE = 10_000
+
+# First two bytes of every gzip stream
+GZIP_MAGIC = b"\x1f\x8b"
+
+# A manifest row that failed validation: CSV line number, raw row, and the reason it was skipped
+MalformedRow = namedtuple("MalformedRow", ["line_number", "row", "reason"])
+
+
+@contextmanager
+def open_manifest(source):
+    """
+    Opens a package manifest for reading as text.
+    Accepts a file path or a file-like object (text or binary), gzip-compressed or not.
+    Streams passed in by the caller are left open.
+    """
+    if isinstance(source, io.TextIOBase):
+        yield source
+        return
+
+    owned = isinstance(source, (str, bytes, os.PathLike))
+    raw = binary = open(source, 'rb') if owned else source
+
+    # Detect gzip from the stream itself rather than trusting the file extension
+    if hasattr(binary, 'peek'):
+        magic = binary.peek(2)[:2]
+    else:
+        position = binary.tell()
+        magic = binary.read(2)
+        binary.seek(position)
+    if magic == GZIP_MAGIC:
+        binary = gzip.GzipFile(fileobj=binary)
+
+    text = io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+    try:
+        yield text
+    finally:
+        if owned:
+            text.close()
+            raw.close()  # A GzipFile does not close the file it reads from
+        else:
+            text.detach()  # Don't close the caller's stream
+
+
+def parse_package_row(row):
+    """
+    Validates and coerces one manifest row into a Package object.
+
+    Raises ValueError with the reason if the row is malformed.
+    """
+    if len(row) < 7:
+        raise ValueError(f"expected at least 7 columns, found {len(row)}")
+
+    try:
+        packageID = int(row[0])
+    except ValueError:
+        raise ValueError(f"invalid package ID {row[0]!r}") from None
+
+    address = row[1].strip()
+    if not address:
+        raise ValueError("missing address")
+
+    deadline = row[5].strip()
+    try:
+        parse_deadline(deadline)
+    except ValueError:
+        raise ValueError(f"invalid deadline {row[5]!r}") from None
+
+    try:
+        weight = float(row[6])
+    except ValueError:
+        raise ValueError(f"invalid weight {row[6]!r}") from None
+
+    city = row[2]
+    state = row[3]
+    zipCode = row[4]
+    special_notes = row[7] if len(row) > 7 else None
+    status = "At Hub"
+
+    return Package(packageID, address, deadline, city, state, zipCode, weight, status, special_notes=special_notes)
+
+
+def iter_package_chunks(source, chunk_size=PACKAGE_CHUNK_SIZE, address_index=None, errors=None):
+    """
+    Streams a package manifest and yields lists of at most chunk_size Package objects.
+    The header row is skipped. Each row is validated and coerced in a single pass.
+
+    source: File path or file-like object, plain or gzip-compressed CSV
+    chunk_size: Maximum number of packages per yielded list
+    address_index: Optional AddressIndex used to resolve each package's location ID
+    errors: Optional list that receives a MalformedRow for every skipped row, otherwise they are logged as warnings
+    """
+    with open_manifest(source) as stream:
+        csv_reader = csv.reader(stream)
+        next(csv_reader, None)
+
+        chunk = []
+        for row in csv_reader:
+            if not row:
+                continue
+            try:
+                package = parse_package_row(row)
+            except ValueError as error:
+                malformed = MalformedRow(csv_reader.line_num, row, str(error))
+                if errors is not None:
+                    errors.append(malformed)
+                else:
+                    logger.warning("Skipping manifest line %s: %s", malformed.line_number, malformed.reason)
+                continue
+
+            if address_index is not None:
+                address_index.resolve(package)
+            chunk.append(package)
+
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+
+        if chunk:
+            yield chunk
+
+
+def load_package_data(file, address_index=None, package_table=None, chunk_size=PACKAGE_CHUNK_SIZE, errors=None):
     """
     Loads package data from a CSV file and populates the package hash table.
+    The manifest is streamed in chunks (see iter_package_chunks), so it may be a path or file-like object
+    and may be gzip-compressed. If an AddressIndex is given, each package's location ID is resolved once here.
+
+    package_table: Optional existing hash table to add the packages to, a new one is created otherwise
 
     Returns the populated hash table.
     """
     # Create a hash table to store the package data
-    package_table = ChainingHashTable()  
-
-    with open(file, newline='') as csvfile:
-        csv_reader = csv.reader(csvfile)
-        next(csv_reader) 
+    if package_table is None:
+        package_table = OpenAddressingHashTable()  
 
-        for row in csv_reader:
-            packageID = int(row[0])
-            address = row[1]  
-            city = row[2]
-            state = row[3]
-            zipCode = row[4]
-            deadline = row[5]
-            weight = float(row[6])
-            special_notes = row[7] if len(row) > 7 else None 
-            status = "At Hub"
-
-            # Create Package object and insert into the hash table
-            package = Package(packageID, address, deadline, city, state, zipCode, weight, status)
-            package.special_notes = special_notes 
-            package_table.insert(packageID, package)
+    for chunk in iter_package_chunks(file, chunk_size, address_index, errors):
+        for package in chunk:
+            package_table.insert(package.packageID, package)
 
     # Return the populated hash table
     return package_table  
@@ -58,7 +183,7 @@ def load_address_data(file):
                 address = row[1].strip() # Use the second column as the address
                 address_dict[address] = idx  # Assign each address a unique index
             else:
-                print(f"Skipping row {idx} due to missing address.")
+                logger.warning("Skipping row %s due to missing address.", idx)
 
     # Return the populated address dictionary
     return address_dict
@@ -90,6 +215,34 @@ def load_distance_data(file):
 
 
 
+def load_address_index(file):
+    """
+    Loads address data from a CSV file into an AddressIndex.
+    Location IDs match the indices returned by load_address_data.
+
+    Returns the populated AddressIndex.
+    """
+    address_dict = load_address_data(file)
+
+    # Rows skipped for a missing address keep their position so the IDs line up with the distance file
+    addresses = [None] * (max(address_dict.values()) + 1 if address_dict else 0)
+    for address, idx in address_dict.items():
+        addresses[idx] = address
+
+    return AddressIndex(addresses)
+
+
+def load_distance_matrix(file):
+    """
+    Loads distance data from a CSV file into a flat DistanceMatrix.
+    Missing values are mirrored the same way as load_distance_data.
+
+    Returns the populated DistanceMatrix.
+    """
+    return DistanceMatrix.from_rows(load_distance_data(file))
+
+
+
 def extract_address(address, address_dict):
     """
     Extracts the index of an address from the address dictionary.
@@ -104,7 +257,7 @@ def extract_address(address, address_dict):
     if address in address_dict:
         return address_dict[address]
 
-    print(f"ERROR: Address '{address}' not found in address_dict!")
+    logger.error("ERROR: Address '%s' not found in address_dict!", address)
     return None  # Prevent crashing if address is not found
 
 
@@ -0,0 +1,173 @@
+"""
+This module compiles the address and distance CSV files into a binary cache file and loads it with mmap.
+
+Parsing the CSVs and mirroring the triangular distance table is O(n^2) Python work on every start.
+The compiled file holds the finished address table and the symmetric, filled matrix as raw doubles,
+so loading it is a header check plus an mmap. The file is opened read-only, so every worker process
+that maps it shares the same page-cached copy.
+
+The file name and header carry a SHA-256 of the source CSVs, so editing either CSV compiles a new file.
+With the optional shortest path stage (see shortest_paths) the file holds the shortest distances and their
+next hops instead of the table as listed, under its own file name.
+
+File layout (little-endian header, matrix in native byte order):
+    header   magic, format version, byte order, flags, location count, source digest, address block size
+    addresses  UTF-8 addresses joined by newlines (a skipped address row is an empty line)
+    padding  zero bytes up to the next multiple of 8
+    matrix   location count * location count doubles, row-major
+    next hops  location count * location count 32-bit location IDs, row-major (only with FLAG_SHORTEST_PATHS)
+
+Compile ahead of time from the repository root with:
+    python -m app.data_utils.matrix_cache [address file] [distance file] [--shortest-paths]
+"""
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+from app.data_utils.data_handler import ADDRESS_FILE, DISTANCE_FILE, load_address_index, load_distance_matrix
+from app.data_utils.shortest_paths import shortest_paths as compute_shortest_paths
+from app.models.distance_matrix import AddressIndex, DistanceMatrix
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = "./data/.cache"
+CACHE_MAGIC = b"WGUPSDM\0"
+CACHE_VERSION = 2
+BYTE_ORDERS = {"little": 0, "big": 1}
+
+# Header flags
+FLAG_SHORTEST_PATHS = 1  # Distances are shortest paths and a next hop block follows the matrix
+
+# magic, version, byte order, flags, location count, source digest, address block size
+HEADER = struct.Struct("<8sHHHI32sQ")
+
+
+def source_digest(*files):
+    """
+    Returns the SHA-256 digest of the cache format version and the contents of every source file.
+    """
+    digest = hashlib.sha256(f"{CACHE_VERSION}".encode())
+    for file in files:
+        with open(file, 'rb') as source:
+            for block in iter(lambda: source.read(1 << 20), b""):
+                digest.update(block)
+    return digest.digest()
+
+
+def cache_path_for(digest, cache_dir=CACHE_DIR, shortest_paths=False):
+    """
+    Returns the cache file path for a source digest, and whether the file holds shortest paths.
+    """
+    kind = "paths" if shortest_paths else "distances"
+    return os.path.join(cache_dir, f"{kind}-v{CACHE_VERSION}-{digest.hex()[:16]}.bin")
+
+
+def write_distance_cache(path, address_index, distance_matrix, digest):
+    """
+    Writes an address index and distance matrix (with its next hops, if it has them) to a binary cache file.
+    The file is written to a temporary name first and then renamed, so readers never see a partial file.
+    """
+    addresses = "\n".join(address or "" for address in address_index.addresses).encode('utf-8')
+    flags = FLAG_SHORTEST_PATHS if distance_matrix.next_hops is not None else 0
+    header = HEADER.pack(CACHE_MAGIC, CACHE_VERSION, BYTE_ORDERS[sys.byteorder], flags, distance_matrix.size,
+                         digest, len(addresses))
+    padding = b"\0" * (-(len(header) + len(addresses)) % 8)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as cache_file:
+        cache_file.write(header)
+        cache_file.write(addresses)
+        cache_file.write(padding)
+        cache_file.write(memoryview(distance_matrix.data).cast('B'))
+        if flags & FLAG_SHORTEST_PATHS:
+            cache_file.write(memoryview(distance_matrix.next_hops).cast('B'))
+    os.replace(temp_path, path)
+
+
+def read_distance_cache(path, digest=None, shortest_paths=None):
+    """
+    Maps a binary cache file read-only.
+
+    digest: Optional source digest the file must have been compiled from
+    shortest_paths: Optional, True or False if the file must (or must not) hold shortest paths
+
+    Returns a tuple of (AddressIndex, DistanceMatrix backed by the mapped file).
+    Raises ValueError if the file is not a valid cache for this format, byte order, digest or kind.
+    """
+    with open(path, 'rb') as cache_file:
+        mapped = mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if len(mapped) < HEADER.size:
+        raise ValueError(f"{path} is too small to be a distance cache")
+    magic, version, byte_order, flags, size, file_digest, address_bytes = HEADER.unpack_from(mapped)
+    if magic != CACHE_MAGIC or version != CACHE_VERSION:
+        raise ValueError(f"{path} is not a version {CACHE_VERSION} distance cache")
+    if byte_order != BYTE_ORDERS[sys.byteorder]:
+        raise ValueError(f"{path} was compiled on a machine with a different byte order")
+    if digest is not None and file_digest != digest:
+        raise ValueError(f"{path} was compiled from different source files")
+    has_paths = bool(flags & FLAG_SHORTEST_PATHS)
+    if shortest_paths is not None and has_paths != shortest_paths:
+        raise ValueError(f"{path} {'holds' if has_paths else 'does not hold'} shortest paths")
+
+    address_start = HEADER.size
+    matrix_start = address_start + address_bytes + (-(address_start + address_bytes) % 8)
+    matrix_end = matrix_start + size * size * 8
+    hops_end = matrix_end + size * size * 4 if has_paths else matrix_end
+    if len(mapped) < hops_end:
+        raise ValueError(f"{path} is truncated")
+
+    addresses = mapped[address_start:address_start + address_bytes].decode('utf-8').split("\n") if address_bytes else []
+    address_index = AddressIndex(address or None for address in addresses)
+
+    # The memoryview keeps the mapping alive for as long as the matrix is in use
+    data = memoryview(mapped)[matrix_start:matrix_end].cast('d')
+    next_hops = memoryview(mapped)[matrix_end:hops_end].cast('i') if has_paths else None
+    return address_index, DistanceMatrix(size, data, next_hops)
+
+
+def load_routing_data(address_file=ADDRESS_FILE, distance_file=DISTANCE_FILE, cache_dir=CACHE_DIR, shortest_paths=False,
+                      workers=1):
+    """
+    Returns the (AddressIndex, DistanceMatrix) for the given CSV files.
+    Uses the compiled cache when it matches the CSVs, otherwise compiles it first.
+    If the cache directory is not writable the data is parsed and kept in memory.
+
+    shortest_paths: If True, distances are replaced by shortest path distances with next hops (see shortest_paths)
+    workers: Number of processes used to compute the shortest paths when they are not cached yet
+    """
+    digest = source_digest(address_file, distance_file)
+    path = cache_path_for(digest, cache_dir, shortest_paths)
+
+    if os.path.exists(path):
+        try:
+            return read_distance_cache(path, digest, shortest_paths)
+        except ValueError as error:
+            logger.warning("Recompiling distance cache: %s", error)
+
+    address_index = load_address_index(address_file)
+    distance_matrix = load_distance_matrix(distance_file)
+    if shortest_paths:
+        distance_matrix = compute_shortest_paths(distance_matrix, workers)
+
+    try:
+        write_distance_cache(path, address_index, distance_matrix, digest)
+    except OSError as error:
+        logger.warning("Could not write distance cache %s: %s", path, error)
+        return address_index, distance_matrix
+
+    return read_distance_cache(path, digest, shortest_paths)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    shortest_paths = "--shortest-paths" in sys.argv[1:]
+    arguments = [argument for argument in sys.argv[1:] if argument != "--shortest-paths"]
+    address_file = arguments[0] if len(arguments) > 0 else ADDRESS_FILE
+    distance_file = arguments[1] if len(arguments) > 1 else DISTANCE_FILE
+    address_index, distance_matrix = load_routing_data(address_file, distance_file, shortest_paths=shortest_paths, workers=None)
+    logger.info("Compiled %s addresses into %s", len(address_index),
+                cache_path_for(source_digest(address_file, distance_file), shortest_paths=shortest_paths))
@@ -0,0 +1,139 @@
+"""
+This module contains the optional all-pairs shortest path stage for the distance table.
+
+Distance tables taken from real roads are often incomplete (pairs missing in both directions are stored as
+infinity, so the router can never reach them) or break the triangle inequality (going via a third location is
+shorter than the listed distance). This stage replaces every distance with the length of the shortest path
+through the table, and stores the next hop of that path so a route can be expanded into the locations it
+actually drives through (see DistanceMatrix.path).
+
+Dijkstra's algorithm (heapq) is run once from every location over the finite entries of the table.
+That is O(V * E log V): fast for sparse road tables, and about cubic for a complete table. On one core
+(benchmarks.bench_shortest_paths) a complete table of 600 locations takes about 7 seconds and one of 2000 about
+4.5 minutes, so the practical limit for a complete table is a few thousand locations. That is why the result is
+compiled into the distance cache (see matrix_cache) and only computed once per pair of CSV files; mapping the
+2000 location result back takes under a millisecond. Sources are independent, so they can be split across worker
+processes, which divides the time by about the number of cores.
+
+Run ahead of time from the repository root with:
+    python -m app.data_utils.matrix_cache --shortest-paths
+"""
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from heapq import heappop, heappush
+from app.models.distance_matrix import NO_HOP, DistanceMatrix
+
+# A path via other locations must be shorter by more than this to replace a listed distance,
+# so rounding errors in sums such as 1.2 + 2.4 never reroute a leg
+TOLERANCE = 1e-9
+
+# Sources per task when the work is split across processes
+SOURCES_PER_TASK = 64
+
+# Adjacency lists of a pool worker process, set by _init_worker
+_worker_adjacency = None
+
+
+def adjacency_lists(distance_matrix):
+    """
+    Builds the sparse graph of a distance table: for every location, its (location ID, distance) pairs with a
+    finite distance. Self-distances are left out.
+
+    Returns a list of adjacency lists indexed by location ID.
+    Raises ValueError if the table has a negative distance.
+    """
+    infinity = float('inf')
+    adjacency = []
+    for from_id in range(distance_matrix.size):
+        edges = [(to_id, distance) for to_id, distance in enumerate(distance_matrix.row(from_id))
+                 if distance != infinity and to_id != from_id]
+        for to_id, distance in edges:
+            if distance < 0:
+                raise ValueError(f"Negative distance {distance} from location {from_id} to {to_id}")
+        adjacency.append(edges)
+    return adjacency
+
+
+def dijkstra(source, adjacency):
+    """
+    Finds the shortest paths from one location to every other location.
+
+    source: Location ID the paths start from
+    adjacency: Adjacency lists from adjacency_lists
+
+    Returns a tuple of (list of shortest distances, list of next hops from source), indexed by location ID.
+    Unreachable locations have an infinite distance and NO_HOP as their next hop.
+    """
+    size = len(adjacency)
+    distances = [float('inf')] * size
+    next_hops = [NO_HOP] * size
+    distances[source] = 0.0
+    next_hops[source] = source
+
+    heap = [(0.0, source)]
+    while heap:
+        distance, location = heappop(heap)
+        if distance > distances[location]:
+            continue  # Stale heap entry, the location was reached by a shorter path since
+        first_hop = next_hops[location]
+        for neighbour, edge in adjacency[location]:
+            candidate = distance + edge
+            if candidate < distances[neighbour] - TOLERANCE:
+                distances[neighbour] = candidate
+                # Paths leaving the source go straight to the neighbour, the rest keep their first hop
+                next_hops[neighbour] = neighbour if location == source else first_hop
+                heappush(heap, (candidate, neighbour))
+    return distances, next_hops
+
+
+def _init_worker(adjacency):
+    """
+    Process pool initializer: keeps the adjacency lists once per worker.
+    """
+    global _worker_adjacency
+    _worker_adjacency = adjacency
+
+
+def _shortest_rows(sources):
+    """
+    Process pool task: runs Dijkstra from each source.
+
+    Returns a tuple of (distance rows, next hop rows) as arrays, in source order.
+    """
+    distances = array('d')
+    next_hops = array('i')
+    for source in sources:
+        source_distances, source_hops = dijkstra(source, _worker_adjacency)
+        distances.extend(source_distances)
+        next_hops.extend(source_hops)
+    return distances, next_hops
+
+
+def shortest_paths(distance_matrix, workers=1):
+    """
+    Replaces every distance in a table with its shortest path distance.
+
+    distance_matrix: DistanceMatrix as loaded from the CSV (missing pairs are infinity)
+    workers: Number of worker processes, None for one per CPU, 1 to run in this process
+
+    Returns a new DistanceMatrix with next_hops set, so DistanceMatrix.path can expand any pair.
+    """
+    size = distance_matrix.size
+    adjacency = adjacency_lists(distance_matrix)
+    distances = array('d')
+    next_hops = array('i')
+
+    if workers == 1 or size < 2 * SOURCES_PER_TASK:
+        for source in range(size):
+            source_distances, source_hops = dijkstra(source, adjacency)
+            distances.extend(source_distances)
+            next_hops.extend(source_hops)
+        return DistanceMatrix(size, distances, next_hops)
+
+    # Rows are computed in blocks of sources and appended in order
+    blocks = [range(start, min(start + SOURCES_PER_TASK, size)) for start in range(0, size, SOURCES_PER_TASK)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(adjacency,)) as pool:
+        for block_distances, block_hops in pool.map(_shortest_rows, blocks):
+            distances.extend(block_distances)
+            next_hops.extend(block_hops)
+    return DistanceMatrix(size, distances, next_hops)
@@ -7,14 +7,35 @@ This is the main file that executes the delivery routing program. It loads the p
 - Creates the truck objects with our defined constants and departure times.
 - Plans the deliveries for the trucks.
 - Loads the user interface to interact with the program.
+- Routing and truck messages go through the logging module, main() shows them as plain lines on standard output
+  (pass --quiet to hide them).
+- Pass --shortest-paths to route over shortest path distances through the distance table (see shortest_paths).
+  They are computed once per pair of CSV files and cached. This is quick for the bundled table and for sparse tables,
+  but a complete table grows cubically: about 4.5 minutes for 2000 locations on one core. Compile large tables ahead
+  on every core with python -m app.data_utils.matrix_cache --shortest-paths.
+- Pass --insertion to build routes by deadline-driven cheapest insertion instead of the greedy sort (see insertion).
+- Pass --profile to time every planning stage, count the hot-path operations and write cProfile statistics to
+  plan.pstats (see instrumentation). The summary table is printed once the day is planned.
+- Pass --format jsonl or --format csv to print the menu reports as records instead of text (see report_render).
+- Pass --serve to answer package status, truck position and fleet report queries from local clients instead of
+  running the menu, on port 8950 or the one given with --port PORT (see server).
+
+Importing this module has no side effects, everything above runs in `main()` when the module is executed (python -m app.main).
 
 """
 
+import asyncio
+import logging
+import sys
+from contextlib import nullcontext
 from datetime import datetime, time
+from app.core import instrumentation
 from app.data_utils.data_handler import load_package_data
 from app.core.routing import plan_deliveries
+from app.core.routing_context import RoutingContext, get_default_context
 from app.models.truck import Truck
 import app.ui.interface as interface
+import app.ui.server as server
 
 # Constants for the delivery routing program
 TRUCK_SPEED = 18  # MPH
@@ -23,35 +44,110 @@ TOTAL_TRUCKS = 3
 TOTAL_DRIVERS = 2
 HUB_LOCATION = "4001 South 700 East"
 PACKAGE_FILE = './data/package_file.csv'
+PROFILE_FILE = 'plan.pstats'
+
+
+def create_trucks():
+    """
+    Creates the truck objects with the defined constants and departure times.
+
+    Returns the list of Truck objects.
+    """
+    # Departure times for each truck
+    departure_times = [
+        datetime.combine(datetime.today(), time(8, 0)),  
+        datetime.combine(datetime.today(), time(9, 5)),   
+        None  # Truck 3 waits for an available driver
+    ]
+
+    # Truck objects are created with the defined constants and departure times
+    return [
+        Truck(
+            truckID=i+1,
+            speed=TRUCK_SPEED,
+            currentLocation=HUB_LOCATION,  
+            departTime=departure_times[i] if departure_times[i] else datetime.max,  # Avoid `None` issue
+            capacity=TRUCK_CAPACITY
+        ) for i in range(TOTAL_TRUCKS)
+    ]
+
+
+def configure_logging(level=logging.DEBUG, stream=None):
+    """
+    Shows the routing and truck log messages as plain lines, the way the program has always printed them.
+
+    level: logging.DEBUG shows every leg driven, logging.INFO the stops and route banners, logging.WARNING hides both
+    stream: Stream the messages are written to (standard output if omitted)
+    """
+    app_logger = logging.getLogger("app")
+    app_logger.setLevel(level)
+    for handler in app_logger.handlers[:]:
+        app_logger.removeHandler(handler)
+
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    app_logger.addHandler(handler)
+    app_logger.propagate = False
+
+
+def option_value(name, default=None, argv=None):
+    """
+    Returns the value following a command line option (as in --port 8950), or default if the option is not given.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if name in argv[:-1]:
+        return argv[argv.index(name) + 1]
+    return default
+
+
+def main(package_file=PACKAGE_FILE, context=None, log_level=logging.DEBUG, profile_path=None, constructor="greedy",
+         serve_port=None, output_format="text"):
+    """
+    Loads the package data, plans the deliveries and runs the user interface.
 
-# Load the package data from the CSV file and initialize the hash table
-package_hashTable = load_package_data(PACKAGE_FILE)
+    package_file: Path (or file-like object) of the package manifest
+    context: RoutingContext with the address and distance data (defaults to the shared context)
+    log_level: Level of the planning messages shown (see configure_logging)
+    profile_path: If given, loading and planning are instrumented, the cProfile statistics are written to this file
+                  and the stage and counter summary is printed before the menu
+    constructor: Route constructor, "greedy" or "insertion" (see ROUTE_CONSTRUCTORS in routing)
+    serve_port: If given, queries are answered on this local port (see server) instead of running the menu
+    output_format: Format of the menu reports, "text", "jsonl" or "csv"
+    """
+    configure_logging(log_level)
+    context = context or get_default_context()
 
-# Departure times for each truck
-departure_times = [
-    datetime.combine(datetime.today(), time(8, 0)),  
-    datetime.combine(datetime.today(), time(9, 5)),   
-    None  # Truck 3 waits for an available driver
-]
+    with instrumentation.session(profile_path) if profile_path else nullcontext() as stats:
+        with instrumentation.stage("load_distances"):
+            context.load()
 
+        # Load the package data from the CSV file and initialize the hash table
+        with instrumentation.stage("load_packages"):
+            package_hashTable = load_package_data(package_file, context.address_index)
 
-# Truck objects are created with the defined constants and departure times
-trucks = [
-    Truck(
-        truckID=i+1,
-        speed=TRUCK_SPEED,
-        currentLocation=HUB_LOCATION,  
-        departTime=departure_times[i] if departure_times[i] else datetime.max,  # Avoid `None` issue
-        capacity=TRUCK_CAPACITY
-    ) for i in range(TOTAL_TRUCKS)
-]
+        trucks = create_trucks()
 
+        # Plan the deliveries for the trucks
+        event_log = plan_deliveries(trucks, package_hashTable, context, constructor=constructor)
 
-# Plan the deliveries for the trucks
-plan_deliveries(trucks, package_hashTable)
+    if stats is not None:
+        print(stats.summary())
 
+    if serve_port is not None:
+        try:
+            asyncio.run(server.serve(trucks, package_hashTable, event_log, port=serve_port))
+        except KeyboardInterrupt:
+            print("Server stopped.")
+        return
 
-# Load the user interface to interact with the program
-interface.userInterface(trucks, package_hashTable)  
+    # Load the user interface to interact with the program
+    interface.userInterface(trucks, package_hashTable, event_log, output_format)
 
 
+if __name__ == "__main__":
+    main(context=RoutingContext(shortest_paths=True) if "--shortest-paths" in sys.argv[1:] else None,
+         log_level=logging.WARNING if "--quiet" in sys.argv[1:] else logging.DEBUG,
+         profile_path=PROFILE_FILE if "--profile" in sys.argv[1:] else None,
+         constructor="insertion" if "--insertion" in sys.argv[1:] else "greedy",
+         serve_port=int(option_value("--port", server.DEFAULT_PORT)) if "--serve" in sys.argv[1:] else None,
+         output_format=option_value("--format", "text"))
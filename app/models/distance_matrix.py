@@ -0,0 +1,118 @@
+"""
+This module contains the AddressIndex and DistanceMatrix classes which are shared by all routing code.
+
+The AddressIndex maps each address string to an integer location ID once, so the routing loops never
+have to look up strings. The DistanceMatrix stores every distance in one flat, row-major array('d'),
+so the distance between two location IDs is a single index operation: data[from_id * size + to_id].
+After the optional shortest path stage (see shortest_paths) a matrix also stores the next hop of every
+shortest path in the same layout, and DistanceMatrix.path expands a pair into the locations driven through.
+"""
+from array import array
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Next hop stored for a pair with no path between them
+NO_HOP = -1
+
+
+class AddressIndex:
+    def __init__(self, addresses):
+        """
+        addresses: Ordered list of address strings, the position of each address is its location ID
+        """
+        self.addresses = list(addresses)
+        self.ids = {address: location_id for location_id, address in enumerate(self.addresses) if address is not None}
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def __contains__(self, address):
+        return address in self.ids
+
+    def lookup(self, address):
+        """
+        Returns the location ID for an address, or None if the address is unknown.
+        """
+        return self.ids.get(address)
+
+    def address(self, location_id):
+        """
+        Returns the address string for a location ID.
+        """
+        return self.addresses[location_id]
+
+    def resolve(self, package):
+        """
+        Resolves a package's current address to a location ID and caches it on the package.
+        Call this again whenever the package's address changes.
+
+        Returns the location ID, or None if the address is unknown.
+        """
+        package.locationID = self.ids.get(package.address)
+        if package.locationID is None:
+            logger.error("ERROR: Address '%s' for package %s not found in the address index!", package.address, package.packageID)
+        return package.locationID
+
+
+class DistanceMatrix:
+    def __init__(self, size, data, next_hops=None):
+        """
+        size: Number of locations, the matrix is size x size
+        data: Flat row-major buffer of size * size distances (array('d') or a memoryview of doubles)
+        next_hops: Optional flat row-major buffer of size * size location IDs (array('i') or a memoryview of ints),
+                   the first location after from_id on the shortest path to to_id
+        """
+        if len(data) != size * size:
+            raise ValueError(f"Distance data has {len(data)} entries, expected {size * size}")
+        if next_hops is not None and len(next_hops) != size * size:
+            raise ValueError(f"Next hop data has {len(next_hops)} entries, expected {size * size}")
+        self.size = size
+        self.data = data
+        self.next_hops = next_hops
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Builds a DistanceMatrix from a square 2D list, missing (None) entries become infinity.
+        """
+        size = len(rows)
+        data = array('d', [float('inf')]) * (size * size)
+        for i, row in enumerate(rows):
+            offset = i * size
+            for j, distance in enumerate(row[:size]):
+                if distance is not None:
+                    data[offset + j] = distance
+        return cls(size, data)
+
+    def __len__(self):
+        return self.size
+
+    def distance(self, from_id, to_id):
+        """
+        Returns the distance between two location IDs.
+        """
+        return self.data[from_id * self.size + to_id]
+
+    def path(self, from_id, to_id):
+        """
+        Returns the location IDs driven through from one location to another, both ends included.
+        Without next hops every pair is driven directly. Returns None if there is no path.
+        """
+        if self.next_hops is None or from_id == to_id:
+            return [from_id, to_id] if from_id != to_id else [from_id]
+        size = self.size
+        path = [from_id]
+        while from_id != to_id:
+            from_id = self.next_hops[from_id * size + to_id]
+            if from_id == NO_HOP or len(path) > size:
+                return None  # No path, or next hops that loop (possible with zero distances)
+            path.append(from_id)
+        return path
+
+    def row(self, from_id):
+        """
+        Returns a zero-copy view of the distances from one location ID to every other location.
+        """
+        offset = from_id * self.size
+        return memoryview(self.data)[offset:offset + self.size]
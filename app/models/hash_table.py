@@ -49,4 +49,149 @@ class ChainingHashTable:
         for kv in bucket_list:
             #print (key_value)
             if kv[0] == key:
-                bucket_list.remove([kv[0], kv[1]])
\ No newline at end of file
+                bucket_list.remove([kv[0], kv[1]])
+
+# Sentinel markers for the open addressing table's key slots.
+_EMPTY = object()
+_DELETED = object()
+
+# [lookups, probed slots] every open addressing table adds to while probe counting is on, None while it is off
+_probe_counts = None
+
+
+# Starts adding every table's lookups and probed slots to counts (a [lookups, probes] list), or stops with None.
+# app.core.instrumentation turns it on for the length of a session.
+def count_probes(counts):
+    global _probe_counts
+    _probe_counts = counts
+
+
+class OpenAddressingHashTable:
+    # Constructor that sizes the slot arrays to the next power of two above initial_capacity.
+    # Keys and values are stored in two parallel lists so a probe only touches the key list.
+    def __init__(self, initial_capacity=64, max_load_factor=2 / 3):
+        capacity = 8
+        while capacity * max_load_factor < initial_capacity:
+            capacity *= 2
+        self.max_load_factor = max_load_factor
+        self._keys = [_EMPTY] * capacity
+        self._values = [None] * capacity
+        self._count = 0  # live entries
+        self._filled = 0  # live entries + tombstones
+
+    # Returns the slot holding key, or the slot where key should be inserted encoded as -(slot + 1).
+    # Probing follows the same perturbed sequence CPython's dict uses, so sequential integer keys
+    # (our package IDs) land in consecutive slots without any collisions.
+    # The slots probed are added up once per lookup, and only while count_probes has counting on.
+    def _find_slot(self, key):
+        keys = self._keys
+        mask = len(keys) - 1
+        h = hash(key)
+        perturb = h & 0xFFFFFFFFFFFFFFFF
+        i = h & mask
+        first_deleted = -1
+        probes = 1
+        while True:
+            k = keys[i]
+            if k is _EMPTY:
+                slot = -(first_deleted if first_deleted >= 0 else i) - 1
+                break
+            if k is _DELETED:
+                if first_deleted < 0:
+                    first_deleted = i
+            elif k is key or k == key:
+                slot = i
+                break
+            perturb >>= 5
+            i = (5 * i + 1 + perturb) & mask
+            probes += 1
+        if _probe_counts is not None:
+            _probe_counts[0] += 1
+            _probe_counts[1] += probes
+        return slot
+
+    # Rebuilds the slot arrays at new_capacity, dropping every tombstone.
+    def _resize(self, new_capacity):
+        old_keys, old_values = self._keys, self._values
+        self._keys = [_EMPTY] * new_capacity
+        self._values = [None] * new_capacity
+        keys, values = self._keys, self._values
+        mask = new_capacity - 1
+
+        # live keys are unique, so each one goes straight into the first empty slot of its probe chain
+        for k, v in zip(old_keys, old_values):
+            if k is _EMPTY or k is _DELETED:
+                continue
+            h = hash(k)
+            perturb = h & 0xFFFFFFFFFFFFFFFF
+            i = h & mask
+            while keys[i] is not _EMPTY:
+                perturb >>= 5
+                i = (5 * i + 1 + perturb) & mask
+            keys[i] = k
+            values[i] = v
+        self._filled = self._count
+
+    # Inserts a new item into the hash table.
+    def insert(self, key, item):  # does both insert and update
+        slot = self._find_slot(key)
+        if slot >= 0:
+            self._values[slot] = item
+            return True
+
+        slot = -slot - 1
+        if self._keys[slot] is _EMPTY:
+            self._filled += 1
+        self._keys[slot] = key
+        self._values[slot] = item
+        self._count += 1
+
+        # grow once live entries plus tombstones pass the load factor
+        capacity = len(self._keys)
+        if self._filled > capacity * self.max_load_factor:
+            # if mostly tombstones, rebuilding at the same size is enough
+            if self._count * 2 > capacity * self.max_load_factor:
+                capacity *= 2
+            self._resize(capacity)
+        return True
+
+    # Searches for an item with matching key in the hash table.
+    # Returns the item if found, or None if not found.
+    def search(self, key):
+        slot = self._find_slot(key)
+        return self._values[slot] if slot >= 0 else None
+
+    # Removes key from the table, leaving a tombstone so later probe chains stay intact.
+    # Returns True if the key was present.
+    def remove(self, key):
+        slot = self._find_slot(key)
+        if slot < 0:
+            return False
+        self._keys[slot] = _DELETED
+        self._values[slot] = None
+        self._count -= 1
+        return True
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, key):
+        return self._find_slot(key) >= 0
+
+    # Iterates over the keys in slot order.
+    def __iter__(self):
+        for k in self._keys:
+            if k is not _EMPTY and k is not _DELETED:
+                yield k
+
+    # Iterates over (key, item) pairs in slot order.
+    def items(self):
+        for k, v in zip(self._keys, self._values):
+            if k is not _EMPTY and k is not _DELETED:
+                yield k, v
+
+    # Iterates over the stored items in slot order.
+    def values(self):
+        for k, v in zip(self._keys, self._values):
+            if k is not _EMPTY and k is not _DELETED:
+                yield v
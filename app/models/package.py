@@ -4,11 +4,42 @@ A package object contains important attributes such as the package ID, address,
 updateTime and oldAddress are used to keep track of a package's status and address changes, this is primarily for packages that are delayed or have errors
 
 There are 3 methods the Package class contains to return the package's deadline, delivery time, and address
+
+The deadline is parsed once when the package is created and deliveryTime is kept as a datetime,
+so nothing in the routing or report loops has to call strptime. Times are only formatted when printed.
 """
 import datetime
+from functools import lru_cache
+
+
+@lru_cache(maxsize=256)  # Manifests only use a handful of distinct deadlines
+def parse_deadline(deadline):
+    """
+    Parses a deadline string such as '10:30 AM' into a time object.
+    If the deadline is 'EOD' or missing, it defaults to 11:59 PM.
+    """
+    if deadline == 'EOD' or not deadline:
+        return datetime.time(23, 59)  # 11:59 PM
+    return datetime.datetime.strptime(deadline, '%I:%M %p').time()
+
+
+def time_to_minutes(value):
+    """
+    Returns the whole minutes since midnight for a time or datetime object.
+    Seconds are dropped, which matches the minute shown when the time is printed.
+    """
+    return value.hour * 60 + value.minute
+
 
 class Package:
-    def __init__(self, packageID, address, deadline, city, state, zipCode, weight, status, deliveryTime=None):
+    # Fixed attribute slots instead of a per-instance __dict__, this keeps large manifests compact
+    __slots__ = (
+        'packageID', 'address', 'deadline', 'city', 'state', 'zipCode', 'weight', 'status',
+        'deliveryTime', 'deadlineTime', 'deadlineMinutes', 'assignedTruck', 'updateTime', 'oldAddress',
+        'lateStatus', 'was_late', 'hubArrivalTime', 'locationID', 'special_notes',
+    )
+
+    def __init__(self, packageID, address, deadline, city, state, zipCode, weight, status, deliveryTime=None, special_notes=None):
         self.packageID = packageID
         self.address = address
         self.deadline = deadline
@@ -17,18 +48,23 @@ class Package:
         self.zipCode = zipCode
         self.weight = weight
         self.status = status
-        self.deliveryTime = deliveryTime
+        self.deliveryTime = deliveryTime  # datetime the package was delivered, None until delivered
+        self.deadlineTime = parse_deadline(deadline)  # Parsed once, see get_deadline
+        self.deadlineMinutes = time_to_minutes(self.deadlineTime)
         self.assignedTruck = None
         self.updateTime = None
         self.oldAddress = None
         self.lateStatus = False
         self.hubArrivalTime = None
+        self.was_late = False
+        self.special_notes = special_notes
+        self.locationID = None  # Integer ID of the address in the AddressIndex, resolved once at load time
 
     def __str__(self):
         return "Package ID {}: {}, {}, {}, {} | Deadline: {} | Weight: {} kilos | Status: {} | Delivery Time: {}".format(
             self.packageID, self.address, self.city, self.state, self.zipCode, 
             self.deadline, self.weight, self.status, 
-            self.deliveryTime
+            self.deliveryTime.strftime('%I:%M %p') if self.deliveryTime else None
         )
     
     def get_deadline(self):
@@ -36,9 +72,7 @@ class Package:
         Returns the package's delivery deadline as a time object for sorting.
         If the deadline is 'EOD' or missing, it defaults to 11:59 PM.
         """
-        if self.deadline == 'EOD' or not self.deadline:
-            return datetime.time(23, 59)  # 11:59 PM
-        return datetime.datetime.strptime(self.deadline, '%I:%M %p').time()
+        return self.deadlineTime
     
     def get_delivery_time(self, current_time, distance, truck_speed):
         """
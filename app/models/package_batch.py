@@ -0,0 +1,134 @@
+"""
+This module contains the PackageBatch class, a columnar (struct-of-arrays) view of many packages.
+
+Each column is a typed array from the standard library array module, so a package costs a few dozen
+bytes instead of a full Package object. Only the fields the routing and report loops need are stored:
+ID, location ID, deadline minutes, weight, status code, assigned truck, delivery minute, hub arrival minute
+and address correction minute. Strings such as the address stay on the Package objects or in the AddressIndex.
+
+Routing and reporting read the columns directly: sortBatch_forLoading (routing) orders a batch for loading and
+build_truckCounts (report) counts every truck's delivered, remaining and erroneous packages at a time.
+"""
+from array import array
+from app.models.package import time_to_minutes
+
+# Status strings are stored as small integer codes
+STATUS_CODES = {
+    "At Hub": 0,
+    "En Route": 1,
+    "Delivered": 2,
+    "Not At Hub Yet": 3,
+    "Erroneous": 4,
+    "Cancelled": 5,
+}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+
+# Marker for a missing location ID, truck or delivery minute
+NONE = -1
+
+
+def _minute(when):
+    return NONE if when is None else time_to_minutes(when)
+
+
+def _correction_minute(package):
+    # Only a package whose address was replaced has a correction, the same rule EventLog.from_plan uses
+    return _minute(package.updateTime) if package.oldAddress else NONE
+
+
+class PackageBatch:
+    def __init__(self):
+        self.package_id = array('q')
+        self.location_id = array('i')
+        self.deadline_minutes = array('h')
+        self.weight = array('d')
+        self.status_code = array('b')
+        self.truck_id = array('h')
+        self.delivery_minute = array('h')
+        self.hub_arrival_minute = array('h')  # Minute a delayed package reaches the hub
+        self.update_minute = array('h')  # Minute a wrong address is corrected
+        self._positions = None  # package ID -> row, built on first lookup
+
+    @classmethod
+    def from_packages(cls, packages):
+        """
+        Builds a batch from an iterable of Package objects (for example package_table.values()).
+        """
+        batch = cls()
+        for package in packages:
+            batch.append(package)
+        return batch
+
+    def __len__(self):
+        return len(self.package_id)
+
+    def append(self, package):
+        """
+        Appends one Package as a new row.
+        """
+        if self._positions is not None:
+            self._positions[package.packageID] = len(self.package_id)
+        self.package_id.append(package.packageID)
+        self.location_id.append(NONE if package.locationID is None else package.locationID)
+        self.deadline_minutes.append(package.deadlineMinutes)
+        self.weight.append(package.weight)
+        self.status_code.append(STATUS_CODES.get(package.status, NONE))
+        self.truck_id.append(NONE if package.assignedTruck is None else package.assignedTruck)
+        self.delivery_minute.append(NONE if package.deliveryTime is None else time_to_minutes(package.deliveryTime))
+        self.hub_arrival_minute.append(_minute(package.hubArrivalTime))
+        self.update_minute.append(_correction_minute(package))
+
+    def row_of(self, package_id):
+        """
+        Returns the row number for a package ID.
+        The ID -> row dict is only built on the first lookup, so plain column scans never pay for it.
+        """
+        if self._positions is None:
+            self._positions = {package_id: row for row, package_id in enumerate(self.package_id)}
+        return self._positions[package_id]
+
+    def update(self, package):
+        """
+        Copies a Package's routing results (location, status, truck, delivery, hub arrival and correction times) into its row.
+        """
+        row = self.row_of(package.packageID)
+        self.location_id[row] = NONE if package.locationID is None else package.locationID
+        self.status_code[row] = STATUS_CODES.get(package.status, NONE)
+        self.truck_id[row] = NONE if package.assignedTruck is None else package.assignedTruck
+        self.delivery_minute[row] = NONE if package.deliveryTime is None else time_to_minutes(package.deliveryTime)
+        self.hub_arrival_minute[row] = _minute(package.hubArrivalTime)
+        self.update_minute[row] = _correction_minute(package)
+
+    def status(self, package_id):
+        """
+        Returns the status string stored for a package ID.
+        """
+        return STATUS_NAMES.get(self.status_code[self.row_of(package_id)])
+
+    def rows_for_truck(self, truck_id):
+        """
+        Returns the row numbers of every package assigned to a truck.
+        """
+        return [row for row, truck in enumerate(self.truck_id) if truck == truck_id]
+
+    def locations_for_truck(self, truck_id):
+        """
+        Returns the distinct location IDs a truck has to visit, in row order.
+        """
+        location_id = self.location_id
+        return list(dict.fromkeys(location_id[row] for row in self.rows_for_truck(truck_id)))
+
+    def delivered_count(self, truck_id, set_minutes):
+        """
+        Returns the number of packages a truck has delivered by set_minutes (minutes since midnight).
+        """
+        return sum(1 for truck, minute in zip(self.truck_id, self.delivery_minute)
+                   if truck == truck_id and minute != NONE and minute <= set_minutes)
+
+    def late_package_ids(self):
+        """
+        Returns the IDs of every package delivered after its deadline.
+        """
+        return [package_id for package_id, minute, deadline
+                in zip(self.package_id, self.delivery_minute, self.deadline_minutes)
+                if minute != NONE and minute > deadline]
@@ -0,0 +1,147 @@
+"""
+This module contains the TruckTimeline class which records every leg a truck drives.
+
+Each call to Truck.drive_to appends one leg: start time, end time, from and to locations, and the
+cumulative miles at both ends. Times and miles live in typed arrays (minutes since midnight as doubles),
+so looking up where a truck is at any timestamp is a binary search over the leg end times, O(log legs).
+Miles are interpolated linearly within a leg, since trucks drive at a constant speed.
+
+A leg can be one hop of a shortest path, which may pass through the hub, so the legs that end a trip are
+recorded when the truck returns (see end_trip) instead of being recognised by their locations.
+"""
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+
+# Truck states returned by TruckTimeline.position_at
+NOT_DEPARTED = "Not Departed"
+EN_ROUTE = "En Route"
+RETURNED = "Returned"
+WAITING = "Waiting"  # Parked between two legs, for example at the hub between trips
+
+# status: one of the states above
+# location: where the truck is (or is heading while en route)
+# miles: miles driven so far, interpolated within the current leg
+# leg: index of the current leg (None before the first leg), from_location: where that leg started
+TruckPosition = namedtuple("TruckPosition", ["status", "location", "miles", "leg", "from_location"])
+
+
+def to_minutes(when):
+    """
+    Returns minutes since midnight (with fractional seconds) for a time/datetime, or a number unchanged.
+    """
+    if isinstance(when, (int, float)):
+        return when
+    return when.hour * 60 + when.minute + when.second / 60 + when.microsecond / 60_000_000
+
+
+class TruckTimeline:
+    def __init__(self):
+        self.start_minutes = array('d')
+        self.end_minutes = array('d')
+        self.start_miles = array('d')
+        self.end_miles = array('d')
+        self.from_locations = []
+        self.to_locations = []
+        self.trip_ends = array('l')  # Index of the last leg of every trip, in order
+
+    def __len__(self):
+        return len(self.end_minutes)
+
+    def add_leg(self, start, end, from_location, to_location, start_miles, end_miles):
+        """
+        Appends a leg. Legs must be added in time order, which is how a truck drives them.
+
+        start, end: datetime/time or minutes since midnight
+        """
+        self.start_minutes.append(to_minutes(start))
+        self.end_minutes.append(to_minutes(end))
+        self.from_locations.append(from_location)
+        self.to_locations.append(to_location)
+        self.start_miles.append(start_miles)
+        self.end_miles.append(end_miles)
+
+    def end_trip(self):
+        """
+        Marks the last leg added as the end of a trip, Truck.return_to_hub calls it when the truck is back.
+        """
+        last = len(self.end_minutes) - 1
+        if last >= 0 and (not self.trip_ends or self.trip_ends[-1] != last):
+            self.trip_ends.append(last)
+
+    def trip_at(self, leg):
+        """
+        Returns (first leg, last leg) of the trip that leg belongs to, in O(log trips).
+        A trip the truck has not returned from yet ends at the last leg added.
+        """
+        trip = bisect_left(self.trip_ends, leg)
+        first = self.trip_ends[trip - 1] + 1 if trip else 0
+        last = self.trip_ends[trip] if trip < len(self.trip_ends) else len(self.end_minutes) - 1
+        return first, last
+
+    def replace_legs(self, start, stop, timeline):
+        """
+        Replaces legs start to stop (stop excluded) with every leg of another timeline, used when the rest of
+        a trip is re-planned. The legs after stop keep their times, and their miles move by the change in miles.
+        Trip ends within the replaced legs are replaced by the other timeline's.
+
+        timeline: TruckTimeline whose first leg starts where leg start began
+
+        Returns the change in miles at the end of the replaced legs.
+        """
+        shift = timeline.total_miles - self.end_miles[stop - 1]
+        self.start_minutes[start:stop] = timeline.start_minutes
+        self.end_minutes[start:stop] = timeline.end_minutes
+        self.start_miles[start:stop] = timeline.start_miles
+        self.end_miles[start:stop] = timeline.end_miles
+        self.from_locations[start:stop] = timeline.from_locations
+        self.to_locations[start:stop] = timeline.to_locations
+        for leg in range(start + len(timeline), len(self.end_miles)):
+            self.start_miles[leg] += shift
+            self.end_miles[leg] += shift
+        moved = len(timeline) - (stop - start)
+        self.trip_ends = array('l', [leg for leg in self.trip_ends if leg < start]
+                               + [start + leg for leg in timeline.trip_ends]
+                               + [leg + moved for leg in self.trip_ends if leg >= stop])
+        return shift
+
+    @property
+    def total_miles(self):
+        return self.end_miles[-1] if self.end_miles else 0.0
+
+    def leg_at(self, when):
+        """
+        Returns the index of the leg being driven (or just finished) at when, or None before the first leg.
+        """
+        minute = to_minutes(when)
+        if not self.end_minutes or minute < self.start_minutes[0]:
+            return None
+        # First leg that has not ended before minute, the last leg once the truck is back
+        return min(bisect_left(self.end_minutes, minute), len(self.end_minutes) - 1)
+
+    def position_at(self, when, start_location=None):
+        """
+        Returns a TruckPosition for when (datetime/time or minutes since midnight).
+
+        start_location: Location reported before the first leg (the hub)
+        """
+        minute = to_minutes(when)
+        leg = self.leg_at(minute)
+        if leg is None:
+            location = self.from_locations[0] if self.from_locations else start_location
+            return TruckPosition(NOT_DEPARTED, location, 0.0, None, None)
+
+        start = self.start_minutes[leg]
+        end = self.end_minutes[leg]
+        if minute >= end:
+            status = RETURNED if leg == len(self.end_minutes) - 1 else EN_ROUTE
+            return TruckPosition(status, self.to_locations[leg], self.end_miles[leg], leg, self.from_locations[leg])
+
+        # Before the leg starts the truck is parked where the leg begins
+        if minute < start:
+            return TruckPosition(WAITING, self.from_locations[leg], self.start_miles[leg], leg, self.from_locations[leg])
+
+        # Interpolate the miles driven within the current leg
+        fraction = (minute - start) / (end - start) if end > start else 1.0
+        miles = self.start_miles[leg] + fraction * (self.end_miles[leg] - self.start_miles[leg])
+        return TruckPosition(EN_ROUTE, self.to_locations[leg], miles, leg, self.from_locations[leg])
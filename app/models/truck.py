@@ -1,8 +1,13 @@
 """
 This module contains the Truck class which is used to create truck objects.
 A truck object contains important attributes such as the truck ID, speed, current location, and more.
+Every leg the truck drives is recorded in its timeline, so its position and miles can be looked up for any time.
 """
+import logging
 from datetime import timedelta
+from app.models.timeline import TruckTimeline
+
+logger = logging.getLogger(__name__)
 
 class Truck:
     def __init__(self, truckID, speed, currentLocation, departTime, capacity):
@@ -17,6 +22,7 @@ class Truck:
         self.returnTime = None  
         self.current_time = departTime  
         self.atHub = True 
+        self.timeline = TruckTimeline()  # Every leg driven, see position_at
 
     def __str__(self):
         return f"Truck {self.truckID} | Speed: {self.speed} mph | Miles: {self.milesTotal} | Location: {self.currentLocation} | Depart Time: {self.departTime.strftime('%I:%M %p')} | Return Time: {self.returnTime.strftime('%I:%M %p') if self.returnTime else 'N/A'} | Packages: {len(self.packageInventory)}/{self.capacity}"
@@ -30,18 +36,49 @@ class Truck:
         distance: The distance to the new location
         """
         starting_location = self.currentLocation
+        starting_time = self.current_time
+        starting_miles = self.milesTotal
         travel_time = timedelta(minutes=(distance / self.speed) * 60)  # Convert hours to minutes
         self.current_time += travel_time
         self.currentLocation = new_location
         self.milesTotal += distance
         self.milesTotal_list.append(self.milesTotal)
+        self.timeline.add_leg(starting_time, self.current_time, starting_location, new_location, starting_miles, self.milesTotal)
 
         #print(f"   Distance: {distance} miles | Speed: {self.speed} mph with Expected travel time: {distance / self.speed:.2f} hours ({(distance / self.speed) * 60:.2f} minutes)")
-        print(f" Distance: {distance}")
+        logger.debug(" Distance: %s", distance)
         
         return self.current_time
 
 
+    def position_at(self, when):
+        """
+        Method to look up where the truck is at a specific time, in O(log legs).
+
+        when: datetime/time object or minutes since midnight
+
+        Returns a TruckPosition with the truck's status, location, miles driven so far and current leg.
+        """
+        return self.timeline.position_at(when, self.currentLocation)
+
+
+    def replace_legs(self, start, stop, other):
+        """
+        Method to replace legs start to stop (stop excluded) with the legs another truck drove.
+        Used when the rest of a trip is re-planned, later legs keep their times and their miles move by the change.
+
+        other: Truck that drove the replacement legs from where leg start began
+
+        Returns the change in miles.
+        """
+        shift = self.timeline.replace_legs(start, stop, other.timeline)
+        self.milesTotal_list[start:stop] = other.milesTotal_list
+        for leg in range(start + len(other.milesTotal_list), len(self.milesTotal_list)):
+            self.milesTotal_list[leg] += shift
+        self.milesTotal += shift
+        return shift
+
+
     def load_package(self, package, package_table):
         """
         Method to load a package onto the truck.
@@ -62,15 +99,18 @@ class Truck:
         # If the truck is full, return False
         return False  
 
-    def return_to_hub(self):
+    def return_to_hub(self, hub_address="4001 South 700 East"):
         """
         Method to simulate the truck returning to the hub.
         Updates the truck's current location, time, and
         sets the truck's return time.
+
+        hub_address: Address of the hub the truck is back at
         """
         self.atHub = True
         self.returnTime = self.current_time 
         self.atHub = True
         self.returnTime = self.current_time
-        self.currentLocation = "4001 South 700 East"  # Explicitly set hub location
+        self.currentLocation = hub_address  # Explicitly set hub location
+        self.timeline.end_trip()
         self.packageInventory.clear()  # Ensure packages are removed from the truck
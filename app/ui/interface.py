@@ -1,9 +1,14 @@
 """
 This module contains the user interface.
 The user interface allows the user to select options to generate reports or view package status.
+Reports are printed as text, or as JSON Lines or CSV records when the program is started with --format.
 """
 
 import app.core.report as report
+from app.core.report_render import write_records
+
+# Formats the menu can print, parquet is binary and only written to files
+MENU_FORMATS = ("text", "jsonl", "csv")
 
 def get_report_time():
     """
@@ -23,10 +28,16 @@ def get_report_time():
         
         print("Invalid format. Please enter the time as 'HH:MM AM/PM'. Try again.")
 
-def userInterface(trucks, package_hashTable):
+def userInterface(trucks, package_hashTable, event_log=None, output_format="text"):
     """
     Main user interface function that allows the user to generate reports or view package status.
+
+    event_log: EventLog returned by plan_deliveries, used to answer every status query
+    output_format: "text" for the menu reports, "jsonl" or "csv" to print the report records instead (see report_render)
     """
+    if output_format not in MENU_FORMATS:
+        raise ValueError(f"Unknown format {output_format!r}, expected one of {', '.join(MENU_FORMATS)}")
+
     while True:
         print("=====================================")
         print("\nWGUPS Delivery System - Main Menu")
@@ -38,7 +49,10 @@ def userInterface(trucks, package_hashTable):
         # Generate a complete delivery report
         if choice == '1':
             set_time = get_report_time()
-            report.generate_report(set_time, trucks, package_hashTable)
+            if output_format == "text":
+                report.generate_report(set_time, trucks, package_hashTable, event_log)
+            else:
+                write_records([report.build_report(set_time, trucks, package_hashTable, event_log)], format=output_format)
             print("Report generated successfully!\n")
 
             print("Return to the main menu? (y/n)")
@@ -50,7 +64,14 @@ def userInterface(trucks, package_hashTable):
         elif choice == '2':
             set_time = get_report_time()
             package_id = int(input("Enter the package ID: "))
-            report.generate_packageStatus(set_time, trucks, package_hashTable, package_id)
+            if output_format == "text":
+                report.generate_packageStatus(set_time, trucks, package_hashTable, package_id, event_log)
+            else:
+                row = report.build_packageStatus(set_time, trucks, package_hashTable, package_id, event_log)
+                if row is None:
+                    print(f"Package {package_id} not found.")
+                else:
+                    write_records([row], format=output_format)
 
             # Ask the user if they want to return to the main menu instead of exiting
             print("Return to the main menu? (y/n)")
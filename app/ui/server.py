@@ -0,0 +1,336 @@
+"""
+This module contains the server mode: the day is loaded and planned once, then any number of clients can ask for
+package statuses, truck positions and fleet reports at the same time over a local TCP socket.
+
+The protocol is JSON Lines. A client sends one request object per line and gets one response line per request,
+in the same order:
+
+    {"id": 1, "query": "status", "package_id": 9, "time": "10:30 AM"}
+    {"id": 2, "query": "position", "truck_id": 1, "time": "09:15"}
+    {"id": 3, "query": "report", "time": "12:00 PM"}
+
+    {"id": 1, "ok": true, "plan": 1, "result": {...}}
+    {"id": 4, "ok": false, "error": "Package 99 not found"}
+
+Times are 'HH:MM AM/PM' (as the menu asks for them) or 24-hour 'HH:MM'. The id is echoed back unchanged and
+plan is the version of the snapshot that answered.
+
+Queries are answered from a PlanSnapshot, a private copy of the planned trucks, packages and event log that is
+never changed after it is captured. Reports read the event log and the truck timelines, so no query changes
+anything and they need no locks. `PlanServer.publish` swaps in a new snapshot (after a LivePlan re-plans, for
+example); requests already being answered finish against the snapshot they started with.
+
+Batching: a client may send many requests without waiting for the answers. Every request already received on a
+connection (up to BATCH_SIZE) is answered against one snapshot and written back with a single write, so a
+pipelining client costs one socket write per batch instead of one per request. Fleet reports only depend on the
+snapshot and the minute, so each snapshot keeps the encoded report of the most recent minutes and serves
+repeated report queries from it.
+
+All queries are answered on the event loop: each one is a binary search or a cached report, so none blocks other
+connections for long.
+
+Run the program as a server with:
+    python -m app.main --serve [--port PORT]
+"""
+import asyncio
+import copy
+import json
+import logging
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+from app.core.report import build_packageStatus, build_report
+from app.core.report_render import package_rows, truck_rows
+from app.models.hash_table import OpenAddressingHashTable
+from app.models.package import time_to_minutes
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8950
+BATCH_SIZE = 256  # Most pipelined requests answered with one write
+REPORT_CACHE_SIZE = 64  # Encoded fleet reports kept per snapshot, the least recently used one is dropped first
+QUERIES = ("status", "position", "report")
+
+# Request and response counts of a PlanServer
+# connections: connections accepted, requests: requests answered, batches: writes those answers took,
+# errors: requests answered with an error, report_hits: fleet reports served from a snapshot's cache
+ServerStats = namedtuple("ServerStats", ["connections", "requests", "batches", "errors", "report_hits"])
+
+
+class QueryError(ValueError):
+    # A request that cannot be answered, its message is sent back to the client
+    pass
+
+
+def parse_time(value):
+    """
+    Parses a request time, 'HH:MM AM/PM' or 24-hour 'HH:MM'.
+
+    Returns a datetime for today at that time.
+    Raises QueryError if the time is missing or in neither format.
+    """
+    if not isinstance(value, str):
+        raise QueryError("A time is required, as 'HH:MM AM/PM' or 'HH:MM'")
+    for time_format in ('%I:%M %p', '%H:%M'):
+        try:
+            parsed = datetime.strptime(value.strip(), time_format)
+        except ValueError:
+            continue
+        return datetime.combine(datetime.today(), parsed.time())
+    raise QueryError(f"Invalid time {value!r}, use 'HH:MM AM/PM' or 'HH:MM'")
+
+
+def _integer(request, field):
+    value = request.get(field)
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise QueryError(f"{field} must be an integer")
+    return value
+
+
+def _encode(value):
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def _error_line(request_id, message):
+    return b'{"id":' + _encode(request_id) + b',"ok":false,"error":' + _encode(message) + b'}\n'
+
+
+class PlanSnapshot:
+    def __init__(self, trucks, package_table, event_log, version=1):
+        """
+        Use PlanSnapshot.capture to take a snapshot of a planned day, the objects given here are used as they are
+        and must not be changed afterwards.
+
+        trucks: List of planned Truck objects
+        package_table: HashTable containing all packages
+        event_log: EventLog returned by plan_deliveries
+        version: Number of the plan, shown in every response so clients can tell snapshots apart
+        """
+        self.trucks = tuple(trucks)
+        self.package_table = package_table
+        self.event_log = event_log
+        self.version = version
+        self._trucks_by_id = {truck.truckID: truck for truck in self.trucks}
+        self._reports = OrderedDict()  # minute -> encoded fleet report
+        self.report_hits = 0
+
+    @classmethod
+    def capture(cls, trucks, package_table, event_log, version=1):
+        """
+        Copies the planned trucks, packages and event log, so later changes to them (a LivePlan re-planning a
+        trip, the menu correcting an address) never show up in the snapshot.
+
+        Returns the PlanSnapshot.
+        """
+        packages = list(package_table.values())
+        # One deepcopy call so the trucks' inventories and the table share the copied packages
+        trucks, packages, event_log = copy.deepcopy((list(trucks), packages, event_log))
+        table = OpenAddressingHashTable(len(packages))
+        for package in packages:
+            table.insert(package.packageID, package)
+        return cls(trucks, table, event_log, version)
+
+    def package_status(self, package_id, set_time):
+        """
+        Returns the status of a package at set_time (datetime) as a dictionary, like a package_rows row.
+        Raises QueryError if the package is not in the plan.
+        """
+        row = build_packageStatus(set_time, self.trucks, self.package_table, package_id, self.event_log)
+        if row is None:
+            raise QueryError(f"Package {package_id} not found")
+        result = package_rows([row])[0]
+        result["report_time"] = set_time.strftime('%H:%M')
+        return result
+
+    def truck_position(self, truck_id, set_time):
+        """
+        Returns where a truck is at set_time (datetime) as a dictionary.
+        Raises QueryError if the truck is not in the plan.
+        """
+        truck = self._trucks_by_id.get(truck_id)
+        if truck is None:
+            raise QueryError(f"Truck {truck_id} not found")
+        position = truck.position_at(set_time)
+        return {
+            "report_time": set_time.strftime('%H:%M'),
+            "truck_id": truck_id,
+            "status": position.status,
+            "location": position.location,
+            "from_location": position.from_location,
+            "miles": round(position.miles, 2),
+        }
+
+    def fleet_report(self, set_time):
+        """
+        Returns the fleet report at set_time (datetime) as encoded JSON: the truck_rows and package_rows of the
+        FleetReport. Reports are cached by minute.
+        """
+        minute = time_to_minutes(set_time)
+        encoded = self._reports.get(minute)
+        if encoded is not None:
+            self.report_hits += 1
+            self._reports.move_to_end(minute)
+            return encoded
+
+        report = build_report(set_time, self.trucks, self.package_table, self.event_log)
+        encoded = _encode({
+            "report_time": set_time.strftime('%H:%M'),
+            "total_miles": round(report.total_miles, 2),
+            "trucks": truck_rows([report]),
+            "packages": package_rows([report]),
+        })
+        self._reports[minute] = encoded
+        if len(self._reports) > REPORT_CACHE_SIZE:
+            self._reports.popitem(last=False)
+        return encoded
+
+    def answer(self, request):
+        """
+        Answers one decoded request.
+
+        Returns the result as encoded JSON.
+        Raises QueryError if the request is invalid or names an unknown package or truck.
+        """
+        if not isinstance(request, dict):
+            raise QueryError("A request must be a JSON object")
+        query = request.get("query")
+        if query not in QUERIES:
+            raise QueryError(f"Unknown query {query!r}, expected one of {', '.join(QUERIES)}")
+
+        set_time = parse_time(request.get("time"))
+        if query == "status":
+            return _encode(self.package_status(_integer(request, "package_id"), set_time))
+        if query == "position":
+            return _encode(self.truck_position(_integer(request, "truck_id"), set_time))
+        return self.fleet_report(set_time)
+
+
+class PlanServer:
+    def __init__(self, snapshot, batch_size=BATCH_SIZE):
+        """
+        snapshot: PlanSnapshot the queries are answered from
+        batch_size: Most pipelined requests of one connection answered with one write
+        """
+        self.snapshot = snapshot
+        self.batch_size = batch_size
+        self.connections = 0
+        self.open_connections = 0  # Connections still being served
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self._report_hits = 0  # Report hits of the snapshots already replaced
+
+    def publish(self, snapshot):
+        """
+        Answers every later batch from a new snapshot. Batches being answered keep the one they started with.
+        """
+        self._report_hits += self.snapshot.report_hits
+        self.snapshot = snapshot
+
+    def stats(self):
+        """
+        Returns the ServerStats counted since the server was created.
+        """
+        return ServerStats(self.connections, self.requests, self.batches, self.errors,
+                           self._report_hits + self.snapshot.report_hits)
+
+    def respond(self, line, snapshot):
+        """
+        Answers one request line against snapshot.
+
+        Returns the response line as bytes, ending with a newline.
+        """
+        request_id = None
+        try:
+            request = json.loads(line)
+            if isinstance(request, dict):
+                request_id = request.get("id")
+            result = snapshot.answer(request)
+        except ValueError as error:
+            # A QueryError, or a json.JSONDecodeError for a line that is not JSON, the client gets its message
+            self.errors += 1
+            return _error_line(request_id, str(error))
+        except Exception as error:
+            # Anything else (a RecursionError for deeply nested JSON) fails this request only, not its batch
+            logger.warning("Could not answer a request: %r", error)
+            self.errors += 1
+            return _error_line(request_id, f"Could not answer the request ({type(error).__name__})")
+        return (b'{"id":' + _encode(request_id) + b',"ok":true,"plan":' + str(snapshot.version).encode()
+                + b',"result":' + result + b'}\n')
+
+    async def handle_connection(self, reader, writer):
+        """
+        Serves one client until it closes the connection.
+        Lines are read by a separate task, so every request that has arrived while a batch was being answered
+        is waiting in the queue for the next one.
+        """
+        self.connections += 1
+        self.open_connections += 1
+        lines = asyncio.Queue()
+
+        async def read_lines():
+            try:
+                while line := await reader.readline():
+                    lines.put_nowait(line)
+            except (ConnectionError, ValueError):
+                pass  # Reset by the client, or a line longer than the stream limit
+            finally:
+                lines.put_nowait(None)  # End of the requests
+
+        read_task = asyncio.create_task(read_lines())
+        try:
+            finished = False
+            while not finished:
+                line = await lines.get()
+                if line is None:
+                    break
+                batch = [line]
+                while len(batch) < self.batch_size and not lines.empty():
+                    line = lines.get_nowait()
+                    if line is None:
+                        finished = True
+                        break
+                    batch.append(line)
+
+                snapshot = self.snapshot  # Every request of a batch sees the same plan
+                writer.write(b"".join(self.respond(line, snapshot) for line in batch))
+                self.requests += len(batch)
+                self.batches += 1
+                await writer.drain()
+        except ConnectionError:
+            pass  # The client went away, nothing left to answer
+        finally:
+            read_task.cancel()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+            self.open_connections -= 1
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """
+        Starts listening, port 0 picks a free port (see the returned server's sockets).
+
+        Returns the asyncio Server.
+        """
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+
+async def serve(trucks, package_table, event_log, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """
+    Captures a snapshot of the planned day and answers queries until the task is cancelled (Ctrl+C).
+
+    trucks: List of planned Truck objects
+    package_table: HashTable containing all packages
+    event_log: EventLog returned by plan_deliveries
+    host: Address to listen on, the local machine only by default
+    port: Port to listen on
+    """
+    plan_server = PlanServer(PlanSnapshot.capture(trucks, package_table, event_log))
+    server = await plan_server.start(host, port)
+    address = server.sockets[0].getsockname()
+    logger.info("Serving package status, truck position and fleet report queries on %s:%s (Ctrl+C to stop)",
+                address[0], address[1])
+    async with server:
+        await server.serve_forever()
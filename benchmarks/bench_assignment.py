@@ -0,0 +1,95 @@
+"""
+Truck assignment benchmark: the sequential loader versus the cluster assigner, on the bundled day and on a
+synthetic city.
+
+The synthetic city places locations uniformly in a square (straight-line miles between them), gives every
+package a random location and a 10:30 AM deadline one time in five, and starts the trucks in waves between
+8:00 and 9:30 AM. Each assigner is timed, then its loads are scored with evaluate_loads (estimated miles
+after local search, and late packages).
+
+Run from the repository root:
+    python -m benchmarks.bench_assignment [packages] [trucks] [locations]
+"""
+import logging
+import math
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from app.core.assignment import ASSIGNERS, evaluate_loads
+from app.core.constraints import PackageConstraints
+from app.core.routing import prepare_packages, sortPackages_forLoading
+from app.core.routing_context import RoutingContext, get_default_context
+from app.data_utils.data_handler import load_package_data
+from app.main import PACKAGE_FILE, TRUCK_CAPACITY, TRUCK_SPEED, configure_logging, create_trucks
+from app.models.distance_matrix import AddressIndex, DistanceMatrix
+from app.models.package import Package
+from app.models.truck import Truck
+
+DEFAULT_PACKAGES = 3000
+DEFAULT_TRUCKS = 200
+DEFAULT_LOCATIONS = 1000
+CITY_MILES = 20.0
+SEED = 950
+
+
+def synthetic_city(packages, trucks, locations, seed=SEED):
+    """
+    Builds a random city.
+
+    Returns a tuple of (RoutingContext, list of Package objects, list of Truck objects).
+    """
+    rng = random.Random(seed)
+    points = [(CITY_MILES / 2, CITY_MILES / 2)] + [(rng.uniform(0, CITY_MILES), rng.uniform(0, CITY_MILES)) for _ in range(locations)]
+    addresses = [f"{index} Synthetic St" for index in range(len(points))]
+    rows = [[round(math.dist(a, b), 1) for b in points] for a in points]
+    context = RoutingContext.from_data(AddressIndex(addresses), DistanceMatrix.from_rows(rows), hub_address=addresses[0])
+
+    package_list = []
+    for package_id in range(1, packages + 1):
+        deadline = "10:30 AM" if rng.random() < 0.2 else "EOD"
+        package = Package(package_id, addresses[rng.randint(1, locations)], deadline, "Salt Lake City", "UT", "84101", 1, "At Hub")
+        context.resolve_location(package)
+        package_list.append(package)
+
+    start = datetime.combine(datetime.today(), datetime.min.time()) + timedelta(hours=8)
+    truck_list = [Truck(truck_id, TRUCK_SPEED, addresses[0], start + timedelta(minutes=30 * (truck_id % 4)), TRUCK_CAPACITY)
+                  for truck_id in range(1, trucks + 1)]
+    return context, package_list, truck_list
+
+
+def bundled_day():
+    """
+    Returns a tuple of (RoutingContext, list of Package objects, list of Truck objects, PackageConstraints) for the bundled data,
+    with hub arrivals and address corrections applied the way plan_deliveries applies them.
+    """
+    context = get_default_context()
+    package_table = load_package_data(PACKAGE_FILE, context.address_index)
+    package_list, constraints = prepare_packages(package_table, context)
+    return context, package_list, create_trucks(), constraints
+
+
+def compare(name, context, package_list, trucks, constraints=None):
+    constraints = constraints or PackageConstraints.from_packages(package_list)
+    units = constraints.loading_units(sortPackages_forLoading(package_list, context=context))
+    print(f"\n{name}: {len(package_list)} packages, {len(trucks)} trucks, {context.distance_matrix.size} locations")
+    print(f"{'assigner':<12}{'seconds':>10}{'miles':>12}{'late':>8}{'loaded':>8}")
+    for assigner_name, assigner in ASSIGNERS.items():
+        start = time.perf_counter()
+        loads = assigner(trucks, units, constraints, context)
+        elapsed = time.perf_counter() - start
+        miles, late = evaluate_loads(trucks, loads, context)
+        loaded = sum(len(packages) for packages in loads.values())
+        print(f"{assigner_name:<12}{elapsed:>10.3f}{miles:>12.2f}{late:>8}{loaded:>8}")
+
+
+def main(packages=DEFAULT_PACKAGES, trucks=DEFAULT_TRUCKS, locations=DEFAULT_LOCATIONS):
+    configure_logging(logging.WARNING)
+    context, package_list, truck_list, constraints = bundled_day()
+    compare("Bundled day", context, package_list, truck_list, constraints)
+    compare("Synthetic city", *synthetic_city(packages, trucks, locations))
+
+
+if __name__ == "__main__":
+    main(*(int(argument) for argument in sys.argv[1:4]))
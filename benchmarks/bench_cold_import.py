@@ -0,0 +1,56 @@
+"""
+Cold-import timing for the routing and main modules.
+
+Each module is imported in a fresh interpreter and the import must finish within the time budget.
+That importing does no data I/O is checked by tests/test_cold_import.py.
+
+The script prints the measured time and exits with status 1 if a module is over budget, so it can gate CI.
+
+Run from the repository root:
+    python -m benchmarks.bench_cold_import [budget seconds]
+"""
+import json
+import subprocess
+import sys
+
+MODULES = ["app.core.routing", "app.main", "app.core.report"]
+DEFAULT_BUDGET_SECONDS = 0.25
+
+# Runs inside the child interpreter, prints a JSON result on the last line
+CHILD_SCRIPT = r"""
+import json, sys, time
+start = time.perf_counter()
+__import__(sys.argv[1])
+elapsed = time.perf_counter() - start
+print(json.dumps({'seconds': elapsed}))
+"""
+
+
+def check_module(module):
+    """
+    Imports module in a fresh interpreter.
+
+    Returns a dict with the import time in seconds.
+    """
+    completed = subprocess.run([sys.executable, "-c", CHILD_SCRIPT, module], capture_output=True, text=True, check=True,
+                               stdin=subprocess.DEVNULL, timeout=60)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run(budget):
+    """
+    Times every module and returns True if all of them stay within the budget.
+    """
+    ok = True
+    for module in MODULES:
+        result = check_module(module)
+        print(f"{module:<20} {result['seconds'] * 1000:8.1f} ms")
+        if result["seconds"] > budget:
+            print(f"  FAIL: importing {module} took longer than the {budget * 1000:.0f} ms budget")
+            ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET_SECONDS
+    sys.exit(0 if run(budget) else 1)
@@ -0,0 +1,100 @@
+"""
+Route constructor benchmark: the greedy nearest-neighbour sort versus deadline-driven cheapest insertion.
+
+For every route size one truck leaves the hub at 8:00 AM with a package for each of that many random locations.
+The city is scaled so a good route takes about a working day (ROUTE_MILES at the truck's speed), and DEADLINE_MIX
+gives packages deadlines a quarter, half and three quarters of the way through that day, so every size is about
+as tight. Each constructor is timed alone and followed by local search (as deliver_packages runs it),
+and the resulting route's miles and late packages are shown.
+
+Run from the repository root:
+    python -m benchmarks.bench_constructors [largest route size]
+"""
+import math
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from app.core.local_search import arrival_minutes
+from app.core.routing import ROUTE_CONSTRUCTORS, optimize_route
+from app.core.routing_context import RoutingContext
+from app.main import TRUCK_SPEED
+from app.models.distance_matrix import AddressIndex, DistanceMatrix
+from app.models.package import Package
+from app.models.timeline import to_minutes
+from app.models.truck import Truck
+
+DEFAULT_SIZES = [50, 200, 1000]
+ROUTE_MILES = 150.0  # Rough length of a good route, the city side is scaled to it
+DEPART_HOUR = 8
+DEADLINE_MIX = {0.25: 0.05, 0.5: 0.15, 0.75: 0.15}  # Share of the working day -> share of packages, the rest are EOD
+SEED = 950
+
+
+def synthetic_route(stops, seed=SEED):
+    """
+    Builds a city with a hub and `stops` locations, and one package per location.
+
+    Returns a tuple of (RoutingContext, list of Package objects).
+    """
+    rng = random.Random(seed)
+    depart = datetime.combine(datetime.today(), datetime.min.time()) + timedelta(hours=DEPART_HOUR)
+    day_hours = ROUTE_MILES / TRUCK_SPEED
+    city_miles = ROUTE_MILES / (0.75 * math.sqrt(stops))
+    points = [(city_miles / 2, city_miles / 2)] + [(rng.uniform(0, city_miles), rng.uniform(0, city_miles)) for _ in range(stops)]
+    addresses = [f"{index} Synthetic St" for index in range(len(points))]
+    rows = [[round(math.dist(a, b), 1) for b in points] for a in points]
+    context = RoutingContext.from_data(AddressIndex(addresses), DistanceMatrix.from_rows(rows), hub_address=addresses[0])
+
+    packages = []
+    for package_id in range(1, stops + 1):
+        draw = rng.random()
+        deadline = "EOD"
+        for day_share, share in DEADLINE_MIX.items():
+            if draw < share:
+                deadline = (depart + timedelta(hours=day_hours * day_share)).strftime('%I:%M %p')
+                break
+            draw -= share
+        package = Package(package_id, addresses[package_id], deadline, "Salt Lake City", "UT", "84101", 1, "At Hub")
+        context.resolve_location(package)
+        packages.append(package)
+    return context, packages
+
+
+def drive(context, truck, packages):
+    # Miles of the route back to the hub, and the packages delivered after their deadline
+    route = [context.hub_index] + [package.locationID for package in packages] + [context.hub_index]
+    arrivals = arrival_minutes(route, context.distance_matrix, to_minutes(truck.departTime), truck.speed)
+    miles = sum(context.distance_matrix.distance(a, b) for a, b in zip(route, route[1:]))
+    late = sum(1 for package, arrival in zip(packages, arrivals[1:]) if math.floor(arrival) > package.deadlineMinutes)
+    return miles, late
+
+
+def run(stops):
+    context, packages = synthetic_route(stops)
+    depart = datetime.combine(datetime.today(), datetime.min.time()) + timedelta(hours=DEPART_HOUR)
+    deadlines = sum(1 for package in packages if package.deadline != "EOD")
+    print(f"\n{stops} stops, {deadlines} with a deadline")
+    print(f"{'constructor':<14}{'search':>8}{'seconds':>10}{'miles':>10}{'late':>7}")
+    for name in ROUTE_CONSTRUCTORS:
+        for improve in (False, True):
+            truck = Truck(1, TRUCK_SPEED, context.hub_address, depart, stops)
+            truck.packageInventory = list(packages)
+            start = time.perf_counter()
+            optimize_route(truck, context, improve, name)
+            elapsed = time.perf_counter() - start
+            miles, late = drive(context, truck, truck.packageInventory)
+            print(f"{name:<14}{'yes' if improve else 'no':>8}{elapsed:>10.3f}{miles:>10.1f}{late:>7}")
+
+
+def main(largest=None):
+    for stops in DEFAULT_SIZES:
+        if largest is None or stops <= largest:
+            run(stops)
+    if largest is not None and largest not in DEFAULT_SIZES:
+        run(largest)
+
+
+if __name__ == "__main__":
+    main(*(int(argument) for argument in sys.argv[1:2]))
@@ -0,0 +1,68 @@
+"""
+Micro-benchmark comparing the original ChainingHashTable with the OpenAddressingHashTable.
+
+For each table size it times inserting every key, searching every key, and removing every key.
+The chaining table keeps its fixed 40 buckets, which is what load_package_data used to create.
+
+Run from the repository root:
+    python -m benchmarks.bench_hash_table [sizes...]
+"""
+import random
+import sys
+import time
+
+from app.models.hash_table import ChainingHashTable, OpenAddressingHashTable
+
+DEFAULT_SIZES = [40, 10_000, 1_000_000]
+
+# The chaining table is quadratic past a few thousand keys, so large runs are capped
+# and extrapolated from a sample rather than left running for hours.
+CHAINING_SAMPLE_LIMIT = 20_000
+
+
+def time_operations(table, keys):
+    """
+    Times insert, search and remove over keys on the given table.
+
+    Returns a dict of seconds per phase.
+    """
+    start = time.perf_counter()
+    for key in keys:
+        table.insert(key, key)
+    inserted = time.perf_counter()
+    for key in keys:
+        table.search(key)
+    searched = time.perf_counter()
+    for key in keys:
+        table.remove(key)
+    removed = time.perf_counter()
+
+    return {
+        "insert": inserted - start,
+        "search": searched - inserted,
+        "remove": removed - searched,
+    }
+
+
+def run(sizes):
+    """
+    Runs the benchmark for every size and prints one row per table and size.
+    """
+    print(f"{'keys':>10} | {'table':<12} | {'insert (s)':>11} | {'search (s)':>11} | {'remove (s)':>11} | note")
+    for size in sizes:
+        keys = list(range(1, size + 1))
+        random.Random(size).shuffle(keys)
+
+        results = time_operations(OpenAddressingHashTable(), keys)
+        print(f"{size:>10} | {'open':<12} | {results['insert']:>11.4f} | {results['search']:>11.4f} | {results['remove']:>11.4f} |")
+
+        # Every operation on a fixed-bucket chain is O(n / 40), so n operations scale by n^2
+        sample = min(size, CHAINING_SAMPLE_LIMIT)
+        results = time_operations(ChainingHashTable(), keys[:sample])
+        scale = (size / sample) ** 2
+        note = f"extrapolated from {sample} keys" if sample < size else ""
+        print(f"{size:>10} | {'chaining-40':<12} | {results['insert'] * scale:>11.4f} | {results['search'] * scale:>11.4f} | {results['remove'] * scale:>11.4f} | {note}")
+
+
+if __name__ == "__main__":
+    run([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,66 @@
+"""
+Planning-time benchmark with verbose versus silent routing output.
+
+The bundled day is planned repeatedly under each logging level:
+
+- verbose: DEBUG, every leg and stop formatted and written (to os.devnull, so the terminal is not the bottleneck)
+- stops:   INFO, stops and route banners only
+- silent:  WARNING, nothing is formatted or written
+
+Package data and the routing context are loaded once; only plan_deliveries is timed.
+
+Run from the repository root:
+    python -m benchmarks.bench_output_modes [repeats]
+"""
+import logging
+import os
+import statistics
+import sys
+import time
+
+from app.core.routing import plan_deliveries
+from app.core.routing_context import get_default_context
+from app.data_utils.data_handler import load_package_data
+from app.main import PACKAGE_FILE, configure_logging, create_trucks
+
+DEFAULT_REPEATS = 50
+MODES = [("verbose", logging.DEBUG), ("stops", logging.INFO), ("silent", logging.WARNING)]
+
+
+def time_plans(level, repeats, context, sink):
+    """
+    Plans the day repeats times at a logging level.
+
+    Returns the list of planning times in seconds.
+    """
+    configure_logging(level, sink)
+    timings = []
+    for _ in range(repeats):
+        package_table = load_package_data(PACKAGE_FILE, context.address_index)
+        trucks = create_trucks()
+        start = time.perf_counter()
+        plan_deliveries(trucks, package_table, context)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main(repeats=DEFAULT_REPEATS):
+    context = get_default_context().load()
+    results = {}
+    with open(os.devnull, 'w') as sink:
+        # One untimed run warms the caches shared by every mode
+        time_plans(logging.WARNING, 1, context, sink)
+        for name, level in MODES:
+            results[name] = time_plans(level, repeats, context, sink)
+    configure_logging(logging.WARNING)
+
+    print(f"{'mode':<10}{'median ms':>12}{'min ms':>10}")
+    for name, timings in results.items():
+        print(f"{name:<10}{statistics.median(timings) * 1000:>12.3f}{min(timings) * 1000:>10.3f}")
+
+    speedup = statistics.median(results["verbose"]) / statistics.median(results["silent"])
+    print(f"\nSilent planning is {speedup:.2f}x the speed of verbose planning ({repeats} runs each).")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REPEATS)
@@ -0,0 +1,105 @@
+"""
+Memory benchmark comparing four package representations:
+
+- legacy: the original dict-backed Package class (reproduced below, special_notes added after creation)
+- legacy-dict: the same, with each instance's __dict__ materialized as it always is before Python 3.11
+- slots:  the current __slots__ Package class
+- batch:  a PackageBatch holding the routing columns only
+
+Every representation is built from the same synthetic rows and measured with tracemalloc.
+The shared row strings are created before measuring, so only the per-package overhead is counted.
+
+Run from the repository root:
+    python -m benchmarks.bench_package_memory [count]
+"""
+import sys
+import tracemalloc
+
+from app.models.package import Package
+from app.models.package_batch import PackageBatch
+
+DEFAULT_COUNT = 100_000
+DEADLINES = ["EOD", "10:30 AM", "9:00 AM", "EOD", "EOD"]
+
+
+class LegacyPackage:
+    # Copy of the Package class before __slots__, kept here only for comparison
+    def __init__(self, packageID, address, deadline, city, state, zipCode, weight, status, deliveryTime=None):
+        self.packageID = packageID
+        self.address = address
+        self.deadline = deadline
+        self.city = city
+        self.state = state
+        self.zipCode = zipCode
+        self.weight = weight
+        self.status = status
+        self.deliveryTime = deliveryTime
+        self.assignedTruck = None
+        self.updateTime = None
+        self.oldAddress = None
+        self.lateStatus = False
+        self.hubArrivalTime = None
+
+
+def make_rows(count):
+    """
+    Returns count synthetic package rows that reuse a small pool of strings.
+    """
+    return [(i, f"{i % 500} Main St", DEADLINES[i % len(DEADLINES)], "Salt Lake City", "UT", "84115", float(i % 50), "At Hub")
+            for i in range(1, count + 1)]
+
+
+def measure(build):
+    """
+    Returns the bytes allocated (and still alive) by build().
+    """
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def run(count):
+    """
+    Builds each representation and prints the total and per-package memory.
+    """
+    rows = make_rows(count)
+
+    def build_legacy(materialize=False):
+        packages = []
+        for row in rows:
+            package = LegacyPackage(*row)
+            package.special_notes = None
+            package.locationID = row[0] % 500
+            if materialize:
+                package.__dict__  # Python 3.11+ only creates the dict when it is first accessed
+            packages.append(package)
+        return packages
+
+    def build_slots():
+        packages = []
+        for row in rows:
+            package = Package(*row)
+            package.locationID = row[0] % 500
+            packages.append(package)
+        return packages
+
+    slot_packages = build_slots()
+
+    results = {
+        "legacy": measure(build_legacy),
+        "legacy-dict": measure(lambda: build_legacy(materialize=True)),
+        "slots": measure(build_slots),
+        "batch": measure(lambda: PackageBatch.from_packages(slot_packages)),
+    }
+
+    print(f"{count} packages")
+    print(f"{'representation':<15} | {'total (MB)':>10} | {'bytes/package':>13}")
+    for name, total in results.items():
+        print(f"{name:<15} | {total / 1e6:>10.2f} | {total / count:>13.1f}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_COUNT)
@@ -0,0 +1,284 @@
+"""
+Pipeline benchmark harness: times every planning stage on a synthetic city and writes the results as JSON.
+
+A city is written with benchmarks.synthetic_data (in the CSV formats of data/), then the pipeline runs the
+same steps as plan_deliveries, one timed stage at a time:
+
+    load_distances   parse the address and distance CSVs and compile the distance cache (cold start)
+    load_cached      map the compiled distance cache (every later start)
+    load_packages    stream the manifest into the package hash table
+    sort_for_loading sortPackages_forLoading over every package
+    load_trucks      parse the special notes, apply hub arrivals and corrections, assign and load the trucks
+    route            order every truck's packages (greedy plus local search)
+    deliver          drive every route and record the event log
+    report           build and render the fleet report once an hour from 9:00 AM to 5:00 PM
+
+Each stage keeps its fastest and median time over the repeats. With --memory the pipeline runs once more under
+tracemalloc and every stage gets its peak of Python allocations. The process's peak resident memory is recorded too.
+With --counters the pipeline runs once more in an instrumentation session and the planner's operation counters
+(distance lookups, hash table probes, local search moves, see app.core.instrumentation) are recorded.
+
+Results are written as JSON (--output) so runs on different branches can be compared. --compare prints the ratio
+of every stage to an earlier results file and exits with status 1 if any stage got slower than --threshold.
+
+Run from the repository root:
+    python -m benchmarks.bench_pipeline [--addresses N] [--packages M] [--repeats R] [--output results.json]
+                                        [--compare baseline.json] [--memory] [--counters]
+                                        [--deadlines "9:00 AM=0.02,10:30 AM=0.25"] [--notes "truck=0.05,delayed=0.08"]
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from app.core import events, instrumentation
+from app.core.assignment import ASSIGNERS
+from app.core.constraints import load_corrections
+from app.core.report import build_report
+from app.core.report_render import render_report_text
+from app.core.routing import deliver_packages, load_truck, optimize_routes, prepare_packages, sortPackages_forLoading
+from app.core.routing_context import RoutingContext
+from app.data_utils.data_handler import load_package_data
+from app.main import TRUCK_CAPACITY, TRUCK_SPEED
+from app.models.truck import Truck
+from benchmarks.synthetic_data import (DEFAULT_ADDRESSES, DEFAULT_DEADLINE_MIX, DEFAULT_NOTE_MIX, DEFAULT_PACKAGES, HUB_ADDRESS,
+                                       SEED, generate_city, parse_mix)
+
+try:
+    import resource  # Unix only, used for the peak resident memory
+except ImportError:
+    resource = None
+
+RESULTS_VERSION = 1
+DEFAULT_REPEATS = 3
+DEFAULT_THRESHOLD = 1.25  # A stage this many times slower than the baseline is a regression
+MIN_COMPARED_SECONDS = 0.005  # Stages faster than this in the baseline are shown but never flagged, timer noise dominates
+DEPARTURES = [(8, 0), (9, 5), (10, 20)]  # Trucks leave in waves, so delayed and corrected packages find a truck
+REPORT_HOURS = range(9, 18)
+
+
+class StageTimer:
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.seconds = {}  # stage -> elapsed seconds
+        self.peak_kib = {}  # stage -> peak traced memory in KiB
+
+    @contextmanager
+    def stage(self, name):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        yield
+        self.seconds[name] = time.perf_counter() - start
+        if self.trace_memory:
+            self.peak_kib[name] = tracemalloc.get_traced_memory()[1] / 1024
+
+
+def create_trucks(packages):
+    """
+    Returns enough trucks for every package, departing in waves (see DEPARTURES).
+    """
+    count = math.ceil(packages / TRUCK_CAPACITY * 1.2) + len(DEPARTURES)
+    day = datetime.combine(datetime.today(), datetime.min.time())
+    return [Truck(truck_id, TRUCK_SPEED, HUB_ADDRESS, day + timedelta(hours=hour, minutes=minute), TRUCK_CAPACITY)
+            for truck_id in range(1, count + 1) for hour, minute in [DEPARTURES[(truck_id - 1) % len(DEPARTURES)]]]
+
+
+def run_pipeline(city, cache_dir, timer):
+    """
+    Runs every stage once on a written city, timing each with timer.
+    """
+    with timer.stage("load_distances"):
+        cold = RoutingContext(city.address_file, city.distance_file, os.path.join(cache_dir, "cold")).load()
+    with timer.stage("load_cached"):
+        context = RoutingContext(city.address_file, city.distance_file, os.path.join(cache_dir, "cold")).load()
+    del cold
+
+    with timer.stage("load_packages"):
+        package_table = load_package_data(city.package_file, context.address_index)
+    corrections = load_corrections(city.corrections_file) if city.corrections_file else {}
+    trucks = create_trucks(len(package_table))
+    event_log = events.EventLog()
+
+    with timer.stage("sort_for_loading"):
+        loading_order = sortPackages_forLoading(list(package_table.values()), context=context)
+
+    with timer.stage("load_trucks"):
+        _, constraints = prepare_packages(package_table, context, event_log, corrections=corrections)
+        units = constraints.loading_units(loading_order)
+        loads = ASSIGNERS["sequential"](trucks, units, constraints, context)
+        assigned_packages = set()
+        for truck in trucks:
+            truck.current_time = truck.departTime
+            load_truck(truck, loads[truck.truckID], package_table, assigned_packages)
+
+    with timer.stage("route"):
+        savings = optimize_routes(trucks, context, workers=1)
+
+    with timer.stage("deliver"):
+        for truck in trucks:
+            deliver_packages(truck, package_table, context=context, miles_saved=savings[truck.truckID], event_log=event_log)
+
+    with timer.stage("report"):
+        day = trucks[0].departTime.replace(hour=0, minute=0)
+        for hour in REPORT_HOURS:
+            render_report_text(build_report(day.replace(hour=hour), trucks, package_table, event_log))
+
+    return len(assigned_packages), sum(truck.milesTotal for truck in trucks)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark(addresses, packages, repeats, trace_memory, data_dir=None, seed=SEED, deadline_mix=None, note_mix=None,
+              count_operations=False):
+    """
+    Generates a city and runs the pipeline repeats times (plus once under tracemalloc if trace_memory, and once in an
+    instrumentation session if count_operations).
+    deadline_mix and note_mix are passed to generate_city (the defaults of synthetic_data if omitted).
+
+    Returns the results as a dict ready to be written as JSON.
+    """
+    with tempfile.TemporaryDirectory() as scratch:
+        start = time.perf_counter()
+        city = generate_city(data_dir or os.path.join(scratch, "city"), addresses, packages, deadline_mix, note_mix, seed)
+        generate_seconds = time.perf_counter() - start
+
+        runs = []
+        for repeat in range(repeats):
+            timer = StageTimer()
+            loaded, miles = run_pipeline(city, os.path.join(scratch, f"cache-{repeat}"), timer)
+            runs.append(timer.seconds)
+
+        peak_kib = {}
+        if trace_memory:
+            timer = StageTimer(trace_memory=True)
+            tracemalloc.start()
+            try:
+                run_pipeline(city, os.path.join(scratch, "cache-memory"), timer)
+            finally:
+                tracemalloc.stop()
+            peak_kib = timer.peak_kib
+
+        counters = None
+        if count_operations:
+            with instrumentation.session() as stats:
+                run_pipeline(city, os.path.join(scratch, "cache-counters"), StageTimer())
+            counters = stats.counters
+
+    stages = {}
+    for name in runs[0]:
+        timings = [run[name] for run in runs]
+        stages[name] = {"min_seconds": min(timings), "median_seconds": statistics.median(timings)}
+        if name in peak_kib:
+            stages[name]["peak_kib"] = round(peak_kib[name], 1)
+
+    results = {
+        "version": RESULTS_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {"addresses": addresses, "packages": packages, "repeats": repeats, "seed": seed,
+                       "deadline_mix": DEFAULT_DEADLINE_MIX if deadline_mix is None else deadline_mix,
+                       "note_mix": DEFAULT_NOTE_MIX if note_mix is None else note_mix},
+        "generate_seconds": generate_seconds,
+        "packages_loaded": loaded,
+        "total_miles": round(miles, 1),
+        "stages": stages,
+        # ru_maxrss is in KiB on Linux
+        "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None,
+    }
+    if counters is not None:
+        results["counters"] = counters
+    return results
+
+
+def print_results(results):
+    print(f"{results['parameters']['addresses']} addresses, {results['parameters']['packages']} packages "
+          f"({results['packages_loaded']} loaded, {results['total_miles']} miles), "
+          f"best of {results['parameters']['repeats']}")
+    print(f"{'stage':<18}{'min s':>10}{'median s':>10}{'peak KiB':>12}")
+    for name, stage in results["stages"].items():
+        peak = f"{stage['peak_kib']:>12.1f}" if "peak_kib" in stage else f"{'-':>12}"
+        print(f"{name:<18}{stage['min_seconds']:>10.4f}{stage['median_seconds']:>10.4f}{peak}")
+    if results["max_rss_kib"]:
+        print(f"Peak resident memory: {results['max_rss_kib'] / 1024:.1f} MiB")
+    for name, total in results.get("counters", {}).items():
+        print(f"{name:<24}{total:>14,}")
+
+
+def compare(results, baseline, threshold):
+    """
+    Prints every stage's time against a baseline results dict.
+
+    Returns the names of the stages slower than threshold times the baseline (ignoring stages under MIN_COMPARED_SECONDS).
+    """
+    city = {key: value for key, value in results["parameters"].items() if key != "repeats"}
+    baseline_city = {key: value for key, value in baseline.get("parameters", {}).items() if key != "repeats"}
+    if baseline_city != city:
+        print(f"Note: the baseline city {baseline_city} differs from this one {city}")
+    print(f"\n{'stage':<18}{'baseline s':>12}{'now s':>10}{'ratio':>8}")
+    regressions = []
+    for name, stage in results["stages"].items():
+        previous = baseline.get("stages", {}).get(name)
+        if previous is None:
+            print(f"{name:<18}{'-':>12}{stage['min_seconds']:>10.4f}{'new':>8}")
+            continue
+        ratio = stage["min_seconds"] / previous["min_seconds"] if previous["min_seconds"] else float('inf')
+        regressed = ratio > threshold and previous["min_seconds"] >= MIN_COMPARED_SECONDS
+        print(f"{name:<18}{previous['min_seconds']:>12.4f}{stage['min_seconds']:>10.4f}{ratio:>8.2f}{'  REGRESSION' if regressed else ''}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time every planning stage on a synthetic city.")
+    parser.add_argument("--addresses", type=int, default=DEFAULT_ADDRESSES, help="locations in the city, the hub included")
+    parser.add_argument("--packages", type=int, default=DEFAULT_PACKAGES, help="packages in the manifest")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="pipeline runs per stage timing")
+    parser.add_argument("--seed", type=int, default=SEED, help="seed of the city generator")
+    parser.add_argument("--deadlines", type=parse_mix, help="deadline shares, for example '9:00 AM=0.02,10:30 AM=0.25'")
+    parser.add_argument("--notes", type=parse_mix, help="special note shares of truck, delayed, group and wrong-address")
+    parser.add_argument("--memory", action="store_true", help="also record each stage's peak memory with tracemalloc")
+    parser.add_argument("--counters", action="store_true", help="also record the planner's operation counters")
+    parser.add_argument("--data-dir", help="keep the generated CSV files in this directory")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="slowdown ratio reported as a regression")
+    args = parser.parse_args(argv)
+
+    results = benchmark(args.addresses, args.packages, args.repeats, args.memory, args.data_dir, args.seed,
+                        args.deadlines, args.notes, args.counters)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(results, output, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.threshold)
+        if regressions:
+            print(f"Slower than {args.threshold}x the baseline: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Incremental re-planning benchmark: re-running plan_deliveries for a change versus LivePlan.apply.
+
+The synthetic city from bench_assignment is planned once. Then, at 9:30 AM, a series of random changes is made
+to packages that are not delivered yet (address corrections and cancellations). Each change is applied with
+LivePlan.apply, and the time of a full plan_deliveries run on the same city is shown for comparison.
+
+Run from the repository root:
+    python -m benchmarks.bench_replanning [packages] [trucks] [locations] [changes]
+"""
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from app.core.replanning import AddressChanged, LivePlan, PackageCancelled
+from app.core.routing import plan_deliveries
+from app.models.hash_table import OpenAddressingHashTable
+from benchmarks.bench_assignment import SEED, synthetic_city
+
+DEFAULT_PACKAGES = 3000
+DEFAULT_TRUCKS = 200
+DEFAULT_LOCATIONS = 1000
+DEFAULT_CHANGES = 200
+
+
+def planned_city(packages, trucks, locations):
+    context, package_list, truck_list = synthetic_city(packages, trucks, locations)
+    package_table = OpenAddressingHashTable(len(package_list))
+    for package in package_list:
+        package_table.insert(package.packageID, package)
+    start = time.perf_counter()
+    event_log = plan_deliveries(truck_list, package_table, context=context, corrections={})
+    return context, package_table, truck_list, event_log, time.perf_counter() - start
+
+
+def main(packages=DEFAULT_PACKAGES, trucks=DEFAULT_TRUCKS, locations=DEFAULT_LOCATIONS, changes=DEFAULT_CHANGES):
+    context, package_table, truck_list, event_log, plan_seconds = planned_city(packages, trucks, locations)
+    now = datetime.combine(truck_list[0].departTime.date(), datetime.min.time()) + timedelta(hours=9, minutes=30)
+
+    start = time.perf_counter()
+    live_plan = LivePlan(truck_list, package_table, event_log, context)
+    index_seconds = time.perf_counter() - start
+
+    rng = random.Random(SEED)
+    addresses = context.address_index.addresses[1:]
+    pending = [package.packageID for package in package_table.values() if package.deliveryTime and package.deliveryTime > now]
+    latencies = []
+    refused = 0
+    for package_id in rng.sample(pending, min(changes, len(pending))):
+        if rng.random() < 0.5:
+            change = AddressChanged(package_id, rng.choice(addresses))
+        else:
+            change = PackageCancelled(package_id)
+        start = time.perf_counter()
+        try:
+            live_plan.apply(change, now)
+        except ValueError:
+            refused += 1
+        latencies.append(time.perf_counter() - start)
+
+    latencies.sort()
+    print(f"{packages} packages, {trucks} trucks, {context.distance_matrix.size} locations")
+    print(f"Full plan_deliveries:         {plan_seconds * 1000:10.1f} ms")
+    print(f"LivePlan index (once):        {index_seconds * 1000:10.1f} ms")
+    print(f"LivePlan.apply, {len(latencies)} changes: {sum(latencies) / len(latencies) * 1000:10.2f} ms mean, "
+          f"{latencies[len(latencies) // 2] * 1000:.2f} ms median, {latencies[-1] * 1000:.2f} ms max ({refused} refused)")
+
+
+if __name__ == "__main__":
+    main(*(int(argument) for argument in sys.argv[1:5]))
@@ -0,0 +1,142 @@
+"""
+What-if plan evaluation benchmark: driving scratch trucks versus the RouteEvaluator.
+
+A synthetic fleet of routes is built on random locations. Every candidate plan changes the fleet in one way:
+- shift: one truck departs up to 30 minutes earlier or later
+- drop: one stop is removed from a truck's route
+- move: one stop is moved from one truck's route to a random position on another's
+and is scored over the whole fleet (total miles and late stops), the way a dispatcher compares plans.
+
+Each plan is scored three ways:
+- drive: every route is driven on a scratch Truck with drive_to (what the planner does)
+- pure: every route is walked with local_search.arrival_minutes, nothing is cached
+- evaluator: RouteEvaluator.evaluate, unchanged routes are cache hits and changed ones reuse their memoized prefix
+
+Run from the repository root:
+    python -m benchmarks.bench_route_cost [plans] [trucks] [stops per truck]
+"""
+import math
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from app.core.local_search import arrival_minutes
+from app.core.route_cost import RouteEvaluator
+from app.main import TRUCK_SPEED
+from app.models.distance_matrix import AddressIndex, DistanceMatrix
+from app.models.timeline import to_minutes
+from app.models.truck import Truck
+
+DEFAULT_PLANS = 1000
+DEFAULT_TRUCKS = 50
+DEFAULT_STOPS = 40
+LOCATIONS = 1000
+CITY_MILES = 20.0
+DEADLINE_SHARE = 0.25
+SEED = 950
+
+
+def synthetic_fleet(trucks, stops, rng):
+    """
+    Returns a tuple of (DistanceMatrix, AddressIndex, list of routes as location ID lists, departure minutes, deadlines).
+    Location 0 is the hub.
+    """
+    points = [(CITY_MILES / 2, CITY_MILES / 2)] + [(rng.uniform(0, CITY_MILES), rng.uniform(0, CITY_MILES)) for _ in range(LOCATIONS)]
+    distance_matrix = DistanceMatrix.from_rows([[round(math.dist(a, b), 1) for b in points] for a in points])
+    address_index = AddressIndex(f"{index} Synthetic St" for index in range(len(points)))
+    routes = [rng.sample(range(1, len(points)), stops) for _ in range(trucks)]
+    departures = [480 + 30 * (truck % 4) for truck in range(trucks)]
+    deadlines = {location: rng.choice([540, 630, 720]) for location in range(1, len(points)) if rng.random() < DEADLINE_SHARE}
+    return distance_matrix, address_index, routes, departures, deadlines
+
+
+def candidate_plans(routes, departures, plans, rng):
+    # Yields (routes, departures) for each what-if plan, sharing the unchanged routes with the base plan
+    for _ in range(plans):
+        new_routes = list(routes)
+        new_departures = list(departures)
+        kind = rng.choice(("shift", "drop", "move"))
+        truck = rng.randrange(len(routes))
+        if kind == "shift":
+            new_departures[truck] += rng.randint(-30, 30)
+        elif kind == "drop":
+            route = list(routes[truck])
+            del route[rng.randrange(len(route))]
+            new_routes[truck] = route
+        else:
+            other = rng.randrange(len(routes))
+            source = list(routes[truck])
+            stop = source.pop(rng.randrange(len(source)))
+            target = list(new_routes[other]) if other != truck else source
+            target.insert(rng.randrange(len(target) + 1), stop)
+            new_routes[truck] = source
+            new_routes[other] = target
+        yield new_routes, new_departures
+
+
+def score_drive(distance_matrix, address_index, routes, departures, deadlines):
+    day = datetime.combine(datetime.today(), datetime.min.time())
+    miles = 0.0
+    late = 0
+    for truck_id, (route, depart) in enumerate(zip(routes, departures)):
+        truck = Truck(truck_id, TRUCK_SPEED, address_index.address(0), day + timedelta(minutes=depart), len(route))
+        truck.current_time = truck.departTime
+        current = 0
+        for stop in route:
+            arrival = truck.drive_to(address_index.address(stop), distance_matrix.distance(current, stop))
+            if stop in deadlines and to_minutes(arrival) // 1 > deadlines[stop]:
+                late += 1
+            current = stop
+        truck.drive_to(address_index.address(0), distance_matrix.distance(current, 0))
+        miles += truck.milesTotal
+    return miles, late
+
+
+def score_pure(distance_matrix, routes, departures, deadlines):
+    miles = 0.0
+    late = 0
+    for route, depart in zip(routes, departures):
+        full = [0] + route + [0]
+        miles += sum(distance_matrix.distance(a, b) for a, b in zip(full, full[1:]))
+        arrivals = arrival_minutes(full, distance_matrix, depart, TRUCK_SPEED)
+        late += sum(1 for stop, arrival in zip(route, arrivals[1:]) if stop in deadlines and int(arrival) > deadlines[stop])
+    return miles, late
+
+
+def score_evaluator(evaluator, routes, departures):
+    miles = 0.0
+    late = 0
+    for route, depart in zip(routes, departures):
+        cost = evaluator.evaluate(route, 0, 0, depart, TRUCK_SPEED)
+        miles += cost.miles
+        late += len(cost.late_stops)
+    return miles, late
+
+
+def main(plans=DEFAULT_PLANS, trucks=DEFAULT_TRUCKS, stops=DEFAULT_STOPS):
+    rng = random.Random(SEED)
+    distance_matrix, address_index, routes, departures, deadlines = synthetic_fleet(trucks, stops, rng)
+    candidates = list(candidate_plans(routes, departures, plans, rng))
+    evaluator = RouteEvaluator(distance_matrix, deadlines)
+
+    print(f"{plans} candidate plans, {trucks} trucks, {stops} stops per truck")
+    print(f"{'scorer':<12}{'seconds':>10}{'us per plan':>14}")
+    results = {}
+    for name, score in (("drive", lambda plan: score_drive(distance_matrix, address_index, *plan, deadlines)),
+                        ("pure", lambda plan: score_pure(distance_matrix, *plan, deadlines)),
+                        ("evaluator", lambda plan: score_evaluator(evaluator, *plan))):
+        start = time.perf_counter()
+        results[name] = [score(plan) for plan in candidates]
+        elapsed = time.perf_counter() - start
+        print(f"{name:<12}{elapsed:>10.3f}{elapsed / plans * 1e6:>14.1f}")
+
+    matching = all(abs(a[0] - b[0]) < 1e-6 and a[1] == b[1] for a, b in zip(results["pure"], results["evaluator"]))
+    print(f"Evaluator scores match the pure walk: {matching}")
+    info = evaluator.cache_info()
+    print(f"Route cache: {info.hits} hits, {info.misses} misses, {info.evictions} evictions ({info.currsize}/{info.maxsize})")
+    print(f"Prefix chunks reused: {info.prefix_hits}, stops walked: {info.stops_walked} of {plans * (trucks * (stops + 1))}")
+
+
+if __name__ == "__main__":
+    main(*(int(argument) for argument in sys.argv[1:4]))
@@ -0,0 +1,55 @@
+"""
+Multi-trip scheduler benchmark on a synthetic city.
+
+The city comes from bench_assignment.synthetic_city. One package in ten is delayed until 10:00 AM, there are
+more packages than one round of trucks can carry, and fewer drivers than trucks, so trucks have to reload and
+drivers have to switch trucks. The whole day is planned with plan_trips and its trips are summarised.
+
+Run from the repository root:
+    python -m benchmarks.bench_scheduler [packages] [trucks] [drivers] [locations]
+"""
+import random
+import sys
+import time
+from datetime import datetime
+
+from app.core.scheduler import plan_trips
+from app.models.hash_table import OpenAddressingHashTable
+from benchmarks.bench_assignment import SEED, synthetic_city
+
+DEFAULT_PACKAGES = 6000
+DEFAULT_TRUCKS = 200
+DEFAULT_DRIVERS = 150
+DEFAULT_LOCATIONS = 1000
+DELAYED_NOTE = "Delayed on flight---will not arrive to depot until 10:00 am"
+
+
+def main(packages=DEFAULT_PACKAGES, trucks=DEFAULT_TRUCKS, drivers=DEFAULT_DRIVERS, locations=DEFAULT_LOCATIONS):
+    context, package_list, truck_list = synthetic_city(packages, trucks, locations)
+    rng = random.Random(SEED)
+    package_table = OpenAddressingHashTable(len(package_list))
+    for package in package_list:
+        if rng.random() < 0.1:
+            package.special_notes = DELAYED_NOTE
+        package_table.insert(package.packageID, package)
+
+    # Half the trucks leave at fixed times, the rest wait for a free driver
+    for truck in truck_list[len(truck_list) // 2:]:
+        truck.departTime = truck.current_time = datetime.max
+
+    start = time.perf_counter()
+    _, trips = plan_trips(truck_list, package_table, drivers, context=context, corrections={}, improve=False)
+    elapsed = time.perf_counter() - start
+
+    delivered = sum(trip.route.packages_delivered for trip in trips)
+    late = sum(len(stop.late_package_ids) for trip in trips for stop in trip.route.stops)
+    last_return = max(trip.route.return_time for trip in trips)
+    trucks_used = len({trip.truck_id for trip in trips})
+    print(f"{packages} packages, {trucks} trucks, {drivers} drivers, {context.distance_matrix.size} locations")
+    print(f"Planned {len(trips)} trips on {trucks_used} trucks in {elapsed:.2f} s")
+    print(f"Delivered {delivered} packages ({late} late), {sum(trip.route.miles for trip in trips):.1f} miles, "
+          f"last truck back at {last_return.strftime('%I:%M %p')}")
+
+
+if __name__ == "__main__":
+    main(*(int(argument) for argument in sys.argv[1:5]))
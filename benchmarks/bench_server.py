@@ -0,0 +1,136 @@
+"""
+Server mode benchmark: latency and throughput of the query server under concurrent local clients.
+
+The bundled day is planned once and served from a PlanSnapshot on a free local port. A load-generating client
+opens `clients` connections in the same event loop, and each one sends `requests` queries drawn from QUERY_MIX
+(package statuses, truck positions and fleet reports at random five-minute times between 8:00 AM and 5:00 PM).
+
+Every client keeps up to `depth` requests in flight. Depth 1 waits for each answer before sending the next
+request, a larger depth pipelines them so the server answers whatever has arrived as one batch. Each depth is
+run with the same requests, and the table shows requests per second, the p50 and p99 latency of a request from
+its write to its answer, and how many requests the server answered per write.
+
+Clients and server share one process and one event loop, so the numbers include the clients' own work.
+
+Run from the repository root:
+    python -m benchmarks.bench_server [clients] [requests per client] [pipeline depth]
+"""
+import asyncio
+import json
+import logging
+import random
+import statistics
+import sys
+import time
+from collections import deque
+
+from app.core.routing import plan_deliveries
+from app.core.routing_context import get_default_context
+from app.data_utils.data_handler import load_package_data
+from app.main import PACKAGE_FILE, configure_logging, create_trucks
+from app.ui.server import DEFAULT_HOST, PlanServer, PlanSnapshot
+
+DEFAULT_CLIENTS = 50
+DEFAULT_REQUESTS = 400
+DEFAULT_DEPTH = 16
+QUERY_MIX = {"status": 0.7, "position": 0.2, "report": 0.1}  # Share of each query
+SEED = 950
+
+
+def planned_snapshot():
+    """
+    Plans the bundled day without printing the route messages.
+
+    Returns the PlanSnapshot.
+    """
+    configure_logging(logging.WARNING)
+    context = get_default_context()
+    context.load()
+    package_table = load_package_data(PACKAGE_FILE, context.address_index)
+    trucks = create_trucks()
+    event_log = plan_deliveries(trucks, package_table, context)
+    return PlanSnapshot.capture(trucks, package_table, event_log)
+
+
+def request_lines(snapshot, count, rng):
+    # Encoded request lines for one client, drawn from QUERY_MIX
+    package_ids = sorted(package.packageID for package in snapshot.package_table.values())
+    truck_ids = [truck.truckID for truck in snapshot.trucks]
+    queries = list(QUERY_MIX)
+    weights = list(QUERY_MIX.values())
+    lines = []
+    for request_id in range(count):
+        minute = rng.randrange(8 * 60, 17 * 60, 5)
+        request = {"id": request_id, "query": rng.choices(queries, weights)[0], "time": f"{minute // 60:02d}:{minute % 60:02d}"}
+        if request["query"] == "status":
+            request["package_id"] = rng.choice(package_ids)
+        elif request["query"] == "position":
+            request["truck_id"] = rng.choice(truck_ids)
+        lines.append(json.dumps(request).encode() + b"\n")
+    return lines
+
+
+async def client(port, lines, depth, latencies):
+    # Sends lines keeping up to depth in flight, answers come back in request order
+    reader, writer = await asyncio.open_connection(DEFAULT_HOST, port)
+    sent = deque()
+    errors = 0
+    next_line = 0
+    while next_line < min(depth, len(lines)):
+        writer.write(lines[next_line])
+        sent.append(time.perf_counter())
+        next_line += 1
+    await writer.drain()
+
+    for _ in range(len(lines)):
+        response = await reader.readline()
+        latencies.append(time.perf_counter() - sent.popleft())
+        if b'"ok":true' not in response:
+            errors += 1
+        if next_line < len(lines):
+            writer.write(lines[next_line])
+            sent.append(time.perf_counter())
+            next_line += 1
+            await writer.drain()
+
+    writer.close()
+    await writer.wait_closed()
+    return errors
+
+
+async def run(snapshot, client_lines, depth):
+    """
+    Serves the snapshot's plan, with an empty report cache, to every client at once.
+
+    Returns a tuple of (seconds, latencies in seconds, errors, ServerStats).
+    """
+    plan_server = PlanServer(PlanSnapshot(snapshot.trucks, snapshot.package_table, snapshot.event_log))
+    server = await plan_server.start(DEFAULT_HOST, 0)
+    port = server.sockets[0].getsockname()[1]
+    latencies = []
+    async with server:
+        start = time.perf_counter()
+        errors = await asyncio.gather(*(client(port, lines, depth, latencies) for lines in client_lines))
+        elapsed = time.perf_counter() - start
+        while plan_server.open_connections:
+            await asyncio.sleep(0.001)  # Let the server finish closing its side
+    return elapsed, latencies, sum(errors), plan_server.stats()
+
+
+def main(clients=DEFAULT_CLIENTS, requests=DEFAULT_REQUESTS, depth=DEFAULT_DEPTH):
+    snapshot = planned_snapshot()
+    rng = random.Random(SEED)
+    client_lines = [request_lines(snapshot, requests, rng) for _ in range(clients)]
+
+    print(f"{clients} clients, {requests} requests each")
+    print(f"{'depth':>6}{'seconds':>10}{'requests/s':>13}{'p50 ms':>10}{'p99 ms':>10}{'per write':>11}{'errors':>8}")
+    for pipeline in sorted({1, depth}):
+        elapsed, latencies, errors, stats = asyncio.run(run(snapshot, client_lines, pipeline))
+        quantiles = statistics.quantiles(latencies, n=100)
+        print(f"{pipeline:>6}{elapsed:>10.3f}{len(latencies) / elapsed:>13,.0f}{quantiles[49] * 1000:>10.2f}"
+              f"{quantiles[98] * 1000:>10.2f}{stats.requests / stats.batches:>11.1f}{errors:>8}")
+    print(f"Fleet reports served from the snapshot cache in the last run: {stats.report_hits}")
+
+
+if __name__ == "__main__":
+    main(*(int(argument) for argument in sys.argv[1:4]))
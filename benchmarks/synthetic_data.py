@@ -0,0 +1,188 @@
+"""
+Synthetic service areas and package manifests in the same CSV formats as the files in data/.
+
+- address file: "name,address" rows, the row number is the location ID and row 0 is the hub
+- distance file: lower-triangular table of road miles (row i lists locations 0..i, the rest of the row is empty)
+- package file: the manifest header and columns, with a configurable mix of deadlines and special notes
+- corrections file: "Package ID,Time,Address,Zip" rows for every "Wrong address listed" package (see load_corrections)
+
+Locations are random points in a square around the hub, and road miles are the straight-line distance times a
+detour factor, rounded to a tenth of a mile like the bundled table. Everything is drawn from one seeded random
+generator, so the same arguments always write the same files.
+
+Write a city from the repository root with:
+    python -m benchmarks.synthetic_data directory [addresses] [packages]
+"""
+import csv
+import math
+import os
+import random
+import sys
+from collections import namedtuple
+
+from app.core.routing_context import HUB_ADDRESS
+
+DEFAULT_ADDRESSES = 300
+DEFAULT_PACKAGES = 1000
+CITY_MILES = 20.0
+DETOUR = 1.3  # Road miles per straight-line mile
+SEED = 950
+
+# Share of packages per deadline, the rest are EOD
+DEFAULT_DEADLINE_MIX = {"9:00 AM": 0.02, "10:30 AM": 0.25}
+
+# Share of packages per special note kind, the rest have no note. A package gets at most one note.
+# "group" packages are written in groups of GROUP_SIZE that must be delivered together
+DEFAULT_NOTE_MIX = {"truck": 0.05, "delayed": 0.08, "group": 0.06, "wrong-address": 0.01}
+GROUP_SIZE = 3
+RESTRICTED_PER_TRUCK = 8  # "Can only be on truck N" notes are spread so no truck gets more than this many
+DELAYED_UNTIL = "9:05 am"
+CORRECTION_TIME = "10:20 AM"
+
+PACKAGE_HEADER = ["Package ID", "Address", "City ", "State", "Zip", "Delivery Deadline", "Weight KILO", "Special Notes"]
+
+# Paths of the files written by generate_city (corrections_file is None when no package has a wrong address)
+SyntheticCity = namedtuple("SyntheticCity", ["address_file", "distance_file", "package_file", "corrections_file"])
+
+
+def parse_mix(text):
+    """
+    Parses a mix such as "9:00 AM=0.02,10:30 AM=0.25" into a dict of name -> share.
+    """
+    mix = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, _, share = item.rpartition("=")
+        if not name:
+            raise ValueError(f"Expected name=share, got {item!r}")
+        mix[name.strip()] = float(share)
+    if sum(mix.values()) > 1:
+        raise ValueError(f"Shares in {text!r} add up to more than 1")
+    return mix
+
+
+def write_address_file(path, addresses):
+    """
+    Writes the address file, one "name,address" row per location.
+    """
+    with open(path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        for location_id, address in enumerate(addresses):
+            writer.writerow(["Hub" if location_id == 0 else f"Location {location_id}", address])
+
+
+def write_distance_file(path, points):
+    """
+    Writes the lower-triangular distance table for a list of (x, y) points in miles.
+    """
+    count = len(points)
+    with open(path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        for i, point in enumerate(points):
+            distances = [f"{round(math.dist(point, points[j]) * DETOUR, 1):.1f}" for j in range(i + 1)]
+            writer.writerow(distances + [""] * (count - i - 1))
+
+
+def package_rows(packages, addresses, rng, deadline_mix=None, note_mix=None):
+    """
+    Draws the manifest rows for a city.
+
+    packages: Number of packages
+    addresses: Location addresses, index 0 is the hub (never a destination)
+    rng: random.Random used for every draw
+    deadline_mix: Dict of deadline -> share of packages (DEFAULT_DEADLINE_MIX if omitted), the rest are EOD
+    note_mix: Dict of note kind -> share of packages (DEFAULT_NOTE_MIX if omitted)
+
+    Returns a tuple of (manifest rows without the header, correction rows).
+    """
+    deadline_mix = DEFAULT_DEADLINE_MIX if deadline_mix is None else deadline_mix
+    note_mix = DEFAULT_NOTE_MIX if note_mix is None else note_mix
+
+    # Decide every package's note kind first, so groups can be formed from whole runs of package IDs
+    kinds = []
+    for _ in range(packages):
+        draw = rng.random()
+        kind = None
+        for name, share in note_mix.items():
+            if draw < share:
+                kind = name
+                break
+            draw -= share
+        kinds.append(kind)
+
+    notes = [""] * packages
+    restricted_trucks = max(2, math.ceil(kinds.count("truck") / RESTRICTED_PER_TRUCK))
+    group_members = [index for index, kind in enumerate(kinds) if kind == "group"]
+    for start in range(0, len(group_members) - GROUP_SIZE + 1, GROUP_SIZE):
+        group = group_members[start:start + GROUP_SIZE]
+        for index in group:
+            others = [str(other + 1) for other in group if other != index]
+            notes[index] = f"Must be delivered with {', '.join(others)}"
+
+    rows = []
+    corrections = []
+    for index in range(packages):
+        package_id = index + 1
+        if kinds[index] == "truck":
+            notes[index] = f"Can only be on truck {rng.randint(1, restricted_trucks)}"
+        elif kinds[index] == "delayed":
+            notes[index] = f"Delayed on flight---will not arrive to depot until {DELAYED_UNTIL}"
+        elif kinds[index] == "wrong-address":
+            notes[index] = "Wrong address listed"
+            corrections.append([package_id, CORRECTION_TIME, addresses[rng.randint(1, len(addresses) - 1)], f"841{rng.randint(0, 99):02d}"])
+
+        draw = rng.random()
+        deadline = "EOD"
+        for candidate, share in deadline_mix.items():
+            if draw < share:
+                deadline = candidate
+                break
+            draw -= share
+
+        address = addresses[rng.randint(1, len(addresses) - 1)]
+        rows.append([package_id, address, "Salt Lake City", "UT", f"841{rng.randint(0, 99):02d}", deadline,
+                     rng.randint(1, 88), notes[index]])
+    return rows, corrections
+
+
+def generate_city(directory, addresses=DEFAULT_ADDRESSES, packages=DEFAULT_PACKAGES, deadline_mix=None, note_mix=None, seed=SEED):
+    """
+    Writes a synthetic city's address, distance, package and corrections files into a directory.
+
+    addresses: Number of locations, the hub included
+    packages: Number of packages in the manifest
+    deadline_mix, note_mix: See package_rows
+    seed: Seed of the random generator
+
+    Returns a SyntheticCity with the file paths.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    points = [(CITY_MILES / 2, CITY_MILES / 2)] + [(rng.uniform(0, CITY_MILES), rng.uniform(0, CITY_MILES))
+                                                   for _ in range(addresses - 1)]
+    address_list = [HUB_ADDRESS] + [f"{location_id} Synthetic St" for location_id in range(1, addresses)]
+
+    city = SyntheticCity(os.path.join(directory, "address_file.csv"), os.path.join(directory, "distance_file.csv"),
+                         os.path.join(directory, "package_file.csv"), os.path.join(directory, "corrections_file.csv"))
+    write_address_file(city.address_file, address_list)
+    write_distance_file(city.distance_file, points)
+
+    rows, corrections = package_rows(packages, address_list, rng, deadline_mix, note_mix)
+    with open(city.package_file, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(PACKAGE_HEADER)
+        writer.writerows(rows)
+
+    if not corrections:
+        return city._replace(corrections_file=None)
+    with open(city.corrections_file, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["Package ID", "Time", "Address", "Zip"])
+        writer.writerows(corrections)
+    return city
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python -m benchmarks.synthetic_data directory [addresses] [packages]")
+    written = generate_city(sys.argv[1], *(int(argument) for argument in sys.argv[2:4]))
+    print("\n".join(path for path in written if path))
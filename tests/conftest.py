@@ -0,0 +1,33 @@
+"""
+Shared fixtures: the bundled day in data/, loaded and planned the way app.main does it.
+"""
+from collections import namedtuple
+from pathlib import Path
+
+import pytest
+
+from app.core.routing import plan_deliveries
+from app.core.routing_context import RoutingContext
+from app.data_utils.data_handler import load_package_data
+from app.main import PACKAGE_FILE, create_trucks
+
+ROOT = Path(__file__).resolve().parents[1]
+
+BundledDay = namedtuple("BundledDay", ["trucks", "package_table", "context"])
+PlannedDay = namedtuple("PlannedDay", ["trucks", "package_table", "event_log", "context"])
+
+
+@pytest.fixture
+def bundled_day(monkeypatch):
+    # The data paths are relative to the repository root, fresh packages and trucks per test since planning changes them
+    monkeypatch.chdir(ROOT)
+    context = RoutingContext().load()
+    package_table = load_package_data(PACKAGE_FILE, context.address_index)
+    return BundledDay(create_trucks(), package_table, context)
+
+
+@pytest.fixture
+def planned_day(bundled_day):
+    trucks, package_table, context = bundled_day
+    event_log = plan_deliveries(trucks, package_table, context)
+    return PlannedDay(trucks, package_table, event_log, context)
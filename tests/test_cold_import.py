@@ -0,0 +1,41 @@
+"""
+Importing the routing and main modules must not read any data: the address and distance files, the
+compiled distance cache and the package manifest are only opened when a RoutingContext is loaded.
+
+Each module is imported in a fresh interpreter with an audit hook that records every file opened and
+every mmap created, anything other than Python source, bytecode or extension modules fails the test.
+"""
+import json
+import subprocess
+import sys
+
+import pytest
+
+from tests.conftest import ROOT
+
+# Runs inside the child interpreter, prints the data files opened as JSON on the last line
+CHILD_SCRIPT = r"""
+import json, sys
+CODE_SUFFIXES = ('.py', '.pyc', '.so', '.pyd', '.pth')
+data_io = []
+
+def hook(event, args):
+    if event == 'open':
+        path = str(args[0]) if args and args[0] is not None else ''
+        if isinstance(args[0], int) or path.endswith(CODE_SUFFIXES) or '__pycache__' in path:
+            return
+        data_io.append(path)
+    elif event == 'mmap.__new__':
+        data_io.append('mmap')
+
+sys.addaudithook(hook)
+__import__(sys.argv[1])
+print(json.dumps(data_io))
+"""
+
+
+@pytest.mark.parametrize("module", ["app.core.routing", "app.main", "app.core.report"])
+def test_import_does_no_data_io(module):
+    completed = subprocess.run([sys.executable, "-c", CHILD_SCRIPT, module], capture_output=True, text=True,
+                               check=True, cwd=ROOT, stdin=subprocess.DEVNULL, timeout=60)
+    assert json.loads(completed.stdout.strip().splitlines()[-1]) == []
@@ -0,0 +1,136 @@
+"""
+Tests for streaming package manifests: plain and gzip input from paths and streams, chunk boundaries, skipped
+malformed rows, and every file opened for a path being closed again.
+"""
+import gc
+import gzip
+import io
+import logging
+import warnings
+from contextlib import contextmanager
+
+import pytest
+
+from app.data_utils.data_handler import iter_package_chunks, open_manifest
+
+HEADER = "Package ID,Address,City ,State,Zip,Delivery Deadline,Weight KILO,Special Notes\n"
+
+
+def manifest(count, malformed=()):
+    # count valid rows, with the given raw lines inserted after the header
+    rows = [f"{package_id},{package_id} Main St,Salt Lake City,UT,84101,EOD,{package_id}.5,\n"
+            for package_id in range(1, count + 1)]
+    return HEADER + "".join(malformed) + "".join(rows)
+
+
+def package_ids(chunks):
+    return [[package.packageID for package in chunk] for chunk in chunks]
+
+
+@contextmanager
+def no_resource_warnings():
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", ResourceWarning)
+        yield
+        gc.collect()
+    assert [warning for warning in caught if issubclass(warning.category, ResourceWarning)] == []
+
+
+@pytest.mark.parametrize("compressed", [False, True], ids=["plain", "gzip"])
+def test_path_is_read_and_closed(tmp_path, compressed):
+    text = manifest(5)
+    path = tmp_path / ("packages.csv.gz" if compressed else "packages.csv")
+    path.write_bytes(gzip.compress(text.encode()) if compressed else text.encode())
+
+    with no_resource_warnings():
+        assert package_ids(iter_package_chunks(str(path), chunk_size=2)) == [[1, 2], [3, 4], [5]]
+
+
+def test_gzip_is_detected_without_the_extension(tmp_path):
+    path = tmp_path / "packages.csv"
+    path.write_bytes(gzip.compress(manifest(3).encode()))
+
+    with no_resource_warnings():
+        assert package_ids(iter_package_chunks(path)) == [[1, 2, 3]]
+
+
+@pytest.mark.parametrize("make_stream", [
+    lambda text: io.StringIO(text),
+    lambda text: io.BytesIO(text.encode()),
+    lambda text: io.BytesIO(gzip.compress(text.encode())),
+], ids=["text", "binary", "gzip"])
+def test_caller_stream_stays_open(make_stream):
+    stream = make_stream(manifest(3))
+
+    assert package_ids(iter_package_chunks(stream)) == [[1, 2, 3]]
+    assert not stream.closed
+
+
+def test_stream_without_peek_keeps_its_position():
+    class Unpeekable(io.RawIOBase):
+        # A binary stream with only read, tell and seek
+        def __init__(self, data):
+            self.data = io.BytesIO(data)
+
+        def readable(self):
+            return True
+
+        def readinto(self, buffer):
+            data = self.data.read(len(buffer))
+            buffer[:len(data)] = data
+            return len(data)
+
+        def tell(self):
+            return self.data.tell()
+
+        def seek(self, offset, whence=io.SEEK_SET):
+            return self.data.seek(offset, whence)
+
+    with open_manifest(Unpeekable(gzip.compress(manifest(2).encode()))) as text:
+        assert text.read() == manifest(2)
+
+
+@pytest.mark.parametrize("count, chunk_size, sizes", [
+    (4, 2, [2, 2]),  # Ends on a boundary, no empty chunk
+    (5, 2, [2, 2, 1]),
+    (1, 10, [1]),
+    (0, 10, []),
+])
+def test_chunk_boundaries(count, chunk_size, sizes):
+    chunks = list(iter_package_chunks(io.StringIO(manifest(count)), chunk_size=chunk_size))
+
+    assert [len(chunk) for chunk in chunks] == sizes
+    assert [package_id for chunk in package_ids(chunks) for package_id in chunk] == list(range(1, count + 1))
+
+
+def test_malformed_rows_are_skipped_and_reported():
+    malformed = [
+        "x,1 Main St,Salt Lake City,UT,84101,EOD,1,\n",
+        "90,,Salt Lake City,UT,84101,EOD,1,\n",
+        "91,1 Main St,Salt Lake City,UT,84101,noon,1,\n",
+        "92,1 Main St,Salt Lake City,UT,84101,EOD,heavy,\n",
+        "93,1 Main St\n",
+        "\n",  # Blank lines are not reported
+    ]
+    errors = []
+
+    chunks = list(iter_package_chunks(io.StringIO(manifest(3, malformed)), chunk_size=2, errors=errors))
+
+    assert package_ids(chunks) == [[1, 2], [3]]
+    assert [(error.line_number, error.reason) for error in errors] == [
+        (2, "invalid package ID 'x'"),
+        (3, "missing address"),
+        (4, "invalid deadline 'noon'"),
+        (5, "invalid weight 'heavy'"),
+        (6, "expected at least 7 columns, found 2"),
+    ]
+    assert errors[0].row[0] == "x"
+
+
+def test_malformed_rows_are_logged_without_an_error_list(caplog, capsys):
+    with caplog.at_level(logging.WARNING, logger="app.data_utils.data_handler"):
+        chunks = list(iter_package_chunks(io.StringIO(manifest(2, ["x,1 Main St,Salt Lake City,UT,84101,EOD,1,\n"]))))
+
+    assert package_ids(chunks) == [[1, 2]]
+    assert caplog.messages == ["Skipping manifest line 2: invalid package ID 'x'"]
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,91 @@
+"""
+Tests for EventLog: recording keeps every log in time order, and status_at gives each status from the events
+up to the asked minute.
+"""
+import pytest
+
+from app.core import events
+from app.core.events import EventLog
+from app.core.report import iter_report_snapshots
+
+
+@pytest.fixture
+def log():
+    log = EventLog()
+    log.deadlines = {1: 630, 2: 540, 3: 600, 4: 700}
+    # 1: delayed, reaches the hub at 9:05, leaves at 9:20, delivered at 10:00
+    log.record(545, events.HUB_ARRIVAL, 1)
+    log.record(560, events.LOADED, 1, truck_id=2)
+    log.record(560, events.DEPARTED, 1, truck_id=2)
+    log.record(600, events.DELIVERED, 1, truck_id=2)
+    # 2: leaves at 8:00, delivered at 9:20 after its 9:00 deadline
+    log.record(480, events.LOADED, 2, truck_id=1)
+    log.record(480, events.DEPARTED, 2, truck_id=1)
+    log.record(560, events.DELIVERED, 2, truck_id=1)
+    # 3: wrong address until 10:20, then delivered at 11:00
+    log.record(620, events.ADDRESS_CORRECTED, 3, location="410 S State St")
+    log.record(630, events.LOADED, 3, truck_id=3)
+    log.record(630, events.DEPARTED, 3, truck_id=3)
+    log.record(660, events.DELIVERED, 3, truck_id=3)
+    # 4: cancelled at 8:20 while waiting at the hub
+    log.record(500, events.CANCELLED, 4)
+    return log
+
+
+@pytest.mark.parametrize("package_id, minute, expected", [
+    (1, 500, ("Not At Hub Yet", False)),
+    (1, 545, ("At Hub", False)),
+    (1, 560, ("En Route", False)),
+    (1, 599, ("En Route", False)),
+    (1, 600, ("Delivered", False)),
+    (2, 479, ("At Hub", False)),
+    (2, 500, ("En Route", False)),
+    (2, 540, ("En Route", True)),
+    (2, 560, ("Delivered", True)),
+    (3, 610, ("Erroneous", False)),
+    (3, 620, ("At Hub", True)),
+    (3, 640, ("En Route", True)),
+    (3, 660, ("Delivered", True)),
+    (4, 499, ("At Hub", False)),
+    (4, 500, ("Cancelled", False)),
+    (5, 600, ("At Hub", False)),
+])
+def test_status_at(log, package_id, minute, expected):
+    assert log.status_at(package_id, minute) == expected
+
+
+def test_status_at_does_not_depend_on_query_order(log):
+    minutes = list(range(470, 700, 7))
+    forward = [log.status_at(3, minute) for minute in minutes]
+    backward = [log.status_at(3, minute) for minute in reversed(minutes)]
+    assert forward == backward[::-1]
+
+
+def test_record_keeps_events_sorted_and_same_minute_events_in_order():
+    log = EventLog()
+    log.record(600, events.DELIVERED, 1)
+    log.record(480, events.LOADED, 1, truck_id=1)
+    log.record(480, events.DEPARTED, 1, truck_id=1)
+    log.record(540, events.ARRIVED, 1)
+    assert [(event.minute, event.kind) for event in log.package_events(1)] == [
+        (480, events.LOADED), (480, events.DEPARTED), (540, events.ARRIVED), (600, events.DELIVERED)]
+    assert log.package_truck == {1: 1}
+    assert [event.kind for event in log.package_events(1, 540)] == [events.LOADED, events.DEPARTED, events.ARRIVED]
+
+
+def test_record_accepts_fractional_minutes():
+    log = EventLog()
+    event = log.record(600.9, events.DELIVERED, 1)
+    assert event.minute == 600
+    assert isinstance(event.minute, int)
+    assert log.status_at(1, 600) == ("Delivered", False)
+
+
+def test_report_sweep_agrees_with_status_at(planned_day):
+    event_log = planned_day.event_log
+    minutes = list(range(7 * 60, 18 * 60, 10))
+    current = {}
+    for minute, snapshot in zip(minutes, iter_report_snapshots(minutes, planned_day.trucks, event_log)):
+        current.update(snapshot.changes)
+        for package_id in event_log.package_ids():
+            assert current[package_id] == event_log.status_at(package_id, minute), (package_id, minute)
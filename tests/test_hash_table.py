@@ -0,0 +1,132 @@
+"""
+Tests for OpenAddressingHashTable: random inserts, updates and removals checked against a dict,
+tombstone reuse on colliding probe chains, and growth past the load factor.
+"""
+import random
+
+import pytest
+
+from app.models import hash_table
+from app.models.hash_table import OpenAddressingHashTable
+
+
+class CollidingKey:
+    # Key whose hash is chosen by the test, so several keys share one probe chain
+    def __init__(self, name, hash_value):
+        self.name = name
+        self.hash_value = hash_value
+
+    def __hash__(self):
+        return self.hash_value
+
+    def __eq__(self, other):
+        return isinstance(other, CollidingKey) and self.name == other.name
+
+    def __repr__(self):
+        return f"CollidingKey({self.name!r})"
+
+
+def assert_matches(table, expected):
+    assert len(table) == len(expected)
+    assert sorted(table) == sorted(expected)
+    assert dict(table.items()) == expected
+    assert sorted(table.values()) == sorted(expected.values())
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_operations_match_dict(seed):
+    rng = random.Random(seed)
+    table = OpenAddressingHashTable(initial_capacity=4)
+    expected = {}
+    for step in range(5000):
+        key = rng.randrange(300)
+        action = rng.random()
+        if action < 0.5:
+            assert table.insert(key, step)
+            expected[key] = step
+        elif action < 0.8:
+            assert table.remove(key) == (key in expected)
+            expected.pop(key, None)
+        else:
+            assert table.search(key) == expected.get(key)
+            assert (key in table) == (key in expected)
+    assert_matches(table, expected)
+    for key in range(300):
+        assert table.search(key) == expected.get(key)
+
+
+def test_remove_keeps_later_keys_in_the_probe_chain_reachable():
+    keys = [CollidingKey(name, 7) for name in "abcde"]
+    table = OpenAddressingHashTable(initial_capacity=16)
+    for index, key in enumerate(keys):
+        table.insert(key, index)
+
+    assert table.remove(keys[1])
+    assert not table.remove(keys[1])
+    assert table.search(keys[1]) is None
+    # The tombstone left by b must not cut the chain to c, d and e
+    assert [table.search(key) for key in keys[2:]] == [2, 3, 4]
+
+
+def test_insert_reuses_the_first_tombstone():
+    keys = [CollidingKey(name, 3) for name in "abc"]
+    table = OpenAddressingHashTable(initial_capacity=16)
+    for index, key in enumerate(keys):
+        table.insert(key, index)
+    filled = table._filled
+
+    table.remove(keys[0])
+    table.insert(CollidingKey("d", 3), 9)
+    assert table._filled == filled  # Took a's slot instead of a new empty one
+    assert len(table) == 3
+    assert table.search(CollidingKey("d", 3)) == 9
+    assert table.search(keys[2]) == 2
+
+
+def test_update_does_not_add_an_entry():
+    table = OpenAddressingHashTable()
+    table.insert(1, "first")
+    table.insert(1, "second")
+    assert len(table) == 1
+    assert table.search(1) == "second"
+
+
+def test_grows_past_the_load_factor_and_keeps_every_item():
+    table = OpenAddressingHashTable(initial_capacity=4)
+    capacity = len(table._keys)
+    expected = {key: str(key) for key in range(1000)}
+    for key, item in expected.items():
+        table.insert(key, item)
+        assert table._filled <= len(table._keys) * table.max_load_factor
+    assert len(table._keys) > capacity
+    assert_matches(table, expected)
+
+
+def test_churn_rebuilds_tombstones_without_growing():
+    table = OpenAddressingHashTable(initial_capacity=16)
+    capacity = len(table._keys)
+    for key in range(10_000):
+        table.insert(key, key)
+        table.remove(key)
+    # Only tombstones piled up, so the table was rebuilt at the same size
+    assert len(table._keys) == capacity
+    assert len(table) == 0
+    assert table._filled <= capacity * table.max_load_factor
+
+
+def test_probe_counting_gives_the_same_results():
+    table = OpenAddressingHashTable()
+    for key in range(100):
+        table.insert(key, key * 2)
+    counts = [0, 0]
+    hash_table.count_probes(counts)
+    try:
+        found = [table.search(key) for key in range(150)]
+    finally:
+        hash_table.count_probes(None)
+    assert found == [key * 2 for key in range(100)] + [None] * 50
+    assert counts[0] == 150 and counts[1] >= 150
+
+    # Nothing more is added once counting is off
+    table.search(1)
+    assert counts[0] == 150
@@ -0,0 +1,110 @@
+"""
+Tests for insert_stops: the incrementally kept arrivals and slack choose the same route as a naive cheapest
+insertion that re-walks every candidate route, deadline stops that are on time stay on time, and a stop that
+cannot be on time anywhere is still delivered.
+"""
+import math
+import random
+from math import inf
+
+import pytest
+
+from app.core.insertion import insert_stops
+from app.core.local_search import arrival_minutes
+from app.models.distance_matrix import DistanceMatrix
+
+START_MINUTE = 8 * 60
+SPEED = 18
+
+
+def random_city(locations, seed):
+    rng = random.Random(seed)
+    points = [(rng.uniform(0, 10), rng.uniform(0, 10)) for _ in range(locations)]
+    return DistanceMatrix.from_rows([[math.dist(a, b) for b in points] for a in points])
+
+
+def random_deadlines(stops, share, seed):
+    # Deadlines between half an hour and two hours after departure for a share of the stops
+    rng = random.Random(seed)
+    return {stop: START_MINUTE + rng.uniform(30, 120) for stop in stops if rng.random() < share}
+
+
+def naive_insertion(stops, start_id, end_id, distance_matrix, start_minute, speed, deadlines):
+    # The same rules as insert_stops, checking every candidate route by walking it from the start
+    pending = sorted(stops, key=lambda stop: (deadlines.get(stop, inf), -distance_matrix.distance(start_id, stop)))
+    late_from = next((index for index, stop in enumerate(pending) if stop not in deadlines), len(pending))
+    route = [start_id, end_id]
+    due = {}  # Deadline every stop on the route must keep, inf once deferred
+    deferred = set()
+    index = 0
+    while index < len(pending):
+        stop = pending[index]
+        index += 1
+        deadline = inf if stop in deferred else deadlines.get(stop, inf)
+        added = [distance_matrix.distance(a, stop) + distance_matrix.distance(stop, b) - distance_matrix.distance(a, b)
+                 for a, b in zip(route, route[1:])]
+        for position in sorted(range(len(added)), key=added.__getitem__):
+            candidate = route[:position + 1] + [stop] + route[position + 1:]
+            arrivals = arrival_minutes(candidate, distance_matrix, start_minute, speed)
+            if all(arrival <= (deadline if location == stop else due[location])
+                   for location, arrival in zip(candidate[1:-1], arrivals[1:-1])):
+                route = candidate
+                due[stop] = deadline
+                break
+        else:
+            assert deadline != inf  # Before the end always fits a stop without a deadline
+            deferred.add(stop)
+            pending.insert(late_from, stop)
+            late_from += 1
+    return route[1:-1]
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("share", [0.0, 0.3, 1.0])
+def test_matches_naive_insertion(seed, share):
+    distance_matrix = random_city(40, seed)
+    stops = list(range(1, 40))
+    deadlines = random_deadlines(stops, share, seed)
+
+    route = insert_stops(stops, 0, 0, distance_matrix, START_MINUTE, SPEED, deadlines)
+
+    assert sorted(route) == stops
+    assert route == naive_insertion(stops, 0, 0, distance_matrix, START_MINUTE, SPEED, deadlines)
+
+
+def test_start_and_end_can_differ():
+    distance_matrix = random_city(20, 7)
+    stops = list(range(2, 20))
+    deadlines = random_deadlines(stops, 0.5, 7)
+
+    route = insert_stops(stops, 0, 1, distance_matrix, START_MINUTE, SPEED, deadlines)
+
+    assert route == naive_insertion(stops, 0, 1, distance_matrix, START_MINUTE, SPEED, deadlines)
+
+
+def line_city():
+    # Locations on a line, ten minutes per 3 miles at 18 mph: the hub at 0, EOD stops east at 1, 2 and 3 miles,
+    # a stop west at 3 miles
+    positions = [0, 1, 2, 3, -3]
+    return DistanceMatrix.from_rows([[float(abs(a - b)) for b in positions] for a in positions])
+
+
+def test_deadline_stop_goes_first_when_nearest_neighbour_would_be_late():
+    distance_matrix = line_city()
+
+    # West is 10 minutes away, the east stops first would reach it after 30
+    route = insert_stops([1, 2, 3, 4], 0, 0, distance_matrix, START_MINUTE, SPEED, {4: START_MINUTE + 15})
+
+    assert route[0] == 4
+    assert route[1:] == [1, 2, 3]
+
+
+def test_stop_that_cannot_be_on_time_is_still_delivered():
+    distance_matrix = line_city()
+    deadlines = {4: START_MINUTE + 5, 3: START_MINUTE + 12}  # West cannot be reached in 5 minutes
+
+    route = insert_stops([1, 2, 3, 4], 0, 0, distance_matrix, START_MINUTE, SPEED, deadlines)
+
+    assert sorted(route) == [1, 2, 3, 4]
+    arrivals = dict(zip(route, arrival_minutes([0] + route, distance_matrix, START_MINUTE, SPEED)[1:]))
+    assert arrivals[3] <= deadlines[3]  # The deferred stop takes no time from the one that can be on time
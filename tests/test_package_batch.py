@@ -0,0 +1,38 @@
+"""
+Tests for the PackageBatch paths: the columnar loading sort and truck counts must agree with the
+Package-based routing and report functions.
+"""
+from app.core.report import build_report, build_truckCounts
+from app.core.routing import sortBatch_forLoading, sortPackages_forLoading
+from app.models.package import Package
+from app.models.package_batch import PackageBatch
+
+
+def test_loading_sort_matches_the_package_sort(planned_day):
+    packages = sorted(planned_day.package_table.values(), key=lambda package: package.packageID)
+    batch = PackageBatch.from_packages(packages)
+    expected = [package.packageID for package in sortPackages_forLoading(packages, planned_day.context)]
+    assert sortBatch_forLoading(batch, planned_day.context) == expected
+
+
+def test_truck_counts_match_the_fleet_report(planned_day):
+    batch = PackageBatch.from_packages(planned_day.package_table.values())
+    for minute in range(7 * 60, 18 * 60, 5):
+        set_time = f"{(minute // 60 - 1) % 12 + 1:02d}:{minute % 60:02d} {'AM' if minute < 720 else 'PM'}"
+        report = build_report(set_time, planned_day.trucks, planned_day.package_table, planned_day.event_log)
+        counts = build_truckCounts(set_time, planned_day.trucks, batch)
+        for summary in report.trucks:
+            snapshot = counts[summary.truck_id]
+            assert (snapshot.delivered, snapshot.remaining, snapshot.erroneous) == \
+                (summary.delivered, summary.remaining, summary.erroneous), (set_time, summary.truck_id)
+            assert snapshot.miles == summary.miles
+
+
+def test_update_copies_the_routing_results():
+    package = Package(1, "1 Main St", "10:30 AM", "Salt Lake City", "UT", "84101", 2, "At Hub")
+    batch = PackageBatch.from_packages([package])
+    package.status = "Delivered"
+    package.assignedTruck = 2
+    batch.update(package)
+    assert batch.status(1) == "Delivered"
+    assert batch.rows_for_truck(2) == [0]
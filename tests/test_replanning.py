@@ -0,0 +1,200 @@
+"""
+Tests for LivePlan.apply: after every kind of change the truck's timeline stays continuous, its events stay
+sorted and end at its miles, the kept legs are untouched, and status_at answers from the rewritten log.
+A change that would make a truck miss its next trip is refused without changing anything.
+"""
+import copy
+from datetime import datetime, time
+
+import pytest
+
+from app.core import events
+from app.core.replanning import AddressChanged, LivePlan, PackageCancelled, PackageDelayed
+from app.core.scheduler import plan_trips
+from app.models.timeline import to_minutes
+from tests.test_scheduler import synthetic_city
+
+
+def at(hour, minute):
+    return datetime.combine(datetime.today(), time(hour, minute))
+
+
+def minute(hour, minutes):
+    return hour * 60 + minutes
+
+
+def legs(truck):
+    timeline = truck.timeline
+    return list(zip(timeline.start_minutes, timeline.end_minutes, timeline.from_locations, timeline.to_locations,
+                    timeline.start_miles, timeline.end_miles))
+
+
+def assert_consistent(day):
+    trucks, package_table, event_log, context = day
+    for truck in trucks:
+        truck_legs = legs(truck)
+        for start, end, _, _, start_miles, end_miles in truck_legs:
+            assert start <= end and start_miles <= end_miles + 1e-9
+        # Every leg starts where and when the previous one ended
+        for (_, end, _, to_location, _, end_miles), (start, _, from_location, _, start_miles, _) in zip(truck_legs, truck_legs[1:]):
+            assert from_location == to_location
+            assert start >= end
+            assert start_miles == pytest.approx(end_miles)
+        assert truck_legs[-1][3] == context.hub_address
+        assert truck.timeline.total_miles == pytest.approx(truck.milesTotal)
+
+        truck_events = event_log.truck_events(truck.truckID)
+        assert [event.minute for event in truck_events] == sorted(event.minute for event in truck_events)
+        assert truck_events[-1].kind == events.RETURNED
+        assert truck_events[-1].miles == pytest.approx(truck.milesTotal)
+        assert truck_events[-1].minute == to_minutes(truck.returnTime) // 1
+        # One trip end per return, each trip starts and ends at the hub
+        trip_ends = list(truck.timeline.trip_ends)
+        assert len(trip_ends) == sum(event.kind == events.RETURNED for event in truck_events)
+        assert trip_ends[-1] == len(truck_legs) - 1
+        for first in [0] + [end + 1 for end in trip_ends[:-1]]:
+            assert truck_legs[first][2] == context.hub_address
+        for end in trip_ends:
+            assert truck_legs[end][3] == context.hub_address
+
+    # Every package is delivered at most once, at the time the package records
+    for package in package_table.values():
+        delivered = [event for event in event_log.package_events(package.packageID) if event.kind == events.DELIVERED]
+        if package.deliveryTime is None:
+            assert delivered == []
+        else:
+            assert [event.minute for event in delivered] == [to_minutes(package.deliveryTime) // 1]
+            assert event_log.package_truck[package.packageID] == package.assignedTruck
+
+
+def truck(day, truck_id):
+    return next(truck for truck in day.trucks if truck.truckID == truck_id)
+
+
+def test_address_change_mid_leg_keeps_the_driven_legs(planned_day):
+    live_plan = LivePlan(planned_day.trucks, planned_day.package_table, planned_day.event_log, planned_day.context)
+    truck_2 = truck(planned_day, 2)
+    now = at(10, 8)  # Between the 10:06 and 10:11 stops
+    driving = truck_2.timeline.leg_at(now)
+    kept = legs(truck_2)[:driving + 1]
+    new_address = next(address for address in planned_day.context.address_index.addresses
+                       if address not in (planned_day.package_table.search(7).address, planned_day.context.hub_address))
+
+    result = live_plan.apply(AddressChanged(7, new_address), now)
+
+    assert result.truck_id == 2 and result.unassigned == []
+    assert legs(truck_2)[:driving + 1] == kept
+    package = planned_day.package_table.search(7)
+    assert package.address == new_address
+    assert any(stop.address == new_address and 7 in stop.package_ids for stop in result.route.stops)
+    assert planned_day.event_log.status_at(7, minute(10, 8)) == ("En Route", False)
+    assert planned_day.event_log.status_at(7, to_minutes(package.deliveryTime)) == ("Delivered", False)
+    assert_consistent(planned_day)
+
+
+def test_chained_cancellations_on_a_truck_that_left(planned_day):
+    live_plan = LivePlan(planned_day.trucks, planned_day.package_table, planned_day.event_log, planned_day.context)
+    truck_2 = truck(planned_day, 2)
+    miles = truck_2.milesTotal
+    for package_id, now in ((38, at(9, 30)), (10, at(9, 45)), (2, at(10, 0))):
+        result = live_plan.apply(PackageCancelled(package_id), now)
+        assert result.truck_id == 2 and result.unassigned == []
+        assert all(package_id not in stop.package_ids for stop in result.route.stops)
+        now_minute = to_minutes(now)
+        assert planned_day.event_log.status_at(package_id, now_minute - 1) == ("En Route", False)
+        assert planned_day.event_log.status_at(package_id, now_minute) == ("Cancelled", False)
+        assert planned_day.event_log.status_at(package_id, minute(17, 0)) == ("Cancelled", False)
+        assert planned_day.event_log.package_truck[package_id] == 2  # It left on the truck and stays on it
+        assert_consistent(planned_day)
+
+    # Packages still on the truck are all delivered, the cancelled ones never are
+    assert planned_day.event_log.status_at(33, minute(17, 0))[0] == "Delivered"
+    assert truck_2.milesTotal <= miles + 1e-9
+
+
+def test_cancel_before_departure_unloads_the_package(planned_day):
+    live_plan = LivePlan(planned_day.trucks, planned_day.package_table, planned_day.event_log, planned_day.context)
+    result = live_plan.apply(PackageCancelled(27), at(9, 0))
+
+    assert result.truck_id == 3
+    assert 27 not in planned_day.event_log.package_truck
+    assert planned_day.package_table.search(27).assignedTruck is None
+    assert planned_day.event_log.status_at(27, minute(8, 59)) == ("At Hub", False)
+    assert planned_day.event_log.status_at(27, minute(9, 0)) == ("Cancelled", False)
+    assert planned_day.event_log.status_at(27, minute(12, 0)) == ("Cancelled", False)
+    # 35 went to the same address and is still delivered
+    assert planned_day.event_log.status_at(35, minute(17, 0))[0] == "Delivered"
+    assert_consistent(planned_day)
+
+
+def test_delay_that_still_makes_the_truck_keeps_the_route(planned_day):
+    live_plan = LivePlan(planned_day.trucks, planned_day.package_table, planned_day.event_log, planned_day.context)
+    before = legs(truck(planned_day, 3))
+    result = live_plan.apply(PackageDelayed(39, time(10, 0)), at(9, 0))
+
+    assert (result.truck_id, result.route, result.unassigned) == (3, None, [])
+    assert legs(truck(planned_day, 3)) == before
+    assert planned_day.event_log.status_at(39, minute(9, 30)) == ("Not At Hub Yet", False)
+    assert planned_day.event_log.status_at(39, minute(10, 5)) == ("At Hub", False)
+    assert planned_day.event_log.status_at(39, minute(10, 20)) == ("En Route", False)
+    assert_consistent(planned_day)
+
+
+def test_delay_past_departure_takes_the_package_off_the_trip(planned_day):
+    live_plan = LivePlan(planned_day.trucks, planned_day.package_table, planned_day.event_log, planned_day.context)
+    result = live_plan.apply(PackageDelayed(39, time(11, 0)), at(9, 0))
+
+    assert result.truck_id == 3 and result.unassigned == [39]
+    assert all(39 not in stop.package_ids for stop in result.route.stops)
+    assert planned_day.package_table.search(39).deliveryTime is None
+    assert planned_day.event_log.status_at(39, minute(10, 30)) == ("Not At Hub Yet", False)
+    assert planned_day.event_log.status_at(39, minute(11, 30)) == ("At Hub", False)
+    assert planned_day.event_log.status_at(39, minute(17, 0)) == ("At Hub", False)
+    assert_consistent(planned_day)
+
+
+def test_refuses_changes_that_cannot_happen(planned_day):
+    live_plan = LivePlan(planned_day.trucks, planned_day.package_table, planned_day.event_log, planned_day.context)
+    with pytest.raises(ValueError):
+        live_plan.apply(PackageDelayed(7, time(11, 0)), at(9, 30))  # Already left on truck 2
+    with pytest.raises(ValueError):
+        live_plan.apply(PackageCancelled(14), at(9, 0))  # Delivered at 8:06
+    with pytest.raises(KeyError):
+        live_plan.apply(PackageCancelled(99), at(9, 0))
+    live_plan.apply(PackageCancelled(27), at(9, 0))
+    with pytest.raises(ValueError):
+        live_plan.apply(PackageCancelled(27), at(9, 5))
+    assert_consistent(planned_day)
+
+
+def test_refused_overrun_changes_nothing():
+    # Two drivers for two trucks, so each truck reloads and leaves again as soon as it is back
+    trucks, package_table, context = synthetic_city(40, 2, 3)
+    event_log, trips = plan_trips(trucks, package_table, 2, context=context, corrections={}, improve=False)
+    first_trip = trips[0]
+    truck_id = first_trip.truck_id
+    next_trip = next(trip for trip in trips[1:] if trip.truck_id == truck_id)
+    assert next_trip.route.depart_time == first_trip.route.return_time
+
+    # Moving a package of the first trip to the address farthest from all of its stops lengthens the trip,
+    # so the truck would be back after its next trip leaves
+    package_id = first_trip.route.stops[0].package_ids[0]
+    address_index = context.address_index
+    on_route = [address_index.lookup(stop.address) for stop in first_trip.route.stops] + [context.hub_index]
+    farthest = address_index.address(max(
+        (location for location in range(context.distance_matrix.size) if location not in on_route),
+        key=lambda location: min(context.distance_matrix.distance(location, stop) for stop in on_route)))
+    now = first_trip.route.depart_time
+
+    live_plan = LivePlan(trucks, package_table, event_log, context, improve=False)
+    before = copy.deepcopy(([legs(truck) for truck in trucks], event_log.truck_events(truck_id),
+                            event_log.package_events(package_id), vars_of(package_table.search(package_id))))
+    with pytest.raises(ValueError, match="after its next trip leaves"):
+        live_plan.apply(AddressChanged(package_id, farthest), now)
+    after = ([legs(truck) for truck in trucks], event_log.truck_events(truck_id),
+             event_log.package_events(package_id), vars_of(package_table.search(package_id)))
+    assert after == before
+
+
+def vars_of(package):
+    return {name: getattr(package, name) for name in package.__slots__}
@@ -0,0 +1,27 @@
+"""
+Tests for report_render: text output only takes fleet reports, the record formats take every record.
+"""
+import json
+
+import pytest
+
+from app.core.report import build_packageStatus, build_report
+from app.core.report_render import render_jsonl, render_report_text, render_text
+
+
+def test_render_text_refuses_records_it_cannot_render(planned_day):
+    row = build_packageStatus("10:00 AM", planned_day.trucks, planned_day.package_table, 9, planned_day.event_log)
+    with pytest.raises(TypeError):
+        render_text([row])
+
+
+def test_render_text_renders_every_fleet_report(planned_day):
+    reports = [build_report(set_time, planned_day.trucks, planned_day.package_table, planned_day.event_log)
+               for set_time in ("09:00 AM", "12:30 PM")]
+    assert render_text(reports) == "".join(render_report_text(report) for report in reports)
+
+
+def test_render_jsonl_renders_package_rows(planned_day):
+    row = build_packageStatus("10:00 AM", planned_day.trucks, planned_day.package_table, 9, planned_day.event_log)
+    record = json.loads(render_jsonl([row]))
+    assert (record["record"], record["package_id"], record["status"]) == ("package", 9, "Erroneous")
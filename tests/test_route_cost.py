@@ -0,0 +1,137 @@
+"""
+Tests for RouteEvaluator: whatever the memos hold (whole routes, shared prefix chunks, or neither after an
+eviction) every evaluation gives the same cost as walking the route with route_miles and arrival_minutes.
+"""
+import math
+import random
+
+import pytest
+
+from app.core.local_search import arrival_minutes, route_miles
+from app.core.route_cost import PREFIX_STEP, RouteEvaluator, package_stops
+from app.models.distance_matrix import DistanceMatrix
+from app.models.package import Package
+
+LOCATIONS = 80
+
+
+@pytest.fixture(scope="module")
+def distance_matrix():
+    rng = random.Random(24)
+    points = [(rng.uniform(0, 10), rng.uniform(0, 10)) for _ in range(LOCATIONS)]
+    return DistanceMatrix.from_rows([[math.dist(a, b) for b in points] for a in points])
+
+
+def deadlines_for(seed):
+    rng = random.Random(seed)
+    return {location: rng.randrange(9 * 60, 12 * 60) for location in range(1, LOCATIONS) if rng.random() < 0.3}
+
+
+def assert_naive_cost(cost, stops, start_id, end_id, depart_minute, speed, distance_matrix, deadlines):
+    route = [start_id, *stops, end_id]
+    arrivals = arrival_minutes(route, distance_matrix, depart_minute, speed)
+    assert cost.miles == pytest.approx(route_miles(route, distance_matrix))
+    assert cost.arrivals == pytest.approx(arrivals[1:-1])
+    assert cost.return_minute == pytest.approx(arrivals[-1])
+    assert cost.late_stops == tuple(stop for stop, arrival in zip(stops, arrivals[1:-1])
+                                    if stop in deadlines and int(arrival) > deadlines[stop])
+
+
+def what_if_routes(count, seed):
+    # Routes as a what-if search evaluates them: each one drops, swaps or moves a stop of an earlier route,
+    # sometimes a new route, at one of a few departure times and speeds
+    rng = random.Random(seed)
+    routes = [tuple(rng.sample(range(1, LOCATIONS), rng.randint(2 * PREFIX_STEP, 4 * PREFIX_STEP)))]
+    for _ in range(count):
+        stops = list(rng.choice(routes[-8:]))
+        move = rng.random()
+        if move < 0.1:
+            stops = rng.sample(range(1, LOCATIONS), rng.randint(1, 4 * PREFIX_STEP))
+        elif move < 0.4 and len(stops) > 1:
+            del stops[rng.randrange(len(stops))]
+        elif move < 0.7:
+            i, j = rng.randrange(len(stops)), rng.randrange(len(stops))
+            stops[i], stops[j] = stops[j], stops[i]
+        else:
+            stops.insert(rng.randrange(len(stops) + 1), stops.pop(rng.randrange(len(stops))))
+        routes.append(tuple(stops))
+    return [(stops, rng.choice((8 * 60, 9 * 60 + 5, 10 * 60 + 20)), rng.choice((18, 25))) for stops in routes]
+
+
+@pytest.mark.parametrize("max_routes, max_prefixes", [
+    (4096, 65536),  # Everything stays cached
+    (4, 3),  # Routes and chunks are evicted all the time
+    (1, 0),  # No prefix sharing, one route kept
+])
+def test_matches_naive_walk(distance_matrix, max_routes, max_prefixes):
+    deadlines = deadlines_for(1)
+    evaluator = RouteEvaluator(distance_matrix, deadlines, max_routes, max_prefixes)
+
+    for stops, depart_minute, speed in what_if_routes(300, max_routes + max_prefixes):
+        cost = evaluator.evaluate(stops, 0, 0, depart_minute, speed)
+        assert_naive_cost(cost, stops, 0, 0, depart_minute, speed, distance_matrix, deadlines)
+
+    info = evaluator.cache_info()
+    assert info.currsize <= max_routes and info.prefix_size <= max_prefixes
+    if max_prefixes:
+        assert info.prefix_hits > 0
+    if max_routes < 300:
+        assert info.evictions > 0
+    if 0 < max_prefixes < 300:
+        assert info.prefix_evictions > 0
+
+
+def test_chunks_are_only_shared_from_the_same_start(distance_matrix):
+    deadlines = deadlines_for(2)
+    evaluator = RouteEvaluator(distance_matrix, deadlines)
+    stops = tuple(range(1, 3 * PREFIX_STEP + 1))
+
+    evaluator.evaluate(stops, 0, 0)
+    assert evaluator.cache_info().prefix_size == 3
+
+    # The same stops from another start share no chunk
+    cost = evaluator.evaluate(stops, LOCATIONS - 1, 0, 9 * 60)
+    assert evaluator.cache_info().prefix_hits == 0
+    assert_naive_cost(cost, stops, LOCATIONS - 1, 0, 9 * 60, 18, distance_matrix, deadlines)
+
+    # The same start with the last stop dropped shares the first two
+    changed = stops[:-1]
+    cost = evaluator.evaluate(changed, 0, 0, 9 * 60)
+    assert evaluator.cache_info().prefix_hits == 2
+    assert_naive_cost(cost, changed, 0, 0, 9 * 60, 18, distance_matrix, deadlines)
+
+
+def test_route_hit_only_recomputes_arrivals(distance_matrix):
+    deadlines = deadlines_for(3)
+    evaluator = RouteEvaluator(distance_matrix, deadlines)
+    stops = tuple(range(1, 25))
+
+    first = evaluator.evaluate(stops, 0, 0, 8 * 60)
+    assert evaluator.evaluate(stops, 0, 0, 8 * 60) is first
+    walked = evaluator.cache_info().stops_walked
+
+    later = evaluator.evaluate(stops, 0, 0, 10 * 60, 25)
+    assert evaluator.cache_info().stops_walked == walked
+    assert later.miles == first.miles
+    assert_naive_cost(later, stops, 0, 0, 10 * 60, 25, distance_matrix, deadlines)
+
+
+def test_cache_clear(distance_matrix):
+    evaluator = RouteEvaluator(distance_matrix)
+    evaluator.evaluate(tuple(range(1, 40)), 0, 0)
+    evaluator.cache_clear()
+
+    assert evaluator.cache_info() == (0, 0, 0, evaluator.max_routes, 0, 0, 0, 0, 0)
+
+
+def test_package_stops_groups_consecutive_packages():
+    packages = []
+    for package_id, location, deadline in ((1, 5, "EOD"), (2, 5, "10:30 AM"), (3, 7, "EOD"), (4, 5, "9:00 AM")):
+        package = Package(package_id, f"{location} Main St", deadline, "Salt Lake City", "UT", "84101", 1, "At Hub")
+        package.locationID = location
+        packages.append(package)
+
+    stops, deadlines = package_stops(packages)
+
+    assert stops == [5, 7, 5]
+    assert deadlines == {5: 9 * 60}
@@ -0,0 +1,84 @@
+"""
+Tests for plan_trips: with any number of drivers, no driver and no truck is on two trips at once,
+and every package is delivered exactly once.
+"""
+import math
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core import events
+from app.core.routing_context import RoutingContext
+from app.core.scheduler import plan_trips
+from app.models.distance_matrix import AddressIndex, DistanceMatrix
+from app.models.hash_table import OpenAddressingHashTable
+from app.models.package import Package
+from app.models.truck import Truck
+
+
+def synthetic_city(packages, trucks, seed):
+    # A small random city with a 10:30 AM deadline on every fifth package and trucks leaving every half hour
+    rng = random.Random(seed)
+    points = [(5.0, 5.0)] + [(rng.uniform(0, 10), rng.uniform(0, 10)) for _ in range(30)]
+    addresses = [f"{index} Synthetic St" for index in range(len(points))]
+    context = RoutingContext.from_data(AddressIndex(addresses),
+                                       DistanceMatrix.from_rows([[round(math.dist(a, b), 1) for b in points] for a in points]),
+                                       hub_address=addresses[0])
+    package_table = OpenAddressingHashTable(packages)
+    for package_id in range(1, packages + 1):
+        package = Package(package_id, addresses[rng.randint(1, len(points) - 1)], "10:30 AM" if package_id % 5 == 0 else "EOD",
+                          "Salt Lake City", "UT", "84101", 1, "At Hub")
+        context.resolve_location(package)
+        package_table.insert(package_id, package)
+    start = datetime.combine(datetime.today(), datetime.min.time()) + timedelta(hours=8)
+    truck_list = [Truck(truck_id, 18, addresses[0], start + timedelta(minutes=30 * (truck_id % 2)), 8)
+                  for truck_id in range(1, trucks + 1)]
+    truck_list[-1].departTime = truck_list[-1].current_time = datetime.max  # Waits for a free driver
+    return truck_list, package_table, context
+
+
+def assert_no_overlap(trips, key):
+    by_owner = {}
+    for trip in trips:
+        by_owner.setdefault(key(trip), []).append((trip.route.depart_time, trip.route.return_time))
+    for owner, intervals in by_owner.items():
+        intervals.sort()
+        for (_, returned), (departed, _) in zip(intervals, intervals[1:]):
+            assert departed >= returned, f"{owner} leaves at {departed} before it is back at {returned}"
+
+
+def assert_valid_day(trucks, package_table, drivers, event_log, trips):
+    assert trips
+    assert {trip.driver_id for trip in trips} <= set(range(1, drivers + 1))
+    assert_no_overlap(trips, lambda trip: ("driver", trip.driver_id))
+    assert_no_overlap(trips, lambda trip: ("truck", trip.truck_id))
+
+    # Never more trucks on the road than drivers
+    changes = sorted([(trip.route.depart_time, 1) for trip in trips] + [(trip.route.return_time, -1) for trip in trips],
+                     key=lambda change: (change[0], change[1]))
+    on_road = 0
+    for _, step in changes:
+        on_road += step
+        assert on_road <= drivers
+
+    delivered = [event.package_id for event in event_log.all_package_events() if event.kind == events.DELIVERED]
+    assert sorted(delivered) == sorted(package_table)
+    assert sum(trip.route.packages_delivered for trip in trips) == len(package_table)
+    assert all(package.status == "Delivered" for package in package_table.values())
+
+
+@pytest.mark.parametrize("drivers", [1, 2, 3])
+def test_bundled_day(bundled_day, drivers):
+    trucks, package_table, context = bundled_day
+    event_log, trips = plan_trips(trucks, package_table, drivers, context=context)
+    assert_valid_day(trucks, package_table, drivers, event_log, trips)
+
+
+@pytest.mark.parametrize("drivers", [1, 2, 3])
+@pytest.mark.parametrize("seed", [1, 2])
+def test_synthetic_city_with_reloads(drivers, seed):
+    trucks, package_table, context = synthetic_city(60, 4, seed)
+    event_log, trips = plan_trips(trucks, package_table, drivers, context=context, corrections={}, improve=False)
+    assert len(trips) >= len(package_table) // 8  # More packages than one round of trucks can carry
+    assert_valid_day(trucks, package_table, drivers, event_log, trips)
@@ -0,0 +1,129 @@
+"""
+Tests for the query server: answers over a socket on port 0, error lines for bad requests (including one that
+breaks the JSON decoder) without losing the rest of the batch, answers in request order, snapshot isolation from
+the live plan, publishing a new snapshot, and the fleet report cache.
+"""
+import asyncio
+import json
+from datetime import datetime, time
+
+import pytest
+
+from app.core.replanning import LivePlan, PackageCancelled
+from app.ui.server import DEFAULT_HOST, REPORT_CACHE_SIZE, PlanServer, PlanSnapshot
+
+
+@pytest.fixture
+def snapshot(planned_day):
+    return PlanSnapshot.capture(planned_day.trucks, planned_day.package_table, planned_day.event_log)
+
+
+def request(request_id, query, **fields):
+    return json.dumps({"id": request_id, "query": query, **fields}).encode() + b"\n"
+
+
+async def exchange(plan_server, *batches):
+    # Sends each batch of lines in one write on one connection and reads one answer per line before the next batch
+    server = await plan_server.start(DEFAULT_HOST, 0)
+    port = server.sockets[0].getsockname()[1]
+    answers = []
+    async with server:
+        reader, writer = await asyncio.open_connection(DEFAULT_HOST, port)
+        for batch in batches:
+            writer.write(b"".join(batch))
+            await writer.drain()
+            for _ in batch:
+                answers.append(json.loads(await reader.readline()))
+        writer.close()
+        await writer.wait_closed()
+    return answers
+
+
+def test_pipelined_requests_are_answered_in_order(snapshot):
+    lines = [request(request_id, "status", package_id=request_id, time="10:30 AM") for request_id in range(1, 31)]
+    lines += [request(31, "position", truck_id=1, time="09:15"), request(32, "report", time="12:00 PM")]
+
+    answers = asyncio.run(exchange(PlanServer(snapshot), lines))
+
+    assert [answer["id"] for answer in answers] == list(range(1, 33))
+    assert all(answer["ok"] and answer["plan"] == 1 for answer in answers)
+    assert [answer["result"]["package_id"] for answer in answers[:30]] == list(range(1, 31))
+    assert answers[30]["result"]["truck_id"] == 1
+    assert answers[31]["result"]["report_time"] == "12:00"
+
+
+@pytest.mark.parametrize("line, request_id, error", [
+    (b"not json\n", None, "Expecting value"),
+    (b"[1, 2]\n", None, "must be a JSON object"),
+    (request(1, "weather", time="10:00"), 1, "Unknown query 'weather'"),
+    (request(2, "status", package_id=9), 2, "A time is required"),
+    (request(3, "status", package_id=9, time="25:61"), 3, "Invalid time '25:61'"),
+    (request(4, "status", package_id="9", time="10:00"), 4, "package_id must be an integer"),
+    (request(5, "status", package_id=99, time="10:00"), 5, "Package 99 not found"),
+    (request(6, "position", truck_id=7, time="10:00"), 6, "Truck 7 not found"),
+    (b"[" * 50_000 + b"\n", None, "RecursionError"),
+], ids=["not-json", "not-an-object", "unknown-query", "no-time", "bad-time", "text-id", "unknown-package",
+        "unknown-truck", "nested-too-deep"])
+def test_bad_requests_get_an_error_line(snapshot, line, request_id, error):
+    plan_server = PlanServer(snapshot)
+
+    answer = json.loads(plan_server.respond(line, snapshot))
+
+    assert answer["id"] == request_id and answer["ok"] is False
+    assert error in answer["error"]
+    assert plan_server.stats().errors == 1
+
+
+def test_bad_line_keeps_the_batch_and_the_connection(snapshot):
+    good = [request(request_id, "status", package_id=request_id, time="10:00") for request_id in range(1, 5)]
+    plan_server = PlanServer(snapshot)
+
+    answers = asyncio.run(exchange(plan_server, good + [b"[" * 50_000 + b"\n"] + good, [request(9, "report", time="10:00")]))
+
+    assert [answer["ok"] for answer in answers] == [True] * 4 + [False] + [True] * 5
+    assert [answer["id"] for answer in answers] == [1, 2, 3, 4, None, 1, 2, 3, 4, 9]
+    stats = plan_server.stats()
+    assert (stats.connections, stats.requests, stats.errors) == (1, 10, 1)
+
+
+def test_snapshot_does_not_see_later_changes(planned_day, snapshot):
+    live_plan = LivePlan(planned_day.trucks, planned_day.package_table, planned_day.event_log, planned_day.context)
+    end_of_day = datetime.combine(datetime.today(), time(17, 0))
+    miles = snapshot.truck_position(2, end_of_day)["miles"]
+
+    live_plan.apply(PackageCancelled(38), datetime.combine(datetime.today(), time(9, 30)))
+
+    assert snapshot.package_status(38, end_of_day)["status"] == "Delivered"
+    assert snapshot.truck_position(2, end_of_day)["miles"] == miles
+    recaptured = PlanSnapshot.capture(planned_day.trucks, planned_day.package_table, planned_day.event_log, version=2)
+    assert recaptured.package_status(38, end_of_day)["status"] == "Cancelled"
+
+
+def test_publish_keeps_the_request_being_answered_on_its_snapshot(planned_day, snapshot):
+    newer = PlanSnapshot.capture(planned_day.trucks, planned_day.package_table, planned_day.event_log, version=2)
+    plan_server = PlanServer(snapshot)
+
+    class PublishingSnapshot(PlanSnapshot):
+        def answer(self, request):
+            plan_server.publish(newer)  # A re-planned day arrives while this request is being answered
+            return super().answer(request)
+
+    plan_server.snapshot = PublishingSnapshot(snapshot.trucks, snapshot.package_table, snapshot.event_log)
+    answers = asyncio.run(exchange(plan_server, [request(1, "status", package_id=9, time="10:00")],
+                                   [request(2, "status", package_id=9, time="10:00")]))
+
+    assert [(answer["id"], answer["plan"]) for answer in answers] == [(1, 1), (2, 2)]
+
+
+def test_fleet_reports_are_cached_by_minute(snapshot):
+    day = datetime.combine(datetime.today(), time(8, 0))
+    first = snapshot.fleet_report(day.replace(hour=10))
+
+    assert snapshot.fleet_report(day.replace(hour=10, second=30)) is first
+    assert snapshot.report_hits == 1
+
+    # The least recently used minute is dropped once the cache is full
+    for minute in range(REPORT_CACHE_SIZE):
+        snapshot.fleet_report(day.replace(hour=11 + minute // 60, minute=minute % 60))
+    assert snapshot.fleet_report(day.replace(hour=10)) == first
+    assert snapshot.report_hits == 1
@@ -0,0 +1,135 @@
+"""
+Tests for driving shortest path legs: a truck drives every location on the path of a leg, so its timeline and
+position_at show where it is, while its stops, delivery times and miles are those of the whole path.
+"""
+from datetime import datetime, time
+
+import pytest
+
+from app.core import events
+from app.core.events import EventLog
+from app.core.replanning import LivePlan, PackageCancelled, PackageDelayed
+from app.core.routing import deliver_packages
+from app.core.routing_context import RoutingContext
+from app.data_utils.shortest_paths import shortest_paths
+from app.models.distance_matrix import AddressIndex, DistanceMatrix
+from app.models.hash_table import OpenAddressingHashTable
+from app.models.package import Package
+from app.models.timeline import EN_ROUTE
+from app.models.truck import Truck
+from tests.test_replanning import assert_consistent, legs
+
+HUB, ELM, OAK, PINE = "Hub", "1 Elm St", "2 Oak St", "3 Pine St"
+
+
+def at(hour, minute):
+    return datetime.combine(datetime.today(), time(hour, minute))
+
+
+def road_day(road=((HUB, 0), (ELM, 3), (OAK, 6), (PINE, 9)), package_addresses=(OAK, PINE)):
+    # Locations along one road at the given mile markers, only neighbours on the road are listed in the table.
+    # At 18 mph 3 miles take 10 minutes. One truck leaves the hub at 8:00 AM with a package for every address given.
+    addresses = [address for address, _ in road]
+    order = sorted(range(len(road)), key=lambda location: road[location][1])
+    neighbours = {frozenset(pair) for pair in zip(order, order[1:])}
+    rows = [[float(abs(road[a][1] - road[b][1])) if a == b or frozenset((a, b)) in neighbours else None
+             for b in range(len(road))] for a in range(len(road))]
+    context = RoutingContext.from_data(AddressIndex(addresses), shortest_paths(DistanceMatrix.from_rows(rows)), HUB)
+    package_table = OpenAddressingHashTable(len(package_addresses))
+    truck = Truck(1, 18, HUB, at(8, 0), 8)
+    for package_id, address in enumerate(package_addresses, 1):
+        package = Package(package_id, address, "EOD", "Salt Lake City", "UT", "84101", 1, "At Hub")
+        context.resolve_location(package)
+        package.assignedTruck = truck.truckID
+        truck.load_package(package, package_table)
+    event_log = EventLog()
+    route = deliver_packages(truck, package_table, improve=False, context=context, event_log=event_log)
+    return truck, package_table, event_log, context, route
+
+
+def test_legs_follow_the_road():
+    truck, package_table, event_log, context, route = road_day()
+
+    assert [(from_location, to_location) for _, _, from_location, to_location, _, _ in legs(truck)] == [
+        (HUB, ELM), (ELM, OAK), (OAK, PINE), (PINE, OAK), (OAK, ELM), (ELM, HUB)]
+    assert truck.milesTotal == pytest.approx(18.0)
+    assert truck.returnTime == at(9, 0)
+
+    # Stops and deliveries are only at the package addresses
+    assert [(stop.address, stop.package_ids) for stop in route.stops] == [(OAK, [1]), (PINE, [2])]
+    assert package_table.search(1).deliveryTime == at(8, 20)
+    assert package_table.search(2).deliveryTime == at(8, 30)
+    arrivals = [event for event in event_log.truck_events(1) if event.kind == events.ARRIVED]
+    assert [(event.location, event.miles) for event in arrivals] == [(OAK, pytest.approx(6.0)), (PINE, pytest.approx(9.0))]
+
+
+@pytest.mark.parametrize("when, location, from_location, miles", [
+    ((8, 5), ELM, HUB, 1.5),
+    ((8, 15), OAK, ELM, 4.5),
+    ((8, 45), ELM, OAK, 13.5),
+    ((8, 55), HUB, ELM, 16.5),
+])
+def test_position_shows_the_location_on_the_way(when, location, from_location, miles):
+    truck = road_day()[0]
+
+    position = truck.position_at(at(*when))
+
+    assert position.status == EN_ROUTE
+    assert (position.location, position.from_location) == (location, from_location)
+    assert position.miles == pytest.approx(miles)
+
+
+def test_replanning_from_a_location_on_the_way():
+    truck, package_table, event_log, context, _ = road_day()
+    live_plan = LivePlan([truck], package_table, event_log, context, improve=False)
+
+    # Between the hub and Elm, the truck goes on to Elm and then drives to Oak only
+    result = live_plan.apply(PackageCancelled(2), at(8, 5))
+
+    assert [(stop.address, stop.package_ids) for stop in result.route.stops] == [(OAK, [1])]
+    assert [(from_location, to_location) for _, _, from_location, to_location, _, _ in legs(truck)] == [
+        (HUB, ELM), (ELM, OAK), (OAK, ELM), (ELM, HUB)]
+    assert truck.returnTime == at(8, 40)
+    arrivals = [event for event in event_log.truck_events(1) if event.kind == events.ARRIVED]
+    assert [(event.location, event.miles) for event in arrivals] == [(OAK, pytest.approx(6.0))]
+    assert_consistent((([truck]), package_table, event_log, context))
+
+
+def through_hub_day():
+    # Elm and Oak on either side of the hub, so the leg from Elm to Oak passes the hub at 8:20 AM
+    return road_day(((ELM, -3), (HUB, 0), (OAK, 6)), (ELM, OAK))
+
+
+def test_trip_is_not_cut_where_a_leg_passes_the_hub():
+    truck = through_hub_day()[0]
+
+    assert [(from_location, to_location) for _, _, from_location, to_location, _, _ in legs(truck)] == [
+        (HUB, ELM), (ELM, HUB), (HUB, OAK), (OAK, HUB)]
+    assert truck.timeline.trip_at(2) == (0, 3)
+
+
+def test_delay_while_passing_the_hub_is_refused():
+    truck, package_table, event_log, context, _ = through_hub_day()
+    live_plan = LivePlan([truck], package_table, event_log, context, improve=False)
+    before = legs(truck)
+
+    # The truck is on its way past the hub, the Oak package left on it at 8:00
+    with pytest.raises(ValueError, match="already left the hub"):
+        live_plan.apply(PackageDelayed(2, at(9, 0)), at(8, 15))
+
+    assert legs(truck) == before
+    assert package_table.search(2).deliveryTime == at(8, 40)
+    assert package_table.search(2).assignedTruck == 1
+
+
+def test_cancel_while_driving_to_the_hub_on_the_way():
+    truck, package_table, event_log, context, _ = through_hub_day()
+    live_plan = LivePlan([truck], package_table, event_log, context, improve=False)
+
+    result = live_plan.apply(PackageCancelled(2), at(8, 15))
+
+    assert result.truck_id == 1 and result.route.stops == []
+    assert truck.returnTime == at(8, 20)
+    assert truck.milesTotal == pytest.approx(6.0)
+    assert package_table.search(2).status == "Cancelled"
+    assert_consistent(([truck], package_table, event_log, context))